@@ -0,0 +1,88 @@
+"""Run HeartRateMonitor against the simulated MAX30102 and report throughput.
+
+Usage: python benchmarks/bench_capture.py [--speed N] [--seconds S] [--streaming] [--no-burst] [--interrupt]
+
+The simulated sensor produces samples ``speed`` times faster than real time,
+so higher speeds show where the capture thread stops keeping up (dropped
+samples) and how much CPU it burns per sample.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+try:
+    from .common import print_table  # also sets up sys.path
+except ImportError:  # executed as a script
+    from common import print_table  # type: ignore
+
+from acquisition import EdgeSource  # noqa: E402
+from heartrate_monitor import HeartRateMonitor  # noqa: E402
+from simbus import FakeMAX30102Bus, PPGWaveform  # noqa: E402
+
+
+def run_capture(
+    speed: float,
+    seconds: float,
+    streaming: bool = False,
+    burst: bool = True,
+    interrupt: bool = False,
+) -> dict:
+    bus = FakeMAX30102Bus(PPGWaveform(), speed=speed)
+    edge = None
+    if interrupt:
+        edge = EdgeSource()
+        bus.connect_interrupt(edge)
+    hrm = HeartRateMonitor(streaming=streaming, burst=burst, bus=bus, interrupt=edge)
+    hrm.start_sensor()
+    time.sleep(1.2)  # MAX30102() waits 1 s after reset
+    generated, dropped, transactions = bus.samples_generated, bus.samples_dropped, bus.transactions
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    time.sleep(seconds)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    generated = bus.samples_generated - generated
+    dropped = bus.samples_dropped - dropped
+    transactions = bus.transactions - transactions
+    bpm = float(hrm.bpm)
+    acquisition = hrm.acquisition_stats()
+    hrm.stop_sensor()
+    bus.close()
+    read = generated - dropped
+    return {
+        "samples_per_s": read / wall,
+        "dropped_pct": 100.0 * dropped / max(1, generated),
+        "transactions_per_sample": transactions / max(1, read),
+        "cpu_us_per_sample": cpu / max(1, read) * 1e6,
+        "wakeups_per_s": acquisition["wakeups_per_s"],
+        "samples_per_read": acquisition["samples_per_read"],
+        "missed_samples": acquisition["missed_samples"],
+        "bpm": bpm,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speed", type=float, default=8.0, help="Simulated time per real second")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Measurement duration")
+    parser.add_argument("--streaming", action="store_true", help="Use the streaming estimator")
+    parser.add_argument("--no-burst", action="store_true", help="Read the FIFO one sample at a time")
+    parser.add_argument("--interrupt", action="store_true", help="Wait on the simulated INT pin")
+    args = parser.parse_args()
+
+    stats = run_capture(
+        args.speed,
+        args.seconds,
+        streaming=args.streaming,
+        burst=not args.no_burst,
+        interrupt=args.interrupt,
+    )
+    mode = ("streaming" if args.streaming else "window") + (", interrupt" if args.interrupt else "")
+    print_table(f"capture at {args.speed:g}x ({25 * args.speed:.0f} samples/s offered)", {mode: stats})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
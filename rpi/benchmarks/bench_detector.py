@@ -0,0 +1,169 @@
+"""Time the ncnn detector's pre/post-processing and compare backends end to end.
+
+Usage: python benchmarks/bench_detector.py [--model DIR] [--frames N] [--backends ncnn,ultralytics]
+
+Post-processing runs on a synthetic ``out0`` so it works anywhere: the
+vectorized decode + NMS is checked against a per-anchor Python loop and both
+are timed. Each available backend is then run in its own subprocess on
+random 640x480 frames, reporting per-frame latency and peak RSS (ncnn needs
+``pip install ncnn`` and ``model.ncnn.bin`` next to the ``.param``).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from .common import YOLO_DIR, print_table, time_call
+except ImportError:  # executed as a script
+    from common import YOLO_DIR, print_table, time_call  # type: ignore
+
+import ncnn_detector  # noqa: E402  (path set up by common)
+
+
+def synthetic_out0(rng: np.random.Generator, objects: int = 4, anchors: int = 8400) -> np.ndarray:
+    """Raw head output with a few objects, each seen by a cluster of anchors."""
+    out = np.zeros((6, anchors), dtype=np.float32)
+    out[:4] = rng.uniform(0, 640, (4, anchors))
+    out[2:4] = rng.uniform(4, 60, (2, anchors))
+    out[4:] = rng.uniform(0, 0.05, (2, anchors))
+    for _ in range(objects):
+        cx, cy, w, h = rng.uniform(100, 540), rng.uniform(100, 540), rng.uniform(60, 200), rng.uniform(60, 200)
+        idx = rng.choice(anchors, 40, replace=False)
+        out[0, idx] = cx + rng.normal(0, 4, idx.size)
+        out[1, idx] = cy + rng.normal(0, 4, idx.size)
+        out[2, idx] = w + rng.normal(0, 6, idx.size)
+        out[3, idx] = h + rng.normal(0, 6, idx.size)
+        out[4 + rng.integers(0, 2), idx] = rng.uniform(0.3, 0.95, idx.size)
+    return out
+
+
+def reference_decode(out0: np.ndarray, conf_thres: float = 0.25, iou_thres: float = 0.7):
+    """Per-anchor loop decode and pairwise greedy NMS, the shape Python code usually takes."""
+    cands = []
+    for j in range(out0.shape[1]):
+        column = out0[:, j].tolist()
+        scores = column[4:]
+        cls = max(range(len(scores)), key=scores.__getitem__)
+        if scores[cls] <= conf_thres:
+            continue
+        cx, cy, w, h = column[:4]
+        cands.append((scores[cls], j, cls, (cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)))
+    cands.sort(key=lambda c: (-c[0], c[1]))
+
+    def iou(a, b):
+        iw = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+        ih = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+        inter = iw * ih
+        union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+        return inter / union if union > 0 else 0.0
+
+    kept = []
+    for cand in cands:
+        if all(k[2] != cand[2] or iou(k[3], cand[3]) <= iou_thres for k in kept):
+            kept.append(cand)
+    return [(c[2], c[3]) for c in kept]
+
+
+def check_postprocess(rng: np.random.Generator, trials: int = 20) -> int:
+    mismatches = 0
+    for _ in range(trials):
+        out0 = synthetic_out0(rng, objects=int(rng.integers(0, 8)))
+        boxes, _, class_ids = ncnn_detector.decode_output(out0)
+        expected = reference_decode(out0)
+        same = len(expected) == len(boxes) and all(
+            cls == int(c) and np.allclose(box, b, atol=1e-3)
+            for (cls, box), b, c in zip(expected, boxes, class_ids)
+        )
+        mismatches += 0 if same else 1
+    return mismatches
+
+
+def run_backend(backend: str, model: str, frames: int) -> dict:
+    """Child process body: load one backend and time it on random frames."""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if backend == "ncnn":
+        detector = ncnn_detector.NcnnDetector(model)
+        infer = detector.detect
+    else:
+        from ultralytics import YOLO
+
+        yolo = YOLO(model, task="detect")
+        infer = lambda frame: yolo(frame, verbose=False)  # noqa: E731
+    load_s = time.perf_counter() - start
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    infer(frame)  # first call allocates
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        infer(frame)
+        times.append((time.perf_counter() - start) * 1e3)
+    return {
+        "load_s": load_s,
+        "best_ms": min(times),
+        "median_ms": float(np.median(times)),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_before_mb": rss_before / 1024,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=str(YOLO_DIR / "best_ncnn_model"))
+    parser.add_argument("--frames", type=int, default=30, help="Timed frames per backend")
+    parser.add_argument("--backends", default="ncnn,ultralytics")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_backend(args.child, args.model, args.frames)))
+        return 0
+
+    rng = np.random.default_rng(7)
+    mismatches = check_postprocess(rng)
+    print(f"post-processing: {mismatches} mismatches against the reference loop")
+    out0 = synthetic_out0(rng)
+    frame = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    canvas = None
+
+    def prep():
+        nonlocal canvas
+        canvas, _, _ = ncnn_detector.letterbox(frame, (640, 640), canvas)
+
+    rows = {
+        "letterbox 640x480 -> 640": time_call(prep, number=50),
+        "decode + NMS (vectorized)": time_call(lambda: ncnn_detector.decode_output(out0), number=50),
+        "decode + NMS (python loop)": time_call(lambda: reference_decode(out0), repeat=3, number=2),
+    }
+    print_table("ncnn detector pre/post-processing", rows)
+
+    results = {}
+    for backend in filter(None, args.backends.split(",")):
+        proc = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--child", backend,
+             "--model", args.model, "--frames", str(args.frames)],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            reason = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+            print(f"{backend}: skipped ({reason})")
+            continue
+        results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+    if results:
+        print_table("end to end, one 640x480 frame", results)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Frames/s and CPU% of pushing preview frames into a Tk canvas.
+
+Usage: python benchmarks/bench_display.py [--side N] [--frames N]
+
+Compares the old per-frame ``ImageTk.PhotoImage`` path with the persistent
+``PhotoSurface`` modes (``ppm`` and ``paste``). Each frame is followed by
+``update()`` so Tk actually redraws the canvas. Needs a display (run it on
+the Pi's desktop or under Xvfb).
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tkinter as tk
+
+import numpy as np
+from PIL import Image, ImageTk
+
+try:
+    from .common import print_table
+except ImportError:  # executed as a script
+    from common import print_table  # type: ignore
+
+from display_surface import PhotoSurface  # noqa: E402  (path set up by common)
+
+
+def make_frames(side: int, count: int = 8) -> list:
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (side, side, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def run(root: tk.Tk, mode: str, frames: list, count: int) -> dict:
+    side = frames[0].shape[0]
+    canvas = tk.Canvas(root, width=side, height=side, highlightthickness=0)
+    canvas.pack()
+    root.update()
+    if mode == "photoimage per frame":
+        # what _render_on_canvas used to do
+        item = None
+
+        def show(frame):
+            nonlocal item
+            photo = ImageTk.PhotoImage(Image.fromarray(frame))
+            if item is None:
+                item = canvas.create_image(side // 2, side // 2, image=photo)
+            else:
+                canvas.itemconfigure(item, image=photo)
+            canvas.image = photo
+    else:
+        surface = PhotoSurface(canvas, (side, side), (side // 2, side // 2), mode=mode)
+        show = surface.show_frame
+
+    for frame in frames:  # warm up
+        show(frame)
+        root.update()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for i in range(count):
+        show(frames[i % len(frames)])
+        root.update()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    canvas.destroy()
+    return {"frames_per_s": count / wall, "cpu_pct": 100.0 * cpu / wall, "ms_per_frame": wall / count * 1e3}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--side", type=int, default=640, help="Square preview size")
+    parser.add_argument("--frames", type=int, default=300, help="Frames per mode")
+    args = parser.parse_args()
+    try:
+        root = tk.Tk()
+    except tk.TclError as exc:
+        print(f"skipped: no display ({exc})")
+        return 0
+    frames = make_frames(args.side)
+    rows = {
+        mode: run(root, mode, frames, args.frames)
+        for mode in ("photoimage per frame", "ppm", "paste")
+    }
+    root.destroy()
+    print_table(f"{args.side}x{args.side} RGB frames into a Tk canvas", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
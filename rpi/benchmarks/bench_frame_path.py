@@ -0,0 +1,132 @@
+"""Compare the kiosk's old and new camera-to-display frame paths.
+
+Usage: python benchmarks/bench_frame_path.py [--side N] [--frames N]
+
+Both paths start from a synthetic camera frame and stop at the PIL image
+handed to Tk (PhotoImage needs a display, so it is left out). The old path is
+the pre-TripleBuffer InferenceWorker/ClinicKioskApp code: XRGB8888 capture,
+BGRA->BGR, copy for annotation, BGR->RGB, copy in get_frame(), crop,
+Image.fromarray and resize. The new path converts an RGB888 (packed BGR)
+frame once into a preallocated buffer slot and wraps it with Image.frombuffer.
+The staged path is the capture/render split of the current InferenceWorker:
+the render thread copies the captured slot into the display buffer before
+drawing, one extra memcpy that keeps slow inference off the preview.
+Peak allocations per frame are measured with tracemalloc, which sees NumPy
+and PIL buffers.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+try:
+    from .common import print_table, time_call
+except ImportError:  # executed as a script
+    from common import print_table, time_call  # type: ignore
+
+from frame_pipeline import TripleBuffer  # noqa: E402  (path set up by common)
+
+
+def draw_box(frame: np.ndarray) -> None:
+    cv2.rectangle(frame, (40, 40), (200, 220), (0, 255, 0), 2)
+
+
+def make_old_path(side: int):
+    camera = np.random.default_rng(0).integers(0, 255, (side, side, 4), dtype=np.uint8)
+    lock = threading.Lock()
+    shared = {}
+
+    def step() -> Image.Image:
+        frame = cv2.cvtColor(camera.copy(), cv2.COLOR_BGRA2BGR)  # capture_array() returns a new array
+        annotated = frame.copy()
+        draw_box(annotated)
+        rgb = cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB)
+        with lock:
+            shared["frame"] = rgb
+        with lock:
+            latest = shared["frame"].copy()
+        h, w = latest.shape[:2]
+        s = min(h, w)
+        cropped = latest[(h - s) // 2:(h - s) // 2 + s, (w - s) // 2:(w - s) // 2 + s]
+        return Image.fromarray(cropped).resize((side, side), Image.Resampling.BILINEAR)
+
+    return step
+
+
+def make_new_path(side: int):
+    camera = np.random.default_rng(0).integers(0, 255, (side, side, 3), dtype=np.uint8)
+    frames = TripleBuffer((side, side, 3))
+
+    def step() -> Image.Image:
+        slot = frames.write_slot()
+        cv2.cvtColor(camera, cv2.COLOR_BGR2RGB, dst=slot)  # MappedArray: no capture copy
+        draw_box(slot)
+        frames.publish()
+        latest = frames.latest()
+        return Image.frombuffer("RGB", (side, side), latest, "raw", "RGB", 0, 1)
+
+    return step
+
+
+def make_staged_path(side: int):
+    camera = np.random.default_rng(0).integers(0, 255, (side, side, 3), dtype=np.uint8)
+    captured = TripleBuffer((side, side, 3))
+    frames = TripleBuffer((side, side, 3))
+
+    def step() -> Image.Image:
+        cv2.cvtColor(camera, cv2.COLOR_BGR2RGB, dst=captured.write_slot())  # capture thread
+        captured.publish()
+        out = frames.write_slot()  # render thread
+        np.copyto(out, captured.latest())
+        draw_box(out)
+        frames.publish()
+        latest = frames.latest()  # Tk thread
+        return Image.frombuffer("RGB", (side, side), latest, "raw", "RGB", 0, 1)
+
+    return step
+
+
+def allocated_per_frame(step, frames: int) -> float:
+    """Average peak of new allocations while producing one frame, in bytes."""
+    step()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    total = 0
+    for _ in range(frames):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        image = step()
+        total += tracemalloc.get_traced_memory()[1] - before
+        del image
+    tracemalloc.stop()
+    return total / frames
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--side", type=int, default=640, help="Square preview size")
+    parser.add_argument("--frames", type=int, default=50, help="Frames for the allocation count")
+    args = parser.parse_args()
+
+    rows = {}
+    for name, factory in (("old path", make_old_path), ("new path", make_new_path), ("staged path", make_staged_path)):
+        step = factory(args.side)
+        timing = time_call(step, repeat=5, number=20)
+        rows[name] = {
+            "best_us": timing["best_us"],
+            "median_us": timing["median_us"],
+            "peak_alloc_kb": allocated_per_frame(step, args.frames) / 1024,
+        }
+    frame_kb = args.side * args.side * 3 / 1024
+    print_table(f"camera -> PIL image, {args.side}x{args.side} ({frame_kb:.0f} KB per RGB frame)", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Check the vectorized hrcalc against the original loop port and time both.
+
+Usage: python benchmarks/bench_hrcalc.py [--windows N] [--seed S]
+
+Every window in the corpus must give exactly the same (hr, hr_valid, spo2,
+spo2_valid) tuple from both implementations, otherwise the script exits 1.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import sys
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+try:
+    from .common import print_table, time_call
+except ImportError:  # executed as a script
+    from common import print_table, time_call  # type: ignore
+
+import hrcalc  # noqa: E402  (path set up by common)
+
+try:
+    from . import hrcalc_reference
+except ImportError:
+    import hrcalc_reference  # type: ignore
+
+Window = Tuple[List[int], List[int]]
+
+
+def ppg_window(
+    rng: np.random.Generator,
+    bpm: float,
+    ir_dc: float,
+    red_dc: float,
+    ir_ac: float,
+    red_ac: float,
+    noise: float,
+    quantize: int = 1,
+    size: int = hrcalc.BUFFER_SIZE,
+) -> Window:
+    """One window of a synthetic PPG with a sharp systolic upstroke, drift and noise."""
+    t = (np.arange(size) + rng.uniform(0, hrcalc.SAMPLE_FREQ)) / hrcalc.SAMPLE_FREQ
+    phase = (t * bpm / 60.0) % 1.0
+    pulse = np.exp(-((phase - 0.25) ** 2) / 0.01) + 0.4 * np.exp(-((phase - 0.55) ** 2) / 0.02)
+    drift = rng.uniform(-1, 1) * np.linspace(0, 1, size)
+    ir = ir_dc + ir_ac * (pulse + 0.3 * drift) + rng.normal(0, noise, size)
+    red = red_dc + red_ac * (pulse + 0.3 * drift) + rng.normal(0, noise, size)
+    ir = np.clip(np.round(ir / quantize) * quantize, 0, 0x3FFFF).astype(np.int64)
+    red = np.clip(np.round(red / quantize) * quantize, 0, 0x3FFFF).astype(np.int64)
+    return ir.tolist(), red.tolist()
+
+
+def corpus(count: int, seed: int) -> Iterator[Window]:
+    """Deterministic mix of finger-on, finger-off and degenerate windows."""
+    rng = np.random.default_rng(seed)
+    size = hrcalc.BUFFER_SIZE
+    for i in range(count):
+        kind = i % 10
+        if kind == 0:  # no finger: low DC, only noise
+            ir = rng.integers(0, 3000, size)
+            red = rng.integers(0, 3000, size)
+            yield ir.tolist(), red.tolist()
+        elif kind == 1:  # flat / saturated signal
+            level = int(rng.integers(0, 0x3FFFF))
+            yield [level] * size, [level // 2] * size
+        elif kind == 2:  # coarse steps produce flat-topped peaks
+            yield ppg_window(rng, rng.uniform(45, 150), 90000, 80000, 2500, 1800, 50, quantize=400)
+        else:
+            bpm = rng.uniform(40, 180)
+            ir_dc = rng.uniform(60000, 200000)
+            red_dc = ir_dc * rng.uniform(0.6, 1.1)
+            ir_ac = rng.uniform(200, 4000)
+            red_ac = ir_ac * rng.uniform(0.3, 1.2)
+            noise = rng.uniform(0, 300)
+            yield ppg_window(rng, bpm, ir_dc, red_dc, ir_ac, red_ac, noise)
+
+
+def check_equivalence(windows: List[Window]) -> int:
+    mismatches = 0
+    for idx, (ir, red) in enumerate(windows):
+        expected = hrcalc_reference.calc_hr_and_spo2(ir, red)
+        actual = hrcalc.calc_hr_and_spo2(ir, red)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"window {idx}: reference={expected} vectorized={actual}")
+    return mismatches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--windows", type=int, default=2000, help="Corpus size")
+    parser.add_argument("--seed", type=int, default=1234, help="Corpus RNG seed")
+    args = parser.parse_args()
+
+    windows = list(corpus(args.windows, args.seed))
+    valid = sum(1 for ir, red in windows if hrcalc.calc_hr_and_spo2(ir, red)[1])
+    mismatches = check_equivalence(windows)
+    print(f"corpus: {len(windows)} windows, {valid} with a valid HR, {mismatches} mismatches")
+
+    ir, red = windows[3]
+    rows = {
+        "reference (python loops)": time_call(lambda: hrcalc_reference.calc_hr_and_spo2(ir, red)),
+        "vectorized": time_call(lambda: hrcalc.calc_hr_and_spo2(ir, red)),
+    }
+    print_table("calc_hr_and_spo2, one 100-sample window", rows)
+    speedup = rows["reference (python loops)"]["best_us"] / rows["vectorized"]["best_us"]
+    print(f"speedup: {speedup:.1f}x")
+
+    # per-sample cost once the window is full: the batch path re-runs the
+    # whole window for every sample, the streaming estimator does not
+    stream_ir, stream_red = [], []
+    for ir_win, red_win in (windows[i] for i in range(3, len(windows), 10)):
+        stream_ir += ir_win
+        stream_red += red_win
+    samples = list(zip(stream_red, stream_ir))
+    streaming = hrcalc.StreamingHrSpo2Estimator()
+    compat = hrcalc.StreamingHrSpo2Estimator(compat=True)
+    for red_value, ir_value in samples[: hrcalc.BUFFER_SIZE]:
+        streaming.push(red_value, ir_value)
+        compat.push(red_value, ir_value)
+    cursor = itertools.cycle(samples)
+    rows = {
+        "streaming push": time_call(lambda: streaming.push(*next(cursor)), number=1000),
+        "streaming push (compat)": time_call(lambda: compat.push(*next(cursor)), number=100),
+    }
+    print_table("per-sample update, 100-sample window", rows)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
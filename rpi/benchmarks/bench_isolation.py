@@ -0,0 +1,130 @@
+"""Count MAX30102 FIFO overflows with the sensors in-process vs in a separate process.
+
+Usage: python benchmarks/bench_isolation.py [--speed N] [--seconds S] [--hold-ms MS] [--workers W]
+
+An inference stand-in runs in this process: each worker thread repeatedly
+makes a single C call that keeps the GIL for about ``--hold-ms`` ms (as
+ultralytics pre/post-processing does between ncnn calls). With the monitor
+in-process its thread cannot run during those calls and the simulated FIFO
+overflows; with ``SensorProcess`` it keeps its own interpreter.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+
+try:
+    from .common import print_table  # also sets up sys.path
+except ImportError:  # executed as a script
+    from common import print_table  # type: ignore
+
+from heartrate_monitor import HeartRateMonitor  # noqa: E402
+from shared_sensor import SensorProcess  # noqa: E402
+from simbus import FakeMAX30102Bus, PPGWaveform, SensorBackend  # noqa: E402
+
+
+def calibrate_hold(hold_ms: float) -> int:
+    """Length of ``sum(range(n))`` that takes ``hold_ms`` without releasing the GIL."""
+    n = 200_000
+    start = time.perf_counter()
+    sum(range(n))
+    per_item = (time.perf_counter() - start) / n
+    return max(1, int(hold_ms / 1e3 / per_item))
+
+
+class GilLoad:
+    """Worker threads that keep grabbing the GIL for long stretches."""
+
+    def __init__(self, workers: int, hold_items: int, duty: float = 0.8) -> None:
+        self.hold_items = hold_items
+        self.duty = duty
+        self.calls = 0
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            sum(range(self.hold_items))
+            self.calls += 1
+            # idle for the rest of the "frame", like an inference loop at a target FPS
+            self._stop.wait((time.perf_counter() - start) * (1 - self.duty) / self.duty)
+
+    def __enter__(self) -> "GilLoad":
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+
+def measure(read_stats, seconds: float, load: GilLoad) -> dict:
+    before = read_stats()
+    start = time.perf_counter()
+    with load:
+        time.sleep(seconds)
+    wall = time.perf_counter() - start
+    after = read_stats()
+    samples = after["samples"] - before["samples"]
+    missed = after["missed_samples"] - before["missed_samples"]
+    return {
+        "samples_per_s": samples / wall,
+        "overflow_events": after["overflow_events"] - before["overflow_events"],
+        "missed_samples": missed,
+        "missed_pct": 100.0 * missed / max(1, samples + missed),
+        "gil_holds": load.calls,
+    }
+
+
+def run_in_process(speed: float, seconds: float, load: GilLoad) -> dict:
+    bus = FakeMAX30102Bus(PPGWaveform(), speed=speed)
+    hrm = HeartRateMonitor(bus=bus)
+    hrm.start_sensor()
+    time.sleep(1.5)  # MAX30102() waits 1 s after reset
+    try:
+        return measure(hrm.acquisition_stats, seconds, load)
+    finally:
+        hrm.stop_sensor()
+        bus.close()
+
+
+def run_isolated(speed: float, seconds: float, load: GilLoad) -> dict:
+    bus = FakeMAX30102Bus(PPGWaveform(), speed=speed)
+    process = SensorProcess(SensorBackend(max30102_bus=bus, mlx=None, speed=speed))
+    process.start()
+    time.sleep(1.5)
+    try:
+        return measure(process.hrm.acquisition_stats, seconds, load)
+    finally:
+        process.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speed", type=float, default=4.0, help="Simulated time per real second")
+    parser.add_argument("--seconds", type=float, default=6.0, help="Measurement duration per mode")
+    parser.add_argument("--hold-ms", type=float, default=400.0, help="GIL hold per inference call")
+    parser.add_argument("--workers", type=int, default=1, help="Inference stand-in threads")
+    args = parser.parse_args()
+
+    hold_items = calibrate_hold(args.hold_ms)
+    fifo_ms = 32 / (25 * args.speed) * 1e3
+    print(
+        f"{25 * args.speed:.0f} samples/s offered, FIFO full after {fifo_ms:.0f} ms, "
+        f"GIL held {args.hold_ms:.0f} ms per call"
+    )
+    results = {
+        "in-process": run_in_process(args.speed, args.seconds, GilLoad(args.workers, hold_items)),
+        "isolated": run_isolated(args.speed, args.seconds, GilLoad(args.workers, hold_items)),
+    }
+    print_table(f"{args.workers} inference stand-in thread(s)", results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
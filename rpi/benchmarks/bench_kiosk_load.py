@@ -0,0 +1,326 @@
+"""Patients per hour, time to QR and backend round trips with several kiosks on one backend.
+
+Usage:
+    python benchmarks/bench_kiosk_load.py [--kiosks N] [--rates 20,40,60] [--minutes M] [--speed S]
+                                          [--backend URL] [--server-delay MS]
+
+Each kiosk is a thread running its own ``BiometricScanner`` on simulated
+sensors, using ``PatientWaveform`` from bench_time_to_accept.py and giving
+every patient their own pulse and SpO2. For each ``--rates`` value,
+patients arrive at every kiosk as a Poisson process at that many per hour
+and are served in order. For one patient the kiosk:
+
+1. waits ``--setup`` seconds while they step up and press Start;
+2. places the finger (some patients move for a few seconds first);
+3. captures, renders the QR at the preview size and writes its PNG;
+4. POSTs the reading to ``/pi/heartbeat``;
+5. waits ``--handoff`` seconds while the code is scanned.
+
+A failed capture is still reported, with status "capture failed".
+
+Heartbeats go to ``StandInBackend`` unless ``--backend`` points at a
+running backend such as ``http://localhost:5000/api``. The stand-in serves
+the same path and fields as the Express route and answers like it after
+``--server-delay`` ms. With a real backend each kiosk logs its rows in
+sensor_logs as ``sim-kiosk-<n>``.
+
+Simulated time runs ``--speed`` times faster than the wall clock. Sensor
+rates, scanner timeouts, arrivals and patient steps are all scaled, so
+patients/hour, waits and time to QR are in simulated seconds. Round trips
+to the backend are real and in wall-clock milliseconds. ``missed_samples``
+counts sensor FIFO losses. Any loss means the host could not keep up with
+the sped-up sensors, and the run no longer says anything about a real
+kiosk: the script then prints a warning and exits with status 1, so the
+suite records the run as failed. Lower ``--speed`` until it is 0.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from .common import print_table  # also sets up sys.path
+    from .bench_time_to_accept import NO_FINGER_TIMEOUT, TIMEOUT, PatientWaveform
+except ImportError:  # executed as a script
+    from common import print_table  # type: ignore
+    from bench_time_to_accept import NO_FINGER_TIMEOUT, TIMEOUT, PatientWaveform  # type: ignore
+
+from biometrics import BiometricScanner  # noqa: E402
+from signal_quality import StabilityDetector  # noqa: E402
+from simbus import FakeMAX30102Bus, FakeMLX90614, SensorBackend  # noqa: E402
+
+HEARTBEAT_PATH = "/pi/heartbeat"
+
+
+class _HeartbeatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Express
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        backend: StandInBackend = self.server.backend  # type: ignore[attr-defined]
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/api" + HEARTBEAT_PATH:
+            self._reply(404, {"message": "not found"})
+            return
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            self._reply(400, {"message": "invalid JSON"})
+            return
+        self._reply(200, {"message": "heartbeat received", "log": backend.log(payload)})
+
+    def _reply(self, status: int, payload: Dict[str, object]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class StandInBackend:
+    """``POST /api/pi/heartbeat`` on 127.0.0.1, answered like ``sensorController.heartbeat``."""
+
+    def __init__(self, delay_ms: float = 2.0) -> None:
+        self.delay = delay_ms / 1e3  # stands in for the sensor_logs insert
+        self.logs: List[Dict[str, object]] = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _HeartbeatHandler)
+        self.server.daemon_threads = True
+        self.server.backend = self  # type: ignore[attr-defined]
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stand-in-backend", daemon=True)
+
+    def log(self, payload: Dict[str, object]) -> Dict[str, object]:
+        time.sleep(self.delay)
+        with self._lock:
+            record = {
+                "id": len(self.logs) + 1,
+                "pi_identifier": payload.get("piIdentifier", "pi-main"),
+                "status": payload.get("status", "online"),
+                "temp": payload.get("temp"),
+                "spo2": payload.get("spo2"),
+                "hr": payload.get("hr"),
+                "created_at": _dt.datetime.now(_dt.timezone.utc).isoformat(),
+            }
+            self.logs.append(record)
+        return record
+
+    def __enter__(self) -> "StandInBackend":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def post_heartbeat(url: str, payload: Dict[str, object], timeout: float = 5.0) -> float:
+    """POST one heartbeat to ``url`` + /pi/heartbeat; returns the round trip in seconds.
+
+    Raises ``OSError`` (``urllib.error.URLError``/``HTTPError``) when the
+    backend is unreachable or answers with an error.
+    """
+    request = urllib.request.Request(
+        url.rstrip("/") + HEARTBEAT_PATH,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+class SimClock:
+    """Simulated seconds since start, running ``speed`` times faster than the wall clock."""
+
+    def __init__(self, speed: float) -> None:
+        self.speed = speed
+        self.start = time.monotonic()
+
+    def now(self) -> float:
+        return (time.monotonic() - self.start) * self.speed
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(max(0.0, seconds) / self.speed)
+
+    def sleep_until(self, moment: float) -> None:
+        self.sleep(moment - self.now())
+
+
+@dataclass
+class KioskLog:
+    waits: List[float] = field(default_factory=list)  # arrival -> Start pressed
+    time_to_qr: List[float] = field(default_factory=list)  # finger placed -> QR rendered
+    round_trips: List[float] = field(default_factory=list)  # wall-clock seconds
+    served: int = 0
+    failed: int = 0
+    waiting: int = 0  # arrived but not served when the run ended
+    http_errors: int = 0
+    busy: float = 0.0
+    missed_samples: int = 0
+
+
+def poisson_arrivals(rate_per_hour: float, duration: float, rng: random.Random) -> List[float]:
+    arrivals, moment = [], rng.expovariate(rate_per_hour / 3600.0)
+    while moment < duration:
+        arrivals.append(moment)
+        moment += rng.expovariate(rate_per_hour / 3600.0)
+    return arrivals
+
+
+def run_kiosk(index: int, arrivals: List[float], clock: SimClock, args: argparse.Namespace, url: str,
+              qr_dir: Path, log: KioskLog) -> None:
+    rng = random.Random(1000 + index)
+    speed = clock.speed
+    waveform = PatientWaveform()
+    sensors = SensorBackend(
+        max30102_bus=FakeMAX30102Bus(waveform, speed=speed), mlx=FakeMLX90614(seed=index), speed=speed
+    )
+    scanner = BiometricScanner(
+        hostname="localhost",
+        qr_output=qr_dir / f"kiosk-{index}.png",
+        logger=lambda message: None,
+        sensors=sensors,
+        stability=lambda: StabilityDetector(no_finger_timeout=NO_FINGER_TIMEOUT / speed),
+    )
+    duration = args.minutes * 60.0
+    try:
+        for served, arrival in enumerate(arrivals):
+            clock.sleep_until(arrival)
+            started = clock.now()
+            if started >= duration:
+                log.waiting += len(arrivals) - served
+                break
+            log.waits.append(started - arrival)
+            clock.sleep(args.setup)
+            waveform.bpm, waveform.spo2 = rng.gauss(76.0, 10.0), rng.uniform(94.0, 99.0)
+            waveform.settle = rng.uniform(1.0, 4.0) if rng.random() < args.movers else 0.0
+            waveform.place_finger()
+            placed = clock.now()
+            payload: Dict[str, object] = {"piIdentifier": f"sim-kiosk-{index}", "status": "online"}
+            try:
+                reading = scanner.capture_once(timeout=TIMEOUT / speed)
+                reading.qr_image(args.side)
+                log.time_to_qr.append(clock.now() - placed)
+                payload.update(temp=round(reading.temperature_c, 1), spo2=round(reading.spo2), hr=round(reading.heart_rate))
+                log.served += 1
+            except TimeoutError:  # includes NoFingerError
+                payload["status"] = "capture failed"
+                reading = None
+                log.failed += 1
+            waveform.lift_finger()
+            try:
+                log.round_trips.append(post_heartbeat(url, payload))
+            except OSError:
+                log.http_errors += 1
+            if reading is not None and reading.qr_saved is not None:
+                reading.qr_saved.result()
+            clock.sleep(args.handoff)
+            log.busy += clock.now() - started
+        log.missed_samples = int(scanner.hrm.acquisition_stats().get("missed_samples", 0))
+    finally:
+        scanner.shutdown()
+
+
+def percentiles(values: List[float], scale: float = 1.0) -> Optional[np.ndarray]:
+    return np.percentile(np.asarray(values) * scale, (50, 95, 99)) if values else None
+
+
+def run_rate(rate: float, args: argparse.Namespace, url: str) -> Dict[str, Dict[str, float]]:
+    duration = args.minutes * 60.0
+    logs = [KioskLog() for _ in range(args.kiosks)]
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = SimClock(args.speed)
+        threads = [
+            threading.Thread(
+                target=run_kiosk,
+                args=(index, poisson_arrivals(rate, duration, random.Random(index)), clock, args, url, Path(tmp), log),
+                name=f"sim-kiosk-{index}",
+            )
+            for index, log in enumerate(logs)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    waits = [wait for log in logs for wait in log.waits]
+    time_to_qr = [value for log in logs for value in log.time_to_qr]
+    round_trips = [value for log in logs for value in log.round_trips]
+    served = sum(log.served for log in logs)
+    throughput = {
+        "patients_per_hour": served * 3600.0 / duration,
+        "served": served,
+        "failed": sum(log.failed for log in logs),
+        "waiting": sum(log.waiting for log in logs),
+        "kiosk_busy_share": sum(log.busy for log in logs) / (duration * args.kiosks),
+        "missed_samples": sum(log.missed_samples for log in logs),
+    }
+    ranks = percentiles(waits)
+    if ranks is not None:
+        throughput.update({"wait_p50_s": ranks[0], "wait_p95_s": ranks[1]})
+    latency = {"heartbeats": len(round_trips), "http_errors": sum(log.http_errors for log in logs)}
+    ranks = percentiles(time_to_qr)
+    if ranks is not None:
+        latency.update({"qr_p50_s": ranks[0], "qr_p95_s": ranks[1], "qr_p99_s": ranks[2]})
+    ranks = percentiles(round_trips, 1e3)
+    if ranks is not None:
+        latency.update({"rtt_p50_ms": ranks[0], "rtt_p95_ms": ranks[1], "rtt_p99_ms": ranks[2]})
+    return {"throughput": throughput, "latency": latency}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kiosks", type=int, default=3, help="Simulated kiosks")
+    parser.add_argument("--rates", default="20,40,60", help="Patient arrivals per hour per kiosk, one run each")
+    parser.add_argument("--minutes", type=float, default=30.0, help="Simulated minutes per run")
+    parser.add_argument("--speed", type=float, default=4.0, help="Simulated seconds per wall-clock second")
+    parser.add_argument("--setup", type=float, default=15.0, help="Seconds from stepping up to pressing Start")
+    parser.add_argument("--handoff", type=float, default=10.0, help="Seconds the patient spends scanning the QR")
+    parser.add_argument("--movers", type=float, default=0.3, help="Share of patients who move at first")
+    parser.add_argument("--side", type=int, default=640, help="Preview size the QR is rendered at")
+    parser.add_argument("--backend", help="Backend API base URL, e.g. http://localhost:5000/api (default: stand-in)")
+    parser.add_argument("--server-delay", type=float, default=2.0, help="Stand-in response delay in ms")
+    args = parser.parse_args()
+
+    rates = [float(rate) for rate in args.rates.split(",")]
+    results = {}
+    if args.backend:
+        for rate in rates:
+            results[rate] = run_rate(rate, args, args.backend)
+        where = args.backend
+    else:
+        with StandInBackend(args.server_delay) as backend:
+            for rate in rates:
+                results[rate] = run_rate(rate, args, backend.url)
+        where = f"stand-in backend, {args.server_delay:g} ms"
+    label = f"{args.kiosks} kiosks, {args.minutes:g} simulated min at {args.speed:g}x"
+    print_table(f"throughput: {label}", {f"{rate:g}/h per kiosk": row["throughput"] for rate, row in results.items()})
+    print_table(f"time to QR and heartbeat round trip ({where})",
+                {f"{rate:g}/h per kiosk": row["latency"] for rate, row in results.items()})
+    lossy = [f"{rate:g}/h" for rate, row in results.items() if row["throughput"]["missed_samples"]]
+    if lossy:
+        print(f"missed sensor samples at {', '.join(lossy)}: results not valid, lower --speed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Compare I2C transactions and decode cost of per-sample vs burst FIFO reads.
+
+Usage: python benchmarks/bench_max30102.py [--samples N]
+
+Runs against an in-memory SMBus stand-in that serves random FIFO bytes, so no
+hardware is needed. Both read paths must decode the same samples.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+import numpy as np
+
+try:
+    from .common import print_table, time_call
+except ImportError:  # executed as a script
+    from common import print_table, time_call  # type: ignore
+
+import max30102  # noqa: E402  (path set up by common)
+
+
+class CountingFifoBus:
+    """Minimal SMBus stand-in: FIFO_DATA streams bytes, pointers report a full FIFO."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+        self.transactions = 0
+
+    def write_i2c_block_data(self, address, register, values):
+        self.transactions += 1
+
+    def read_byte_data(self, address, register):
+        self.transactions += 1
+        return 0
+
+    def read_i2c_block_data(self, address, register, length):
+        self.transactions += 1
+        if register == max30102.REG_FIFO_DATA:
+            if self.pos + length > len(self.data):
+                self.pos = 0
+            chunk = self.data[self.pos : self.pos + length]
+            self.pos += length
+            return list(chunk)
+        if register == max30102.REG_FIFO_WR_PTR:
+            return [max30102.FIFO_DEPTH - 1, 0, 0]
+        return [0] * length
+
+
+def make_sensor(data: bytes):
+    sensor = max30102.MAX30102(bus=CountingFifoBus(data))
+    sensor.bus.transactions = 0  # ignore the reset/setup writes
+    return sensor
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=31 * 100, help="Samples to read per path")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 256, args.samples * max30102.BYTES_PER_SAMPLE, dtype=np.uint8).tobytes()
+    batch = max30102.FIFO_DEPTH - 1
+
+    single = make_sensor(data)
+    burst = make_sensor(data)
+    single_samples, burst_samples = [], []
+    for _ in range(args.samples // batch):
+        n = single.get_data_present()
+        single_samples += [single.read_fifo() for _ in range(n)]
+        red, ir = burst.read_fifo_burst()
+        burst_samples += list(zip(red.tolist(), ir.tolist()))
+    if single_samples != burst_samples:
+        print("burst decode does not match read_fifo()")
+        return 1
+
+    print(f"{len(burst_samples)} samples, {batch} per poll")
+    print(f"  read_fifo():        {single.bus.transactions / len(single_samples):.2f} transactions/sample")
+    print(f"  read_fifo_burst():  {burst.bus.transactions / len(burst_samples):.2f} transactions/sample")
+
+    def per_sample():
+        n = single.get_data_present()
+        for _ in range(n):
+            single.read_fifo()
+
+    rows = {
+        "read_fifo() x31": time_call(per_sample, number=50),
+        "read_fifo_burst(31)": time_call(burst.read_fifo_burst, number=50),
+    }
+    print_table("draining 31 samples", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
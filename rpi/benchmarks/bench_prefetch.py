@@ -0,0 +1,113 @@
+"""Throughput of a recorded clip with and without decode prefetch.
+
+Usage: python benchmarks/bench_prefetch.py [--clip PATH] [--frames N] [--work-ms MS]
+
+Without ``--clip`` a synthetic 1280x720 MJPG clip is written to a temp
+folder. Each frame is decoded, downscaled to 640x360 and then passed to a
+stand-in for inference: an OpenCV blur loop that releases the GIL like
+ncnn/torch do, sized to roughly ``--work-ms``. "sequential" is the old
+yolo_detect.py loop (read, resize, infer); "prefetch" decodes and downscales
+on a PrefetchingSource thread with drop policy "all".
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+try:
+    from .common import print_table
+except ImportError:  # executed as a script
+    from common import print_table  # type: ignore
+
+from frame_sources import CaptureSource, PrefetchingSource  # noqa: E402  (path set up by common)
+
+DECODE_SIZE = (640, 360)
+
+
+def write_clip(path: Path, frames: int, size=(1280, 720)) -> None:
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30, size)
+    for i in range(frames):
+        writer.write(np.roll(base, i * 8, axis=1))
+    writer.release()
+
+
+def make_work(target_ms: float):
+    """A GIL-releasing blur repeated enough times to take about ``target_ms``."""
+    frame = np.zeros((DECODE_SIZE[1], DECODE_SIZE[0], 3), dtype=np.uint8)
+    start = time.perf_counter()
+    cv2.GaussianBlur(frame, (15, 15), 0)
+    once = max(1e-5, time.perf_counter() - start)
+    reps = max(1, int(target_ms / 1e3 / once))
+
+    def work(img: np.ndarray) -> None:
+        for _ in range(reps):
+            cv2.GaussianBlur(img, (15, 15), 0)
+
+    return work
+
+
+def run_sequential(clip: str, work) -> dict:
+    cap = cv2.VideoCapture(clip)
+    frames, decode_s = 0, 0.0
+    start = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frame = cv2.resize(frame, DECODE_SIZE, interpolation=cv2.INTER_AREA)
+        decode_s += time.perf_counter() - t0
+        work(frame)
+        frames += 1
+    wall = time.perf_counter() - start
+    cap.release()
+    return {"frames": frames, "fps": frames / wall, "decode_ms": decode_s / max(1, frames) * 1e3}
+
+
+def run_prefetch(clip: str, work, depth: int) -> dict:
+    camera = CaptureSource(clip, DECODE_SIZE, resize=True, live=False)
+    source = PrefetchingSource(camera, depth=depth, drop_policy="all")
+    frames, decode_s = 0, 0.0
+    start = time.perf_counter()
+    for item in source:
+        decode_s += item.decode_s
+        work(item.image)
+        frames += 1
+    wall = time.perf_counter() - start
+    source.stop()
+    camera.release()
+    return {"frames": frames, "fps": frames / wall, "decode_ms": decode_s / max(1, frames) * 1e3}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clip", help="Recorded clip to play (default: synthetic MJPG)")
+    parser.add_argument("--frames", type=int, default=150, help="Frames in the synthetic clip")
+    parser.add_argument("--work-ms", type=float, default=15.0, help="Per-frame stand-in inference time")
+    parser.add_argument("--depth", type=int, default=2, help="Prefetch depth")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = args.clip
+        if clip is None:
+            clip = str(Path(tmp) / "clip.avi")
+            write_clip(Path(clip), args.frames)
+        work = make_work(args.work_ms)
+        rows = {
+            "sequential": run_sequential(clip, work),
+            f"prefetch (depth {args.depth})": run_prefetch(clip, work, args.depth),
+        }
+    print_table(f"decode + {args.work_ms:.0f} ms inference stand-in per frame", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
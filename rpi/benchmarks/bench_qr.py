@@ -0,0 +1,117 @@
+"""Latency of putting a check-in QR code on the kiosk preview, old and new.
+
+Usage: python benchmarks/bench_qr.py [--side N] [--rounds N] [--versions 1-10]
+
+The payload is a typical check-in URL from ``build_qr_url``. "old display
+path" is what the kiosk did per patient before the in-memory renderer:
+encode with qrcode, render with PIL, save a PNG, open it again and
+LANCZOS-fit it to the preview. "encode + render_qr" is the new path with
+both caches cleared (a new patient), "render_qr cached" the same reading
+shown again. "generate_qr_code" is the optional PNG copy, written from the
+cached matrix; the kiosk does it on a background thread.
+
+The second table times matrix -> PNG bytes per QR version, since URLs grow
+with every vitals field: qrcode's PIL factory (``make_image`` + ``save``)
+against ``qr_raster.qr_png``, plus ``rasterize_qr`` to a NumPy array. The
+matrix is encoded beforehand; only the version (module count) matters, so
+each version holds the same short payload.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+try:
+    from .common import print_table, time_call
+except ImportError:  # executed as a script
+    from common import print_table, time_call  # type: ignore
+
+import qrcode  # noqa: E402
+from biometrics import build_qr_url, generate_qr_code, qr_matrix, render_qr  # noqa: E402  (path set up by common)
+from qr_raster import qr_png, rasterize_qr  # noqa: E402
+
+URL = build_qr_url("http://192.168.1.20:5173/?", 36.6, 98, 72)
+
+
+def make_qr() -> qrcode.QRCode:
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(URL)
+    qr.make(fit=True)
+    return qr
+
+
+def factory_png(qr: qrcode.QRCode) -> bytes:
+    buf = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buf)
+    return buf.getvalue()
+
+
+def version_rows(versions, rounds: int):
+    rows = {}
+    for version in versions:
+        qr = qrcode.QRCode(version=version, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+        qr.add_data("http://kiosk/?t=1")  # fits version 1
+        qr.make(fit=False)
+        matrix = np.array(qr.get_matrix(), dtype=bool)
+        old = time_call(lambda: factory_png(qr), repeat=rounds, number=5)
+        new = time_call(lambda: qr_png(matrix), repeat=rounds, number=20)
+        array = time_call(lambda: rasterize_qr(matrix), repeat=rounds, number=20)
+        rows[f"version {version} ({matrix.shape[0]} modules)"] = {
+            "factory_png_us": old["median_us"],
+            "qr_png_us": new["median_us"],
+            "rasterize_us": array["median_us"],
+            "speedup": old["median_us"] / new["median_us"],
+            "png_bytes_old": len(factory_png(qr)),
+            "png_bytes_new": len(qr_png(matrix)),
+        }
+    return rows
+
+
+def parse_versions(spec: str):
+    low, _, high = spec.partition("-")
+    return range(int(low), int(high or low) + 1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--side", type=int, default=640, help="Preview size the QR is shown at")
+    parser.add_argument("--rounds", type=int, default=5, help="Timing rounds per row")
+    parser.add_argument("--versions", default="1-10", help="QR versions for the PNG table, e.g. 1-10")
+    args = parser.parse_args()
+    side = args.side
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "qr.png"
+
+        def old_path():
+            make_qr().make_image(fill_color="black", back_color="white").save(path)
+            with Image.open(path) as img:
+                return ImageOps.fit(img, (side, side), Image.Resampling.LANCZOS)
+
+        def new_path():
+            qr_matrix.cache_clear()
+            render_qr.cache_clear()
+            return render_qr(URL, side)
+
+        rows = {
+            "encode (qrcode)": time_call(make_qr, repeat=args.rounds, number=10),
+            "old display path": time_call(old_path, repeat=args.rounds, number=10),
+            "encode + render_qr": time_call(new_path, repeat=args.rounds, number=10),
+            "render_qr cached": time_call(lambda: render_qr(URL, side), repeat=args.rounds, number=100),
+            "generate_qr_code": time_call(lambda: generate_qr_code(URL, path), repeat=args.rounds, number=10),
+        }
+    version = make_qr().version
+    print_table(f"QR version {version}, {len(URL)}-character URL, shown at {side}x{side}", rows)
+    versions = version_rows(parse_versions(args.versions), args.rounds)
+    print_table("module matrix -> PNG bytes, 10 px per module", versions)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
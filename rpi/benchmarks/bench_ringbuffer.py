@@ -0,0 +1,67 @@
+"""Compare list.pop(0) sample storage with SampleRing for the 100-sample window.
+
+Usage: python benchmarks/bench_ringbuffer.py
+
+Each step stores one burst of samples and hands the window to hrcalc as
+arrays, which is what HeartRateMonitor.run_sensor does per FIFO poll.
+"""
+from __future__ import annotations
+
+import sys
+import tracemalloc
+
+import numpy as np
+
+try:
+    from .common import print_table, time_call
+except ImportError:  # executed as a script
+    from common import print_table, time_call  # type: ignore
+
+from ringbuffer import SampleRing  # noqa: E402
+
+WINDOW = 100
+BURST = 4
+
+
+def main() -> int:
+    rng = np.random.default_rng(0)
+    ir_burst = rng.integers(0, 0x3FFFF, BURST)
+    red_burst = rng.integers(0, 0x3FFFF, BURST)
+
+    ir_data: list = []
+    red_data: list = []
+
+    def list_step():
+        for ir, red in zip(ir_burst.tolist(), red_burst.tolist()):
+            ir_data.append(ir)
+            red_data.append(red)
+        while len(ir_data) > WINDOW:
+            ir_data.pop(0)
+            red_data.pop(0)
+        return np.array(ir_data), np.array(red_data)
+
+    ring = SampleRing(WINDOW, channels=2)
+    block = np.stack([ir_burst, red_burst])
+
+    def ring_step():
+        ring.extend(block)
+        return ring.view()
+
+    rows = {}
+    for name, step in (("lists + np.array", list_step), ("SampleRing", ring_step)):
+        for _ in range(WINDOW):
+            step()
+        stats = time_call(step, number=2000)
+        tracemalloc.start()
+        for _ in range(1000):
+            step()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats["peak_alloc_bytes"] = float(peak)
+        rows[name] = stats
+    print_table(f"store {BURST} samples and expose the {WINDOW}-sample window", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Time from placing a finger to an accepted reading, thresholds against the stability detector.
+
+Usage: python benchmarks/bench_time_to_accept.py [--rounds N] [--speed N] [--scenarios a,b]
+
+Each row runs one ``BiometricScanner`` on the simulated sensors. Before a
+round the sensor sees no finger for a few seconds. The finger is placed
+just as the capture starts, like a patient pressing Start. Scenarios:
+
+* ``steady``: a clean 72 bpm / 97 % pulse;
+* ``settling``: the finger moves for its first 3 s, which puts spurious
+  valleys (and wrong rates) into the first windows;
+* ``weak``: low perfusion (about 0.7 %) with more noise;
+* ``no finger``: the finger is never placed.
+
+"thresholds" is the scanner with ``stability=None`` (HR > 25 and SpO2 > 70
+on the averaged values); "stability" uses ``StabilityDetector``. Times are
+in sensor seconds. The simulation runs ``--speed`` times faster and the
+scanner timeouts are scaled to match, so 45 s is the full timeout.
+``rerun_pct`` is the share of accepted readings more than 10 bpm or 3 %
+SpO2 off the simulated values, the ones staff would capture again.
+``fail_pct`` counts rounds that ended in a timeout or no-finger error.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+try:
+    from .common import print_table  # also sets up sys.path
+except ImportError:  # executed as a script
+    from common import print_table  # type: ignore
+
+from biometrics import BiometricScanner  # noqa: E402
+from signal_quality import StabilityDetector  # noqa: E402
+from simbus import FakeMAX30102Bus, FakeMLX90614, PPGWaveform, SensorBackend  # noqa: E402
+
+BPM, SPO2 = 72.0, 97.0
+TIMEOUT = 45.0  # sensor seconds, as in the kiosk
+NO_FINGER_TIMEOUT = 10.0
+
+
+class PatientWaveform(PPGWaveform):
+    """``PPGWaveform`` whose finger is placed on demand, optionally moving at first."""
+
+    def __init__(self, settle: float = 0.0, **kwargs) -> None:
+        super().__init__(bpm=BPM, spo2=SPO2, finger=False, **kwargs)
+        self.settle = settle
+        self._settle_until = 0
+
+    def place_finger(self) -> None:
+        self.finger = True
+        self._settle_until = self._t + int(self.settle * self.sample_rate)
+
+    def lift_finger(self) -> None:
+        self.finger = False
+
+    def next_samples(self, n: int):
+        first = self._t
+        red, ir = super().next_samples(n)
+        moving = first + np.arange(n) < self._settle_until
+        if self.finger and moving.any():
+            seconds = (first + np.arange(n)) / self.sample_rate
+            motion = np.sin(2 * np.pi * 1.7 * seconds) + 0.8 * np.sin(2 * np.pi * 0.9 * seconds + 0.5)
+            motion = np.where(moving, 3.0 * self.ir_ac * motion, 0.0)
+            ir = self._to_adc(ir + motion)
+            red = self._to_adc(red + motion * self.red_dc / self.ir_dc)
+        return red, ir
+
+
+SCENARIOS = {
+    "steady": {},
+    "settling": {"settle": 3.0},
+    "weak": {"ir_ac": 400.0, "noise": 60.0},
+    "no finger": None,
+}
+
+
+def run_row(scenario: str, gate: str, rounds: int, speed: float) -> dict:
+    options = SCENARIOS[scenario]
+    waveform = PatientWaveform(**(options or {}))
+    sensors = SensorBackend(
+        max30102_bus=FakeMAX30102Bus(waveform, speed=speed),
+        mlx=FakeMLX90614(),
+        speed=speed,
+    )
+    stability = None
+    if gate == "stability":
+        stability = lambda: StabilityDetector(no_finger_timeout=NO_FINGER_TIMEOUT / speed)  # noqa: E731
+    scanner = BiometricScanner(qr_output=None, logger=lambda message: None, sensors=sensors, stability=stability)
+    times, bpm_errors, spo2_errors, failures = [], [], [], 0
+    try:
+        for _ in range(rounds):
+            waveform.lift_finger()
+            time.sleep(5.0 / speed)  # the window fills with an empty sensor
+            if options is not None:
+                waveform.place_finger()
+            start = time.monotonic()
+            try:
+                reading = scanner.capture_once(timeout=TIMEOUT / speed)
+            except TimeoutError:  # includes NoFingerError
+                failures += 1
+                times.append((time.monotonic() - start) * speed)
+                continue
+            times.append((time.monotonic() - start) * speed)
+            bpm_errors.append(abs(reading.heart_rate - BPM))
+            spo2_errors.append(abs(reading.spo2 - SPO2))
+    finally:
+        scanner.shutdown()
+    bpm_errors, spo2_errors = np.asarray(bpm_errors), np.asarray(spo2_errors)
+    accepted = len(bpm_errors)
+    reruns = int(np.count_nonzero((bpm_errors > 10) | (spo2_errors > 3)))
+    return {
+        "mean_s": float(np.mean(times)),
+        "p90_s": float(np.percentile(times, 90)),
+        "bpm_error": float(bpm_errors.mean()) if accepted else float("nan"),
+        "spo2_error": float(spo2_errors.mean()) if accepted else float("nan"),
+        "rerun_pct": 100.0 * reruns / accepted if accepted else 0.0,
+        "fail_pct": 100.0 * failures / rounds,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=6, help="Captures per row")
+    parser.add_argument("--speed", type=float, default=4.0, help="Simulated sensor speed (1 = real time)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of the scenarios")
+    args = parser.parse_args()
+    for scenario in args.scenarios.split(","):
+        rows = {gate: run_row(scenario, gate, args.rounds, args.speed) for gate in ("thresholds", "stability")}
+        print_table(f"{scenario}: finger placed -> reading, {args.rounds} rounds at {args.speed:g}x", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Delay between a biometric reading becoming valid and the kiosk having its QR.
+
+Usage: python benchmarks/bench_time_to_qr.py [--rounds N] [--speed N]
+
+A ``BiometricScanner`` runs on the simulated sensors. In each round the
+reading is made to turn valid on a later heart-rate estimate, one to three
+ahead, and the time of that estimate is recorded when the monitor publishes
+it. "valid -> reading" is how long ``capture_async`` then takes to resolve,
+"valid -> QR" adds rendering the QR at the preview size as the kiosk does.
+"fixed 0.5 s poll" re-checks the sensors on a timer as ``capture_once`` did
+before it followed the monitor's updates; "update signal" is the current
+scanner. Both use the fixed thresholds (``stability=None``) with
+``_is_valid`` replaced, so only the wait is measured.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+try:
+    from .common import print_table  # also sets up sys.path
+except ImportError:  # executed as a script
+    from common import print_table  # type: ignore
+
+from biometrics import BiometricScanner, render_qr  # noqa: E402
+from simbus import SensorBackend  # noqa: E402
+
+
+class FixedPollScanner(BiometricScanner):
+    """The scanner with the old wait: sleep ``poll_interval`` between checks."""
+
+    def _wait_for_sensor(self, seen: int, timeout: float, poll_interval: float) -> int:
+        time.sleep(poll_interval)
+        return seen
+
+
+def measure(scanner: BiometricScanner, rounds: int, side: int, seed: int = 0) -> dict:
+    hrm = scanner.hrm
+    stamps = {}
+    notify = hrm._notify_update
+
+    def stamped_notify():
+        stamps[hrm.updates + 1] = time.perf_counter()  # before the waiters wake
+        notify()
+
+    hrm._notify_update = stamped_notify
+    rng = random.Random(seed)
+    to_reading, to_qr = [], []
+    for _ in range(rounds):
+        target = hrm.updates + rng.randint(1, 3)
+        scanner._is_valid = lambda *values, target=target: hrm.updates >= target
+        reading = scanner.capture_async(timeout=30).result()
+        done = time.perf_counter()
+        render_qr.cache_clear()  # the matrix is encoded by the scanner, the image is not
+        reading.qr_image(side)
+        rendered = time.perf_counter()
+        to_reading.append(done - stamps[target])
+        to_qr.append(rendered - stamps[target])
+    hrm._notify_update = notify
+    reading_ms, qr_ms = np.asarray(to_reading) * 1e3, np.asarray(to_qr) * 1e3
+    return {
+        "p50_ms": float(np.percentile(reading_ms, 50)),
+        "p95_ms": float(np.percentile(reading_ms, 95)),
+        "max_ms": float(reading_ms.max()),
+        "qr_p50_ms": float(np.percentile(qr_ms, 50)),
+        "rounds": rounds,
+    }
+
+
+def run(cls, speed: float, rounds: int, side: int) -> dict:
+    scanner = cls(
+        sensors=SensorBackend.simulated(speed=speed), qr_output=None, logger=lambda message: None, stability=None
+    )
+    try:
+        scanner.capture_once(timeout=60)  # sensors warmed up and a first estimate in
+        return measure(scanner, rounds, side)
+    finally:
+        scanner.shutdown()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20, help="Captures per row")
+    parser.add_argument("--speed", type=float, default=1.0, help="Simulated sensor speed (1 = real time)")
+    parser.add_argument("--side", type=int, default=640, help="Preview size the QR is rendered at")
+    args = parser.parse_args()
+    rows = {
+        "fixed 0.5 s poll": run(FixedPollScanner, args.speed, args.rounds, args.side),
+        "update signal": run(BiometricScanner, args.speed, args.rounds, args.side),
+    }
+    print_table(f"valid estimate -> reading, simulated sensors at {args.speed:g}x", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Cost of kiosk frame tracing (gui/frame_trace.py) per preview frame.
+
+Usage: python benchmarks/bench_trace.py [--side N] [--fps F]
+
+"trace only" is what ``kiosk_gui.py --trace`` adds to each frame: a new
+frame id, the eight stamps of one inferred frame and the box-age link.
+The staged path from bench_frame_path.py is then timed without and with
+those calls in place. Overhead is given relative to the untraced frame
+path and to the frame interval at ``--fps``; the kiosk is paced by the
+latter. Reading the percentiles (overlay refresh, ``--frame-stats``) is
+timed separately because it runs at most twice a second.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+try:
+    from .common import print_table, time_call
+    from .bench_frame_path import make_staged_path
+except ImportError:  # executed as a script
+    from common import print_table, time_call  # type: ignore
+    from bench_frame_path import make_staged_path  # type: ignore
+
+from frame_trace import FrameTrace  # noqa: E402  (path set up by common)
+
+
+def traced_frame(trace: FrameTrace) -> int:
+    frame_id = trace.begin()
+    for name in ("captured", "infer_start", "infer_end", "annotate"):
+        trace.stamp(frame_id, name)
+    trace.boxes_from(frame_id, frame_id)
+    for name in ("handoff", "render", "shown"):
+        trace.stamp(frame_id, name)
+    return frame_id
+
+
+def make_traced_path(side: int, trace: FrameTrace):
+    step = make_staged_path(side)
+
+    def traced() -> object:
+        traced_frame(trace)
+        return step()
+
+    return traced
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--side", type=int, default=640, help="Square preview size")
+    parser.add_argument("--fps", type=float, default=14.0, help="Preview frame rate for the budget column")
+    args = parser.parse_args()
+    budget_us = 1e6 / args.fps
+
+    trace = FrameTrace()
+    only = time_call(lambda: traced_frame(trace), repeat=5, number=2000)
+    plain = time_call(make_staged_path(args.side), repeat=7, number=50)
+    traced = time_call(make_traced_path(args.side, FrameTrace()), repeat=7, number=50)
+    rows = {
+        "trace only": {"median_us": only["median_us"], "pct_of_path": 100 * only["median_us"] / plain["median_us"]},
+        "staged path": {"median_us": plain["median_us"], "pct_of_path": 100.0},
+        "staged path + trace": {
+            "median_us": traced["median_us"],
+            "pct_of_path": 100 * traced["median_us"] / plain["median_us"],
+        },
+    }
+    for row in rows.values():
+        row["pct_of_frame"] = 100 * row["median_us"] / budget_us
+    print_table(f"per frame, {args.side}x{args.side} preview at {args.fps:g} fps", rows)
+
+    report = time_call(trace.report, repeat=5, number=20)
+    print_table("reading percentiles", {"report()": {"median_us": report["median_us"]}})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
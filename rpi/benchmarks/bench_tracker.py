@@ -0,0 +1,131 @@
+"""Scaling of StickyTracker.update from 1 to 200 boxes.
+
+Usage: python benchmarks/bench_tracker.py [--sizes 1,5,...] [--rounds N]
+
+Each round feeds the tracker a scene of N boxes and then the same boxes
+jittered by a few pixels, so every track has to be re-matched. The
+vectorized tracker (IoU matrix + Hungarian when SciPy is installed, greedy
+otherwise; a Python loop up to ``tracker.SMALL_MATCH`` pairs) is compared
+with the old dict-of-dicts tracker, which scored every track x detection
+pair with a scalar ``iou()`` in nested loops. The number of re-matched
+tracks is reported for both; the old greedy-in-dict-order matching can
+lose pairs that optimal matching keeps.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+try:
+    from .common import print_table, time_call
+except ImportError:  # executed as a script
+    from common import print_table, time_call  # type: ignore
+
+import tracker  # noqa: E402  (path set up by common)
+
+
+def scalar_iou(boxA, boxB):
+    xA = max(boxA[0], boxB[0])
+    yA = max(boxA[1], boxB[1])
+    xB = min(boxA[2], boxB[2])
+    yB = min(boxA[3], boxB[3])
+    interArea = max(0, xB - xA) * max(0, yB - yA)
+    boxAArea = max(0, boxA[2] - boxA[0]) * max(0, boxA[3] - boxA[1])
+    boxBArea = max(0, boxB[2] - boxB[0]) * max(0, boxB[3] - boxB[1])
+    denom = float(boxAArea + boxBArea - interArea)
+    return interArea / denom if denom > 0 else 0.0
+
+
+class DictTracker:
+    """The StickyTracker that used to live in yolo_detect_lite.py."""
+
+    def __init__(self, iou_threshold=0.3, max_age=1.0):
+        self.next_id = 1
+        self.tracks = {}
+        self.iou_th = iou_threshold
+        self.max_age = max_age
+
+    def update(self, detections):
+        now = time.time()
+        new_tracks = {}
+        used_new = set()
+        for tid, t in list(self.tracks.items()):
+            best_iou, best_j = 0.0, None
+            for j, det in enumerate(detections):
+                if j in used_new:
+                    continue
+                val = scalar_iou(t['bbox'], det['bbox'])
+                if val > best_iou:
+                    best_iou, best_j = val, j
+            if best_j is not None and best_iou >= self.iou_th:
+                det = detections[best_j]
+                new_tracks[tid] = {'bbox': det['bbox'], 'class': det['class'], 'conf': det['conf'], 'last_seen': now}
+                used_new.add(best_j)
+            elif now - t['last_seen'] <= self.max_age:
+                new_tracks[tid] = t
+        for j, det in enumerate(detections):
+            if j not in used_new:
+                new_tracks[self.next_id] = {'bbox': det['bbox'], 'class': det['class'], 'conf': det['conf'], 'last_seen': now}
+                self.next_id += 1
+        self.tracks = new_tracks
+
+
+def make_scene(rng: np.random.Generator, count: int, side: int = 1280):
+    """``count`` face-sized boxes, often overlapping as in a crowded waiting area, and a jittered copy."""
+    xy = rng.uniform(0, side - 120, (count, 2))
+    wh = rng.uniform(40, 120, (count, 2))
+    boxes = np.hstack((xy, xy + wh)).round()
+    moved = (boxes + rng.normal(0, 4, boxes.shape)).round()
+
+    def as_dets(b):
+        return [
+            {'bbox': tuple(int(v) for v in row), 'class': 'with_mask' if i % 3 else 'without_mask', 'conf': 0.8}
+            for i, row in enumerate(b.tolist())
+        ]
+
+    return as_dets(boxes), as_dets(moved)
+
+
+def rematched(next_id: int, count: int) -> int:
+    """Tracks carried over by the second update, from how many new ids it had to hand out."""
+    return count - (next_id - 1 - count)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,5,10,25,50,100,200", help="Comma-separated box counts")
+    parser.add_argument("--rounds", type=int, default=5, help="Timing rounds per size")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    matchers = ["greedy"] + (["hungarian"] if tracker.linear_sum_assignment is not None else [])
+    if len(matchers) == 1:
+        print("scipy not installed: hungarian matching skipped")
+
+    for count in (int(s) for s in args.sizes.split(",")):
+        first, second = make_scene(rng, count)
+        factories = {"dict tracker (old)": DictTracker}
+        for name in matchers:
+            factories[f"array tracker ({name})"] = lambda name=name: tracker.StickyTracker(matcher=name)
+        rows = {}
+        for label, factory in factories.items():
+            def step(factory=factory):
+                trk = factory()
+                trk.update(first)
+                trk.update(second)
+                return trk
+
+            number = max(1, 200 // count)
+            timing = time_call(step, repeat=args.rounds, number=number)
+            rows[label] = {
+                "median_us": timing["median_us"],
+                "rematched": rematched(step().next_id, count),
+            }
+        print_table(f"{count} boxes, two updates", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
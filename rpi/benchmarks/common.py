@@ -0,0 +1,66 @@
+"""Shared helpers for the rpi benchmark scripts.
+
+When ``RPI_BENCH_RESULTS`` names a file (``suite.py`` sets it for each
+script it runs), every table passed to ``print_table`` is also written there
+as JSON when the script exits.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+RPI_DIR = Path(__file__).resolve().parents[1]
+QRGEN_DIR = RPI_DIR / "qrgen"
+GUI_DIR = RPI_DIR / "gui"
+YOLO_DIR = RPI_DIR / "yolo"
+RESULTS_ENV = "RPI_BENCH_RESULTS"
+
+# the rpi folders are plain script directories, mirror what kiosk_gui.py does
+for _path in (QRGEN_DIR, YOLO_DIR, GUI_DIR):
+    if str(_path) not in sys.path:
+        sys.path.append(str(_path))
+
+
+def time_call(fn: Callable[[], Any], repeat: int = 5, number: int = 100) -> Dict[str, float]:
+    """Time ``fn`` ``number`` times per round and summarise the per-call cost in microseconds."""
+    fn()  # warm caches / lazy imports outside the timed region
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "best_us": min(rounds),
+        "median_us": statistics.median(rounds),
+        "calls_per_s": 1e6 / min(rounds),
+    }
+
+
+# title -> row -> metric, for RESULTS_ENV
+TABLES: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+
+def _write_tables(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(TABLES, fh, indent=1)
+
+
+def record_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    if not TABLES and os.environ.get(RESULTS_ENV):
+        atexit.register(_write_tables, os.environ[RESULTS_ENV])
+    TABLES[title] = {name: {key: float(value) for key, value in stats.items()} for name, stats in rows.items()}
+
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    record_table(title, rows)
+    print(title)
+    for name, stats in rows.items():
+        cells = "  ".join(f"{key}={value:,.2f}" for key, value in stats.items())
+        print(f"  {name:<28} {cells}")
@@ -0,0 +1,281 @@
+"""Run the rpi benchmarks as one suite and compare results between runs.
+
+Usage:
+    python benchmarks/suite.py run [--quick] [--only NAMES] [--output FILE]
+    python benchmarks/suite.py compare BASELINE.json CURRENT.json [--threshold PCT]
+
+``run`` starts each benchmark script in its own interpreter, with simulated
+sensors, synthetic frames and in-memory buses, so no Pi hardware is needed.
+``--quick`` uses smaller sizes and shorter durations. Every table a script
+prints is collected into one JSON file (``bench-<host>-<time>.json`` by
+default), together with the machine, Python and library versions and the
+git commit. Scripts that need something missing here are reported as
+skipped: ``display`` needs an X display, and the end-to-end detector rows
+need ncnn or Ultralytics.
+
+``compare`` matches tables, rows and metrics by name and lists every
+metric that moved by more than ``--threshold`` percent. Times and copied
+bytes should go down; rates should go up. It exits 1 if anything
+regressed. Only compare runs from the same machine and with the same
+``--quick`` setting.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import importlib.metadata
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    from .common import RESULTS_ENV, RPI_DIR
+except ImportError:  # executed as a script
+    from common import RESULTS_ENV, RPI_DIR  # type: ignore
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+
+class Benchmark(NamedTuple):
+    script: str
+    args: Tuple[str, ...] = ()
+    quick: Tuple[str, ...] = ()  # replaces ``args`` with --quick
+    needs_display: bool = False
+
+
+SUITE: Dict[str, Benchmark] = {
+    "hrcalc": Benchmark("bench_hrcalc.py", (), ("--windows", "300")),
+    "ringbuffer": Benchmark("bench_ringbuffer.py"),
+    "max30102": Benchmark("bench_max30102.py", (), ("--samples", "620")),
+    "capture": Benchmark("bench_capture.py", (), ("--seconds", "2")),
+    "isolation": Benchmark("bench_isolation.py", (), ("--seconds", "3")),
+    "qr": Benchmark("bench_qr.py", (), ("--rounds", "3")),
+    "time_to_qr": Benchmark("bench_time_to_qr.py", (), ("--rounds", "5", "--speed", "2")),
+    "time_to_accept": Benchmark("bench_time_to_accept.py", (), ("--rounds", "2")),
+    "kiosk_load": Benchmark(
+        "bench_kiosk_load.py",
+        ("--minutes", "10", "--speed", "4"),
+        ("--minutes", "5", "--rates", "30,90", "--speed", "4"),
+    ),
+    "detector": Benchmark("bench_detector.py", ("--backends=ncnn,ultralytics",), ("--backends=",)),
+    "tracker": Benchmark("bench_tracker.py", (), ("--sizes", "1,10,50,200", "--rounds", "3")),
+    "frame_path": Benchmark("bench_frame_path.py", (), ("--frames", "10")),
+    "trace": Benchmark("bench_trace.py"),
+    "prefetch": Benchmark("bench_prefetch.py", (), ("--frames", "60")),
+    "display": Benchmark("bench_display.py", (), ("--frames", "60"), needs_display=True),
+}
+
+# metric name -> +1 if higher is better, -1 if lower is better; others are informational
+HIGHER_IS_BETTER = ("calls_per_s", "frames_per_s", "samples_per_s", "fps", "patients_per_hour")
+LOWER_IS_BETTER_SUFFIXES = ("_us", "_ms", "_s", "_kb", "_mb", "_pct", "_per_sample")
+LOWER_IS_BETTER = ("missed_samples", "wakeups_per_s", "load_s")
+
+
+def metric_direction(name: str) -> int:
+    if name in HIGHER_IS_BETTER:
+        return 1
+    if name in LOWER_IS_BETTER or name.endswith(LOWER_IS_BETTER_SUFFIXES) or name.startswith("pct_"):
+        return -1
+    return 0
+
+
+def _version(module: str) -> Optional[str]:
+    try:
+        imported = __import__(module)
+    except Exception:
+        return None
+    try:
+        return getattr(imported, "__version__", None) or importlib.metadata.version(module)
+    except importlib.metadata.PackageNotFoundError:
+        return "installed"
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        return Path(path).read_text(encoding="utf-8", errors="replace").strip("\x00\n ")
+    except OSError:
+        return None
+
+
+def machine_metadata() -> Dict[str, object]:
+    """Where and on what the suite ran, so results are only compared like for like."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RPI_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "created": _dt.datetime.now().isoformat(timespec="seconds"),
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        # e.g. "Raspberry Pi 5 Model B Rev 1.0"; None off the Pi
+        "board": _read_text("/proc/device-tree/model"),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "libraries": {name: _version(name) for name in ("numpy", "cv2", "PIL", "qrcode", "scipy", "ncnn")},
+        "git_commit": commit,
+    }
+
+
+def run_one(bench: Benchmark, quick: bool, timeout: float) -> Dict[str, object]:
+    if bench.needs_display and not os.environ.get("DISPLAY"):
+        return {"status": "skipped", "reason": "no display"}
+    args = bench.quick if quick else bench.args
+    with tempfile.TemporaryDirectory() as tmp:
+        results = Path(tmp) / "tables.json"
+        env = dict(os.environ, **{RESULTS_ENV: str(results)})
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run(
+                [sys.executable, str(BENCH_DIR / bench.script), *args],
+                capture_output=True,
+                text=True,
+                env=env,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return {"status": "failed", "reason": f"timed out after {timeout:.0f} s", "args": list(args)}
+        seconds = time.perf_counter() - start
+        tables = json.loads(results.read_text(encoding="utf-8")) if results.exists() else {}
+    entry: Dict[str, object] = {
+        "status": "ok" if proc.returncode == 0 else "failed",
+        "args": list(args),
+        "seconds": round(seconds, 2),
+        "tables": tables,
+    }
+    if proc.returncode != 0:
+        lines = (proc.stderr.strip() or proc.stdout.strip()).splitlines()
+        entry["reason"] = f"exit code {proc.returncode}: {lines[-1] if lines else ''}"
+    return entry
+
+
+def run_suite(names: Sequence[str], quick: bool, timeout: float) -> Dict[str, object]:
+    benchmarks: Dict[str, object] = {}
+    for name in names:
+        print(f"[{name}] running {SUITE[name].script}...", flush=True)
+        entry = run_one(SUITE[name], quick, timeout)
+        if entry["status"] == "ok":
+            print(f"[{name}] {len(entry['tables'])} table(s) in {entry['seconds']:.1f} s")
+        else:
+            print(f"[{name}] {entry['status']}: {entry.get('reason', '')}")
+        benchmarks[name] = entry
+    return {"metadata": {**machine_metadata(), "quick": quick}, "benchmarks": benchmarks}
+
+
+class Change(NamedTuple):
+    benchmark: str
+    table: str
+    row: str
+    metric: str
+    baseline: float
+    current: float
+    pct: float  # signed change, positive is worse
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> Tuple[List[Change], List[Change]]:
+    """(regressions, improvements) larger than ``threshold`` percent."""
+    regressions: List[Change] = []
+    improvements: List[Change] = []
+    for bench, base_entry in baseline.get("benchmarks", {}).items():
+        cur_entry = current.get("benchmarks", {}).get(bench)
+        if not cur_entry:
+            continue
+        for title, base_rows in base_entry.get("tables", {}).items():
+            cur_rows = cur_entry.get("tables", {}).get(title, {})
+            for row, base_metrics in base_rows.items():
+                for metric, base in base_metrics.items():
+                    direction = metric_direction(metric)
+                    cur = cur_rows.get(row, {}).get(metric)
+                    if direction == 0 or cur is None or (base == 0 and cur == 0):
+                        continue
+                    worse = (base - cur) * direction  # > 0 when it got worse
+                    pct = 100.0 * worse / abs(base) if base else float("inf")
+                    change = Change(bench, title, row, metric, base, cur, pct)
+                    if pct > threshold:
+                        regressions.append(change)
+                    elif pct < -threshold:
+                        improvements.append(change)
+    return regressions, improvements
+
+
+def print_changes(label: str, changes: List[Change]) -> None:
+    if not changes:
+        return
+    print(label)
+    for change in sorted(changes, key=lambda c: -abs(c.pct)):
+        print(
+            f"  {change.benchmark:<11} {change.table[:40]:<40} {change.row[:28]:<28} {change.metric:<16} "
+            f"{change.baseline:12,.2f} -> {change.current:12,.2f} ({abs(change.pct):.0f}% "
+            f"{'worse' if change.pct > 0 else 'better'})"
+        )
+
+
+def _load(path: str) -> Dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    names = args.only.split(",") if args.only else list(SUITE)
+    unknown = [name for name in names if name not in SUITE]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)} (choose from {', '.join(SUITE)})")
+        return 2
+    result = run_suite(names, args.quick, args.timeout)
+    output = args.output
+    if output is None:
+        stamp = _dt.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = f"bench-{socket.gethostname()}-{stamp}.json"
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(result, fh, indent=1)
+    print(f"results written to {output}")
+    failed = [name for name, entry in result["benchmarks"].items() if entry["status"] == "failed"]
+    if failed:
+        print(f"failed: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    baseline, current = _load(args.baseline), _load(args.current)
+    for key in ("machine", "board", "cpu_count", "python", "quick"):
+        before, after = baseline["metadata"].get(key), current["metadata"].get(key)
+        if before != after:
+            print(f"Warning: {key} differs ({before} vs {after}), timings may not be comparable")
+    regressions, improvements = compare_results(baseline, current, args.threshold)
+    print_changes(f"regressions over {args.threshold:g}%:", regressions)
+    print_changes(f"improvements over {args.threshold:g}%:", improvements)
+    if not (regressions or improvements):
+        print(f"no metric moved by more than {args.threshold:g}%")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Run the suite and write a JSON result file")
+    run.add_argument("--quick", action="store_true", help="Smaller sizes and shorter runs")
+    run.add_argument("--only", help=f"Comma-separated subset of: {', '.join(SUITE)}")
+    run.add_argument("--output", help="Result file (default: bench-<host>-<time>.json)")
+    run.add_argument("--timeout", type=float, default=600.0, help="Seconds allowed per benchmark")
+    run.set_defaults(func=cmd_run)
+    compare = commands.add_parser("compare", help="Flag metrics that regressed between two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=10.0, help="Percent change that counts")
+    compare.set_defaults(func=cmd_compare)
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
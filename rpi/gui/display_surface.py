@@ -0,0 +1,79 @@
+"""A Tk photo image that is allocated once and updated in place for every video frame.
+
+Creating an ``ImageTk.PhotoImage`` per frame allocates a new Tk image, makes
+the canvas switch to it and frees the old one, 14 times a second. A
+``PhotoSurface`` keeps one photo of the preview size on the canvas and writes
+new pixels into it:
+
+* ``"ppm"``: the RGB frame is prefixed with a binary PPM (P6) header and handed
+  to Tk's photo ``configure -data``, which decodes it straight into the
+  existing image without going through PIL;
+* ``"paste"``: the frame is loaded into a persistent PIL image and blitted with
+  ``ImageTk.PhotoImage.paste``.
+"""
+from __future__ import annotations
+
+import tkinter as tk
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageTk
+
+MODES = ("ppm", "paste")
+
+
+class PhotoSurface:
+    """One persistent canvas image of ``size`` that frames are written into."""
+
+    def __init__(
+        self,
+        canvas: tk.Canvas,
+        size: Tuple[int, int],
+        center: Tuple[int, int],
+        mode: str = "ppm",
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown display mode '{mode}' (choose from {', '.join(MODES)})")
+        self.canvas = canvas
+        self.size = size
+        self.mode = mode
+        width, height = size
+        self._header = f"P6 {width} {height} 255\n".encode("ascii")
+        self._pil: Optional[Image.Image] = None
+        if mode == "paste":
+            self.photo = ImageTk.PhotoImage("RGB", size, width=width, height=height)
+            self._pil = Image.new("RGB", size)
+        else:
+            self.photo = tk.PhotoImage(master=canvas, width=width, height=height)
+        self.item = canvas.create_image(center[0], center[1], image=self.photo, state="hidden")
+        self.frames = 0
+
+    def show_frame(self, frame: np.ndarray) -> None:
+        """Display an (h, w, 3) uint8 RGB frame of exactly ``size``."""
+        if frame.shape[1::-1] != self.size:
+            raise ValueError(f"frame is {frame.shape[1]}x{frame.shape[0]}, surface is {self.size[0]}x{self.size[1]}")
+        frame = np.ascontiguousarray(frame)
+        if self.mode == "paste":
+            self._pil.frombytes(frame)
+            self.photo.paste(self._pil)
+        else:
+            # one copy into the PPM bytes; Tk decodes into the existing photo
+            self.photo.configure(data=b"".join((self._header, memoryview(frame).cast("B"))), format="PPM")
+        self._shown()
+
+    def show_image(self, image: Image.Image) -> None:
+        """Display a PIL image, resized to the surface if needed (QR codes, messages)."""
+        if image.size != self.size:
+            image = image.resize(self.size, Image.Resampling.LANCZOS)
+        self.show_frame(np.asarray(image.convert("RGB")))
+
+    def _shown(self) -> None:
+        self.frames += 1
+        if self.canvas.itemcget(self.item, "state") != "normal":
+            self.canvas.itemconfigure(self.item, state="normal")
+
+    def hide(self) -> None:
+        self.canvas.itemconfigure(self.item, state="hidden")
+
+
+__all__ = ["MODES", "PhotoSurface"]
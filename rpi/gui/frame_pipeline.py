@@ -0,0 +1,230 @@
+"""Preallocated frame buffers, per-stage accounting and inference gating for the kiosk preview.
+
+``TripleBuffer`` lets the camera thread write frame N+1 while the Tk thread
+displays frame N without either side copying or blocking: the producer always
+owns one slot, the consumer owns another and the third holds the newest
+finished frame. ``FramePathStats`` records how long each stage of the frame
+path takes and how many bytes it copies, so regressions to extra full-frame
+copies show up in ``kiosk_gui.py --frame-stats``. ``MotionGate`` decides
+when a frame is worth running the detector on.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class TripleBuffer:
+    """Three preallocated frames shared by one producer and one consumer.
+
+    The producer fills ``write_slot()`` and calls ``publish()``; the consumer
+    calls ``latest()`` and may use the returned array until its next
+    ``latest()`` call. Only slot indices are swapped under the lock, so it
+    also serves as a size-1, latest-frame-wins queue between two threads:
+    ``wait()`` blocks the consumer until something new is published. An
+    integer ``tag`` (the frame id when tracing) travels with each slot.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype=np.uint8) -> None:
+        self.slots = [np.zeros(shape, dtype=dtype) for _ in range(3)]
+        self.tags = [0, 0, 0]
+        self._write, self._ready, self._read = 0, 1, 2
+        self._fresh = False
+        self._published = False
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self.published = 0
+        self.dropped = 0  # frames overwritten before the consumer saw them
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.slots[0].shape
+
+    def write_slot(self) -> np.ndarray:
+        return self.slots[self._write]
+
+    def publish(self, tag: int = 0) -> None:
+        with self._lock:
+            self.tags[self._write] = tag
+            if self._fresh:
+                self.dropped += 1
+            self._write, self._ready = self._ready, self._write
+            self._fresh = True
+            self._published = True
+            self.published += 1
+            self._cond.notify_all()
+
+    def latest(self) -> Optional[np.ndarray]:
+        """Newest published frame (None before the first one)."""
+        with self._lock:
+            if not self._published:
+                return None
+            if self._fresh:
+                self._read, self._ready = self._ready, self._read
+                self._fresh = False
+            return self.slots[self._read]
+
+    @property
+    def tag(self) -> int:
+        """Tag of the frame last returned by ``latest()``."""
+        return self.tags[self._read]
+
+    def has_new(self) -> bool:
+        return self._fresh
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until an unread frame is published; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._fresh, timeout)
+
+
+class FramePathStats:
+    """Time and bytes copied per frame-path stage, safe to update from several threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}
+        self.started = time.perf_counter()
+
+    def add(self, stage: str, seconds: float, nbytes: int = 0) -> None:
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += nbytes
+
+    @contextmanager
+    def stage(self, name: str, nbytes: int = 0) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, nbytes)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            stages = {name: list(entry) for name, entry in self._stages.items()}
+        return {
+            name: {
+                "calls": calls,
+                "avg_ms": seconds / max(1, calls) * 1e3,
+                "kb_copied_per_call": nbytes / max(1, calls) / 1024,
+            }
+            for name, (calls, seconds, nbytes) in stages.items()
+        }
+
+    def rates(self) -> Dict[str, float]:
+        """Calls per second of each stage since the last reset."""
+        elapsed = max(1e-9, time.perf_counter() - self.started)
+        with self._lock:
+            return {name: entry[0] / elapsed for name, entry in self._stages.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self.started = time.perf_counter()
+
+    def report(self) -> str:
+        elapsed = max(1e-9, time.perf_counter() - self.started)
+        lines = [f"{'stage':<18} {'calls/s':>8} {'avg ms':>8} {'KB copied':>10}"]
+        for name, row in self.snapshot().items():
+            lines.append(
+                f"{name:<18} {row['calls'] / elapsed:8.1f} {row['avg_ms']:8.2f} {row['kb_copied_per_call']:10.0f}"
+            )
+        return "\n".join(lines)
+
+
+class MotionGate:
+    """Adaptive inference rate driven by a cheap motion score.
+
+    The score is the mean absolute difference of a strided, downscaled green
+    channel (a luma stand-in) between consecutive frames, on a 0-255 scale.
+    While the score is above ``threshold``, or the last inference found
+    something, the detector may run at ``max_fps``; ``hold`` seconds after
+    the scene went quiet it drops to ``min_fps``. A fixed rate is
+    ``min_fps == max_fps``.
+
+    ``runs`` counts inferences, ``skipped`` counts the ``max_fps`` slots in
+    which the gate held inference back.
+    """
+
+    def __init__(
+        self,
+        min_fps: float = 0.2,
+        max_fps: float = 4.0,
+        threshold: float = 3.0,
+        hold: float = 2.0,
+        grid: int = 64,
+    ) -> None:
+        self.min_interval = 1.0 / max(1e-3, min(min_fps, max_fps))
+        self.max_interval = 1.0 / max(1e-3, max_fps)
+        self.threshold = threshold
+        self.hold = hold
+        self.grid = grid
+        self.score = 0.0
+        self.runs = 0
+        self.skipped = 0
+        self._prev: Optional[np.ndarray] = None
+        self._small: Optional[np.ndarray] = None
+        self._last_run = float("-inf")
+        self._last_slot = float("-inf")
+        self._active_until = float("-inf")
+
+    @property
+    def fixed(self) -> bool:
+        return self.min_interval == self.max_interval
+
+    def motion_score(self, frame: np.ndarray) -> float:
+        step_y = max(1, frame.shape[0] // self.grid)
+        step_x = max(1, frame.shape[1] // self.grid)
+        small = frame[::step_y, ::step_x, 1]
+        if self._small is None or self._small.shape != small.shape:
+            self._small = np.empty(small.shape, dtype=np.int16)
+            self._prev = None
+        np.copyto(self._small, small)
+        if self._prev is None:
+            self._prev = self._small.copy()
+            return 0.0
+        score = float(np.abs(self._small - self._prev).mean())
+        self._prev, self._small = self._small, self._prev
+        return score
+
+    def should_run(self, frame: np.ndarray, now: float, tracking: bool = False) -> bool:
+        """Whether to run inference on ``frame``; call once per captured frame."""
+        if not self.fixed:
+            self.score = self.motion_score(frame)
+            if self.score >= self.threshold or tracking:
+                self._active_until = now + self.hold
+        interval = self.max_interval if now < self._active_until else self.min_interval
+        run = now - self._last_run >= interval
+        if now - self._last_slot >= self.max_interval:
+            self._last_slot = now
+            if not run:
+                self.skipped += 1
+        if run:
+            self.runs += 1
+            self._last_run = now
+            self._last_slot = now
+        return run
+
+    def report(self) -> str:
+        total = self.runs + self.skipped
+        return (
+            f"inference: {self.runs} run, {self.skipped} skipped "
+            f"({100.0 * self.skipped / max(1, total):.0f}% of max-rate slots), motion {self.score:.1f}"
+        )
+
+
+def center_square(frame: np.ndarray) -> np.ndarray:
+    """Centered square view of ``frame`` (no copy)."""
+    h, w = frame.shape[:2]
+    side = min(h, w)
+    y0, x0 = (h - side) // 2, (w - side) // 2
+    return frame[y0:y0 + side, x0:x0 + side]
+
+
+__all__ = ["FramePathStats", "MotionGate", "TripleBuffer", "center_square"]
@@ -0,0 +1,225 @@
+"""Per-frame latency tracing for the kiosk preview, from camera to Tk photo.
+
+A ``FrameTrace`` hands out an id for every captured frame and stamps it with
+``time.perf_counter()`` as it moves through ``InferenceWorker``:
+
+* ``capture``: the camera handed the frame over (exposure ends at most one
+  frame interval earlier) and ``captured``: converted into the preview buffer;
+* ``infer_start`` / ``infer_end``: the detector ran on it (gated frames only);
+* ``annotate`` / ``handoff``: the render thread picked it up, drew the newest
+  boxes and published it for Tk;
+* ``render`` / ``shown``: the Tk thread started and finished writing it into
+  the preview photo.
+
+When a frame's last stamp of a stage arrives, the spans in ``SPANS`` are
+added to one ``LatencyWindow`` each, holding the last ``window`` samples.
+The p50/p95/p99 are only computed when read: for the on-screen overlay, the
+``--frame-stats`` report or a JSON snapshot. The stamps of the last
+``capacity`` frames are also kept, for export as a Chrome trace
+(chrome://tracing or https://ui.perfetto.dev) with one row per thread.
+
+Recording a stamp is a clock read and a few list stores. Each span is
+only ever written by one thread, so nothing is locked; a report read while
+a frame is half-stamped may be one sample behind.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+STAMPS = ("capture", "captured", "infer_start", "infer_end", "annotate", "handoff", "render", "shown")
+_COLUMN = {name: idx for idx, name in enumerate(STAMPS)}
+NAN = float("nan")
+_EMPTY = [NAN] * len(STAMPS)
+
+# span name -> (from stamp, to stamp); recorded when the "to" stamp is made
+SPANS: Dict[str, Tuple[str, str]] = {
+    "capture": ("capture", "captured"),
+    "infer queue": ("captured", "infer_start"),
+    "inference": ("infer_start", "infer_end"),
+    "render queue": ("captured", "annotate"),
+    "annotate": ("annotate", "handoff"),
+    "display queue": ("handoff", "render"),
+    "tk render": ("render", "shown"),
+    "photon to pixel": ("capture", "shown"),
+}
+# "box age" is also recorded at "shown": how old the frame the drawn boxes came from is
+BOX_AGE = "box age"
+
+# one row per thread in the Chrome trace: (row name, start stamp, end stamp)
+TRACE_ROWS = (
+    ("kiosk-capture", "capture", "captured"),
+    ("kiosk-inference", "infer_start", "infer_end"),
+    ("kiosk-render", "annotate", "handoff"),
+    ("tk", "render", "shown"),
+)
+
+
+class LatencyWindow:
+    """The last ``size`` samples of one span, in seconds; percentiles are computed on read."""
+
+    def __init__(self, size: int = 512) -> None:
+        # a plain list: storing a Python float in it is several times cheaper than in an ndarray
+        self.samples = [0.0] * size
+        self.count = 0  # total samples ever added
+
+    def add(self, seconds: float) -> None:
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+
+    def values(self) -> np.ndarray:
+        return np.asarray(self.samples[: min(self.count, len(self.samples))])
+
+    def summary(self) -> Dict[str, float]:
+        values = self.values()
+        if not len(values):
+            return {"samples": 0}
+        p50, p95, p99 = np.percentile(values, (50, 95, 99)) * 1e3
+        return {
+            "samples": int(len(values)),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(values.max() * 1e3),
+        }
+
+
+class FrameTrace:
+    """Frame ids, per-frame stamps and rolling span percentiles; see the module docstring."""
+
+    def __init__(self, capacity: int = 1024, window: int = 512, clock=time.perf_counter) -> None:
+        self.clock = clock
+        self.t0 = clock()
+        self.capacity = capacity
+        # per-frame rows in lists for the same reason; NaN marks a missing stamp
+        self._stamps = [[NAN] * len(STAMPS) for _ in range(capacity)]
+        self._ids = [-1] * capacity  # which frame owns each row
+        self._boxes_from = [-1] * capacity
+        self._next_id = itertools.count(1)
+        self.spans: Dict[str, LatencyWindow] = {name: LatencyWindow(window) for name in (*SPANS, BOX_AGE)}
+        # stamp name -> (its column, (window, start column) of each span ending there)
+        self._ends: Dict[str, Tuple[int, Tuple[Tuple[LatencyWindow, int], ...]]] = {
+            name: (
+                column,
+                tuple((self.spans[span], _COLUMN[first]) for span, (first, last) in SPANS.items() if last == name),
+            )
+            for name, column in _COLUMN.items()
+        }
+
+    def begin(self, timestamp: Optional[float] = None) -> int:
+        """New frame id, stamped ``capture`` at ``timestamp`` (now if None)."""
+        frame_id = next(self._next_id)
+        row = frame_id % self.capacity
+        stamps = self._stamps[row]
+        stamps[:] = _EMPTY
+        stamps[0] = self.clock() if timestamp is None else timestamp
+        self._boxes_from[row] = -1
+        self._ids[row] = frame_id
+        return frame_id
+
+    def stamp(self, frame_id: int, name: str, timestamp: Optional[float] = None) -> None:
+        """Stamp ``name`` on a frame and record the spans ending there."""
+        row = frame_id % self.capacity
+        if self._ids[row] != frame_id:
+            return  # untraced (id 0), or overwritten by a newer frame
+        now = self.clock() if timestamp is None else timestamp
+        stamps = self._stamps[row]
+        column, ends = self._ends[name]
+        stamps[column] = now
+        for window, first in ends:
+            start = stamps[first]
+            if start == start:  # not NaN
+                window.add(now - start)
+        if name == "shown":
+            source = self._boxes_from[row]
+            if source > 0 and self._ids[source % self.capacity] == source:
+                self.spans[BOX_AGE].add(now - self._stamps[source % self.capacity][0])
+
+    def boxes_from(self, frame_id: int, source_id: int) -> None:
+        """Note that the boxes drawn on ``frame_id`` were detected on ``source_id``."""
+        row = frame_id % self.capacity
+        if frame_id > 0 and self._ids[row] == frame_id:
+            self._boxes_from[row] = source_id
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: window.summary() for name, window in self.spans.items()}
+
+    def report(self) -> str:
+        lines = [f"{'span':<16} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'samples':>8}"]
+        for name, row in self.summary().items():
+            if row["samples"]:
+                lines.append(
+                    f"{name:<16} {row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['samples']:8d}"
+                )
+        return "\n".join(lines)
+
+    def overlay_lines(self, names: Iterable[str] = ("photon to pixel", "box age", "inference")) -> List[str]:
+        """Short p50/p95/p99 lines for drawing on the preview."""
+        lines = []
+        for name in names:
+            row = self.spans[name].summary()
+            if row["samples"]:
+                lines.append(f"{name} {row['p50_ms']:.0f}/{row['p95_ms']:.0f}/{row['p99_ms']:.0f} ms")
+        return lines
+
+    def frames(self) -> List[Tuple[int, List[float]]]:
+        """(frame id, stamps) of the retained frames, oldest first."""
+        rows = sorted((frame_id, row) for row, frame_id in enumerate(self._ids) if frame_id > 0)
+        return [(frame_id, list(self._stamps[row])) for frame_id, row in rows]
+
+    def snapshot(self) -> Dict[str, object]:
+        """JSON-ready percentiles per span plus the stamps of the retained frames (ms since start)."""
+        frames = []
+        for frame_id, stamps in self.frames():
+            frames.append(
+                {
+                    "id": frame_id,
+                    **{
+                        name: round((value - self.t0) * 1e3, 3)
+                        for name, value in zip(STAMPS, stamps)
+                        if value == value
+                    },
+                }
+            )
+        return {"created": time.time(), "spans": self.summary(), "frames": frames}
+
+    def chrome_trace(self) -> Dict[str, object]:
+        """The retained frames in Chrome trace event format, one row per pipeline thread."""
+        pid = os.getpid()
+        events: List[Dict[str, object]] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": row}}
+            for tid, (row, _, _) in enumerate(TRACE_ROWS, start=1)
+        ]
+        for frame_id, stamps in self.frames():
+            for tid, (row, first, last) in enumerate(TRACE_ROWS, start=1):
+                start, end = stamps[_COLUMN[first]], stamps[_COLUMN[last]]
+                if start == start and end == end:
+                    events.append(
+                        {
+                            "name": f"{row.split('-')[-1]} #{frame_id}",
+                            "cat": "frame",
+                            "ph": "X",
+                            "pid": pid,
+                            "tid": tid,
+                            "ts": (start - self.t0) * 1e6,
+                            "dur": max(0.0, end - start) * 1e6,
+                            "args": {"frame": frame_id},
+                        }
+                    )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: Union[str, Path], chrome: bool = False) -> Path:
+        """Write ``snapshot()`` (or ``chrome_trace()``) as JSON; returns the path."""
+        path = Path(path)
+        payload = self.chrome_trace() if chrome else self.snapshot()
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        return path
+
+
+__all__ = ["BOX_AGE", "FrameTrace", "LatencyWindow", "SPANS", "STAMPS", "TRACE_ROWS"]
@@ -1,37 +1,131 @@
 from __future__ import annotations
 
 import argparse
+import importlib
 import sys
 import threading
 import time
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Any, Optional, Union
 
-import cv2
-import numpy as np
-from PIL import Image, ImageTk, ImageOps
-import tkinter as tk
+try:  # imported first so its clock starts as close to launch as possible
+    from .startup import StartupProfile
+except ImportError:  # running as a script
+    from startup import StartupProfile  # type: ignore
 
-try:
-    from libcamera import controls  # type: ignore
-except Exception:
-    controls = None
+# Stages recorded before ClinicKioskApp exists; printed with --startup-profile
+BOOT_PROFILE = StartupProfile(enabled=False)
 
-try:
-    from ultralytics import YOLO
-except Exception:  # pragma: no cover - allow GUI to show fallback message
-    YOLO = None
+with BOOT_PROFILE.stage("import tkinter", "import"):
+    import tkinter as tk
 
-try:
-    from picamera2 import Picamera2
-except Exception:  # Pi-only optional dependency
-    Picamera2 = None  # type: ignore
+# The heavy dependencies below are imported by the load_* functions, normally
+# from the startup loader thread, so the window is on screen before OpenCV,
+# NumPy, Picamera2 and the detector (possibly torch) are loaded.
+np: Any = None
+cv2: Any = None
+Image: Any = None
+frame_sources: Any = None
+PhotoSurface: Any = None
+TripleBuffer: Any = None
+FramePathStats: Any = None
+MotionGate: Any = None
+FrameTrace: Any = None
+center_square: Any = None
+NcnnDetector: Any = None
+BiometricScanner: Any = None
+BiometricReading: Any = None
+CaptureProgress: Any = None
+NoFingerError: Any = None
 
-try:  # Support execution as module or script
-    from ..qrgen.biometrics import BiometricScanner, BiometricReading
-except (ImportError, ValueError):  # running as a script
-    sys.path.append(str(Path(__file__).resolve().parents[1] / "qrgen"))
-    from biometrics import BiometricScanner, BiometricReading  # type: ignore
+BACKENDS = ("ultralytics", "ncnn")
+_NO_PROFILE = StartupProfile(enabled=False, record=False)
+
+
+def _import_sibling(subdir: str, name: str):
+    """Import rpi/<subdir>/<name>.py whether kiosk_gui runs as a module or a script."""
+    if __package__:
+        try:
+            return importlib.import_module(f"..{subdir}.{name}", __package__)
+        except (ImportError, ValueError):
+            pass
+    path = str(Path(__file__).resolve().parents[1] / subdir)
+    if path not in sys.path:
+        sys.path.append(path)
+    return importlib.import_module(name)
+
+
+def load_pil(profile: StartupProfile = _NO_PROFILE) -> None:
+    global Image
+    if Image is None:
+        with profile.stage("import PIL", "import"):
+            from PIL import Image
+
+
+def load_display(profile: StartupProfile = _NO_PROFILE) -> None:
+    global np, PhotoSurface
+    load_pil(profile)
+    if np is None:
+        with profile.stage("import numpy", "import"):
+            import numpy as np
+    if PhotoSurface is None:
+        PhotoSurface = _import_sibling("gui", "display_surface").PhotoSurface
+
+
+def load_vision(profile: StartupProfile = _NO_PROFILE) -> None:
+    global cv2, TripleBuffer, FramePathStats, MotionGate, FrameTrace, center_square
+    load_display(profile)
+    if cv2 is None:
+        with profile.stage("import cv2", "import"):
+            import cv2
+    if TripleBuffer is None:
+        module = _import_sibling("gui", "frame_pipeline")
+        TripleBuffer, FramePathStats = module.TripleBuffer, module.FramePathStats
+        MotionGate, center_square = module.MotionGate, module.center_square
+        FrameTrace = _import_sibling("gui", "frame_trace").FrameTrace
+
+
+def load_camera(profile: StartupProfile = _NO_PROFILE) -> None:
+    global frame_sources
+    if frame_sources is not None:
+        return
+    module = _import_sibling("yolo", "frame_sources")
+    with profile.stage("import picamera2", "import"):
+        module.load_picamera()  # Pi-only, missing elsewhere
+    frame_sources = module
+
+
+def _load_yolo():
+    """Import Ultralytics only when that backend is used; it pulls in torch."""
+    try:
+        from ultralytics import YOLO
+    except Exception:  # pragma: no cover - allow GUI to show fallback message
+        return None
+    return YOLO
+
+
+def load_detector(backend: str, profile: StartupProfile = _NO_PROFILE):
+    """Import the detector stack for ``backend`` and return its model factory (None if missing)."""
+    global NcnnDetector
+    if backend == "ncnn":
+        if NcnnDetector is None:
+            with profile.stage("import ncnn_detector", "import"):
+                NcnnDetector = _import_sibling("yolo", "ncnn_detector").NcnnDetector
+        return NcnnDetector
+    if "ultralytics" in sys.modules:
+        return _load_yolo()
+    with profile.stage("import ultralytics", "import"):
+        return _load_yolo()
+
+
+def load_biometrics(profile: StartupProfile = _NO_PROFILE) -> None:
+    global BiometricScanner, BiometricReading, CaptureProgress, NoFingerError
+    if BiometricScanner is None:
+        with profile.stage("import biometrics", "import"):
+            module = _import_sibling("qrgen", "biometrics")
+            BiometricScanner, BiometricReading = module.BiometricScanner, module.BiometricReading
+            CaptureProgress, NoFingerError = module.CaptureProgress, module.NoFingerError
 
 
 class InferenceWorker:
@@ -41,47 +135,87 @@ class InferenceWorker:
         source: Union[int, str] = 0,
         resolution: tuple[int, int] = (640, 480),
         target_fps: float = 14.0,
-        infer_fps: float = 1.0,
+        infer_fps: Optional[float] = None,
         debug: bool = False,
+        backend: str = "ultralytics",
+        profile: Optional[StartupProfile] = None,
+        infer_min_fps: float = 0.2,
+        infer_max_fps: float = 4.0,
+        motion_threshold: float = 3.0,
+        trace: Optional[Any] = None,
+        trace_overlay: bool = False,
     ) -> None:
-        if YOLO is None:
-            raise RuntimeError("Ultralytics YOLO is not installed. Run 'pip install ultralytics'.")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend '{backend}' (choose from {', '.join(BACKENDS)})")
+        profile = profile or _NO_PROFILE
+        load_vision(profile)
         self.debug = debug
+        self.backend = backend
         self.model = None
         model_str = str(model_path)
+        factory = load_detector(backend, profile)
+        if factory is None:
+            raise RuntimeError("Ultralytics YOLO is not installed. Run 'pip install ultralytics'.")
         try:
-            self.model = YOLO(model_str)
-            print(f"[Inference] YOLO model loaded: {model_str}")
+            with profile.stage(f"load {backend} model"):
+                self.model = factory(model_str)
         except Exception as exc:
-            raise RuntimeError(f"Failed to load YOLO model '{model_str}': {exc}") from exc
+            raise RuntimeError(f"Failed to load {backend} model '{model_str}': {exc}") from exc
+        print(f"[Inference] {backend} model loaded: {model_str}")
         self.labels = self.model.names if self.model else {}
         self.class_colors = self._build_color_map()
         self.source = source
         self.resolution = resolution
         self.target_fps = target_fps
-        self.infer_interval = 1.0 / max(0.1, infer_fps)
-        self._last_infer = 0.0
+        # inference runs at infer_max_fps while the scene moves or something is
+        # detected and falls back to infer_min_fps when it is static;
+        # infer_fps pins it to a fixed rate
+        if infer_fps is not None:
+            infer_min_fps = infer_max_fps = max(0.1, infer_fps)
+        self.gate = MotionGate(infer_min_fps, infer_max_fps, motion_threshold)
         self._latest_detections: list[dict[str, Any]] = []
+        self._detections_from = 0  # traced frame id the latest detections came from
+        # optional frame_trace.FrameTrace; frame ids travel with the buffer slots
+        self.trace = trace
+        self.trace_overlay = trace_overlay and trace is not None
+        self._overlay_lines: list[str] = []
+        self._overlay_updated = float("-inf")
+
+        # three stages, each on its own thread, linked by preallocated
+        # latest-frame-wins buffers of the preview size:
+        #   capture   -> captured     -> render -> frames -> Tk (get_frame)
+        #             -> infer_frames -> inference -> _latest_detections
+        # a slow inference only delays the boxes, never the preview
+        side = min(resolution)
+        self.captured = TripleBuffer((side, side, 3))
+        self.infer_frames = TripleBuffer((side, side, 3))
+        self.frames = TripleBuffer((side, side, 3))
+        self.stats = FramePathStats()
+        self._scratch: Optional[np.ndarray] = None  # resize target for odd-sized sources
+        self._infer_bgr: Optional[np.ndarray] = None  # BGR copy for Ultralytics
 
-        self.cap = None
-        self.picam: Optional[Any] = None
-        self.use_picam = False
-        self._init_camera()
+        self.camera: Optional[Any] = None  # frame_sources.FrameSource
+        with profile.stage("start camera"):
+            self._init_camera()
 
-        self.frame_lock = threading.Lock()
-        self.latest_frame: Optional[np.ndarray] = None
         self.stop_event = threading.Event()
-        self.thread = threading.Thread(target=self._loop, daemon=True)
-        self.thread.start()
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name="kiosk-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="kiosk-inference", daemon=True),
+            threading.Thread(target=self._render_loop, name="kiosk-render", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
 
     def _build_color_map(self):
+        # RGB, frames are annotated after conversion
         palette = [
-            (0, 0, 255),
-            (0, 255, 0),
             (255, 0, 0),
-            (0, 255, 255),
-            (255, 0, 255),
+            (0, 255, 0),
+            (0, 0, 255),
             (255, 255, 0),
+            (255, 0, 255),
+            (0, 255, 255),
         ]
         mapping = {}
         for idx, name in getattr(self, "labels", {}).items():
@@ -89,48 +223,57 @@ class InferenceWorker:
         return mapping
 
     def _init_camera(self):
-        if isinstance(self.source, str) and self.source.startswith("picamera"):
-            if Picamera2 is None:
-                raise RuntimeError("Picamera2 is not installed but picamera source was requested")
-            self.use_picam = True
-            self.picam = Picamera2()
-            self.picam.configure(
-                self.picam.create_video_configuration(
-                    main={"format": "XRGB8888", "size": self.resolution}
-                )
-            )
-            self.picam.start()
-            self._enable_autofocus()
+        load_camera()
+        kind, _ = frame_sources.parse_source(self.source)
+        if kind == "picamera":
+            # a square size means no crop or resize before display, the ISP scales
+            side = self.frames.shape[0]
+            size = (side, side)
         else:
-            src = self.source
-            if isinstance(src, str) and src.isdigit():
-                src = int(src)
-            self.cap = cv2.VideoCapture(src)
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
-
-    def _enable_autofocus(self):
-        if not self.use_picam or not self.picam or controls is None:
-            return
-        try:
-            self.picam.set_controls({"AfMode": controls.AfModeEnum.Continuous})
-            self.picam.set_controls({"AfTrigger": controls.AfTriggerEnum.Start})
-        except Exception as exc:
-            print(f"Warning: unable to enable autofocus ({exc})")
-
-    def _read_frame(self) -> Optional[np.ndarray]:
-        if self.use_picam and self.picam:
-            frame_bgra = self.picam.capture_array()
-            return cv2.cvtColor(frame_bgra, cv2.COLOR_BGRA2BGR)
-        if self.cap:
-            ret, frame = self.cap.read()
-            return frame if ret else None
-        return None
+            size = tuple(self.resolution)
+        # recorded clips loop at their own frame rate, like a camera
+        self.camera = frame_sources.open_source(self.source, size, loop=True, realtime=True)
+
+    def _convert_into(self, frame_bgr: np.ndarray, dst: np.ndarray) -> int:
+        """BGR camera frame -> RGB preview slot, the only full-frame conversion; returns bytes written."""
+        square = center_square(frame_bgr)
+        side = dst.shape[0]
+        copied = 0
+        if square.shape[0] != side:
+            if self._scratch is None:
+                self._scratch = np.empty((side, side, 3), dtype=np.uint8)
+            cv2.resize(square, (side, side), dst=self._scratch, interpolation=cv2.INTER_LINEAR)
+            square = self._scratch
+            copied += square.nbytes
+        cv2.cvtColor(square, cv2.COLOR_BGR2RGB, dst=dst)
+        return copied + dst.nbytes
+
+    def _capture_into(self, dst: np.ndarray) -> bool:
+        """Fill ``dst`` with the next camera frame; False if none was available."""
+        # Picamera2 frames are converted straight out of the mapped DMA buffer,
+        # VideoCapture ones out of a buffer reused between reads
+        copied = self.camera.read_with(lambda frame_bgr: self._convert_into(frame_bgr, dst))
+        if copied is None:
+            return False
+        self.stats.add("capture", self.camera.last_read_s, self.camera.last_read_bytes)
+        self.stats.add("convert", time.perf_counter() - self.camera.last_timestamp, copied)
+        return True
 
     def _detect(self, frame: np.ndarray) -> list[dict[str, Any]]:
+        """Run the model on an RGB preview frame."""
         if not self.model:
             return []
-        results = self.model(frame, verbose=False)
+        if self.backend == "ncnn":
+            detections = self.model.detect(frame, rgb=True)
+            if self.debug:
+                print(f"[Inference] Frame processed, detections={len(detections)}")
+            return detections
+        # Ultralytics expects BGR arrays
+        if self._infer_bgr is None or self._infer_bgr.shape != frame.shape:
+            self._infer_bgr = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=self._infer_bgr)
+        self.stats.add("infer input", 0.0, self._infer_bgr.nbytes)
+        results = self.model(self._infer_bgr, verbose=False)
         detections: list[dict[str, Any]] = []
         if results:
             first = results[0]
@@ -186,46 +329,112 @@ class InferenceWorker:
             )
         return frame
 
-    def _loop(self):
+    def _capture_loop(self):
         sleep_target = 1.0 / max(0.1, self.target_fps)
         while not self.stop_event.is_set():
             start = time.perf_counter()
-            frame = self._read_frame()
-            if frame is None:
+            frame = self.captured.write_slot()
+            if not self._capture_into(frame):
                 time.sleep(0.05)
                 continue
-            now = time.perf_counter()
-            if (now - self._last_infer) >= self.infer_interval:
-                self._latest_detections = self._detect(frame)
-                self._last_infer = now
-            annotated = self._draw_detections(frame.copy())
-            rgb = cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB)
-            with self.frame_lock:
-                self.latest_frame = rgb
-            elapsed = time.perf_counter() - start
-            remaining = sleep_target - elapsed
+            frame_id = 0
+            if self.trace is not None:
+                frame_id = self.trace.begin(self.camera.last_timestamp)
+                self.trace.stamp(frame_id, "captured")
+            with self.stats.stage("motion"):
+                run = self.gate.should_run(frame, start, tracking=bool(self._latest_detections))
+            if run:
+                # the detector gets its own copy; an older one still waiting is replaced
+                with self.stats.stage("infer handoff", frame.nbytes):
+                    np.copyto(self.infer_frames.write_slot(), frame)
+                    self.infer_frames.publish(frame_id)
+            self.captured.publish(frame_id)
+            remaining = sleep_target - (time.perf_counter() - start)
             if remaining > 0:
                 time.sleep(remaining)
 
+    def _inference_loop(self):
+        while not self.stop_event.is_set():
+            if not self.infer_frames.wait(timeout=0.2):
+                continue
+            frame = self.infer_frames.latest()
+            frame_id = self.infer_frames.tag
+            if self.trace is not None:
+                self.trace.stamp(frame_id, "infer_start")
+            with self.stats.stage("detect"):
+                detections = self._detect(frame)
+            if self.trace is not None:
+                self.trace.stamp(frame_id, "infer_end")
+            self._detections_from = frame_id
+            self._latest_detections = detections
+            if self.debug:
+                print(f"[Inference] {self.gate.report()}, {self.infer_frames.dropped} superseded")
+
+    def _render_loop(self):
+        while not self.stop_event.is_set():
+            if not self.captured.wait(timeout=0.2):
+                continue
+            frame = self.captured.latest()
+            frame_id = self.captured.tag
+            if self.trace is not None:
+                self.trace.stamp(frame_id, "annotate")
+                self.trace.boxes_from(frame_id, self._detections_from)
+            out = self.frames.write_slot()
+            # the newest boxes are drawn on the newest frame, whichever inference they came from
+            with self.stats.stage("render", out.nbytes):
+                np.copyto(out, frame)
+                self._draw_detections(out)
+                if self.trace_overlay:
+                    self._draw_trace_overlay(out)
+            if self.trace is not None:
+                self.trace.stamp(frame_id, "handoff")
+            self.frames.publish(frame_id)
+
+    def _draw_trace_overlay(self, frame: np.ndarray, interval: float = 0.5):
+        """Latency percentiles in the bottom-left corner, recomputed every ``interval`` seconds."""
+        now = time.perf_counter()
+        if now - self._overlay_updated >= interval:
+            self._overlay_lines = ["p50/p95/p99", *self.trace.overlay_lines()]
+            self._overlay_updated = now
+        bottom = frame.shape[0] - 10 - 20 * (len(self._overlay_lines) - 1)
+        for idx, line in enumerate(self._overlay_lines):
+            y = bottom + idx * 20
+            cv2.putText(frame, line, (8, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3, cv2.LINE_AA)
+            cv2.putText(frame, line, (8, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1, cv2.LINE_AA)
+
+    def stage_fps(self) -> dict[str, float]:
+        """Frames per second handled by each pipeline stage since the last stats reset."""
+        rates = self.stats.rates()
+        stages = (("capture", "capture"), ("inference", "detect"), ("render", "render"), ("display", "display"))
+        return {name: rates.get(stage, 0.0) for name, stage in stages}
+
+    def frame_id(self) -> int:
+        """Traced id of the frame last returned by ``get_frame()`` (0 when not tracing)."""
+        return self.frames.tag
+
     def get_frame(self) -> Optional[np.ndarray]:
-        with self.frame_lock:
-            if self.latest_frame is None:
-                return None
-            return self.latest_frame.copy()
+        """Newest RGB preview frame, or None if nothing new arrived since the last call.
+
+        The array is shared with the capture thread's buffers and stays valid
+        until the next ``get_frame()`` call, so callers must not keep it.
+        """
+        if not self.frames.has_new():
+            return None
+        return self.frames.latest()
 
     def stop(self):
         self.stop_event.set()
-        if self.thread.is_alive():
-            self.thread.join(timeout=1.0)
-        if self.cap:
-            self.cap.release()
-        if self.use_picam and self.picam:
-            self.picam.stop()
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join(timeout=1.0)
+        if self.camera:
+            self.camera.release()
 
 
 class ClinicKioskApp:
-    def __init__(self, args: argparse.Namespace) -> None:
+    def __init__(self, args: argparse.Namespace, profile: Optional[StartupProfile] = None) -> None:
         self.args = args
+        self.profile = profile or StartupProfile(enabled=False)
         self.root = tk.Tk()
         self.root.title("Clinic Intake Kiosk")
         self.fullscreen = True
@@ -261,22 +470,15 @@ class ClinicKioskApp:
         self.root.rowconfigure(0, weight=1)
 
 
-        self.inference = None
+        # the camera and detector are started by _load_inference() once the
+        # window is up; until then the canvas shows loading progress
+        self.inference: Optional[InferenceWorker] = None
         self.inference_error: Optional[str] = None
-        try:
-            model_path = self._resolve_model_path(args.model)
-            self.inference = InferenceWorker(
-                model_path=model_path,
-                source=args.camera,
-                resolution=(self.video_width, self.video_height),
-                target_fps=args.video_fps,
-                infer_fps=args.infer_fps,
-                debug=args.debug_inference,
-            )
-        except Exception as exc:
-            print(f"Warning: inference display disabled ({exc})")
-            self.inference_error = str(exc)
-            self.inference = None
+        self.loader_thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._loader_done = False
+        self._first_frame = False
+        self._profile_printed = False
 
         video_container = tk.Frame(self.root, bg=self.colors["bg"])
         video_padx = (12, 12) if self.compact_mode else (28, 18)
@@ -307,7 +509,7 @@ class ClinicKioskApp:
             highlightthickness=0,
         )
         self.video_canvas.pack()
-        self.video_canvas_image: Optional[int] = None
+        self.video_surface: Optional[PhotoSurface] = None  # created on first use
         self.video_canvas_text: Optional[int] = None
         self.video_state = "live"
         self._set_video_message("Initializing camera feed…")
@@ -414,11 +616,128 @@ class ClinicKioskApp:
         )
         self.tip_label.pack(anchor="w", pady=(10, 0))
 
+        # the scanner is opened by the startup loader; a Start press before
+        # that only sets _capture_requested
         self.scanner: Optional[BiometricScanner] = None
-        self.capture_thread: Optional[threading.Thread] = None
+        self.scanner_error: Optional[str] = None
+        self.capture_future: Optional[Future] = None
+        self.shown_reading: Optional[BiometricReading] = None
+        self._capture_requested = False
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.after(self.display_interval_ms, self._refresh_video)
+        self.root.after_idle(self._start_loader)
+
+    # --- staged startup -----------------------------------------------
+    def _start_loader(self):
+        self.profile.mark("window ready")
+        self.loader_thread = threading.Thread(target=self._load_inference, name="startup-loader", daemon=True)
+        self.loader_thread.start()
+
+    def _post(self, callback, *args) -> bool:
+        """Run ``callback`` on the Tk thread; False if the window is already gone."""
+        if self._closing:
+            return False
+        try:
+            self.root.after(0, callback, *args)
+            return True
+        except (RuntimeError, tk.TclError):
+            return False
+
+    def _load_inference(self):
+        backend = self.args.backend
+        steps = [
+            ("Loading image libraries…", lambda: load_vision(self.profile)),
+            ("Loading camera drivers…", lambda: load_camera(self.profile)),
+            (f"Loading {backend} detector…", lambda: load_detector(backend, self.profile)),
+        ]
+        worker = None
+        try:
+            for idx, (message, step) in enumerate(steps, start=1):
+                self._post(self._set_loading_message, f"{message} ({idx}/{len(steps) + 1})")
+                step()
+            self._post(self._set_loading_message, f"Starting camera… ({len(steps) + 1}/{len(steps) + 1})")
+            model_path = self._resolve_model_path(self.args.model)
+            worker = InferenceWorker(
+                model_path=model_path,
+                source=self.args.camera,
+                resolution=(self.video_width, self.video_height),
+                target_fps=self.args.video_fps,
+                infer_fps=self.args.infer_fps,
+                infer_min_fps=self.args.infer_min_fps,
+                infer_max_fps=self.args.infer_max_fps,
+                motion_threshold=self.args.motion_threshold,
+                trace=FrameTrace() if self.args.trace else None,
+                trace_overlay=self.args.trace_overlay,
+                debug=self.args.debug_inference,
+                backend=backend,
+                profile=self.profile,
+            )
+        except Exception as exc:
+            print(f"Warning: inference display disabled ({exc})")
+            self._post(self._on_inference_failed, str(exc))
+        else:
+            if not self._post(self._on_inference_ready, worker):
+                worker.stop()
+        # open the sensors now so the first Start press does not wait for them
+        self._open_scanner()
+        self._post(self._on_loader_done)
+
+    def _open_scanner(self):
+        """Load the sensor/QR stack and start the sensors; runs off the Tk thread."""
+        try:
+            load_biometrics(self.profile)
+            scanner = BiometricScanner(
+                qr_output=None if self.args.no_qr_file else self.args.qr_path,
+                isolated=self.args.isolate_sensors,
+            )
+        except Exception as exc:
+            print(f"Warning: biometrics unavailable ({exc})")
+            self._post(self._on_scanner_failed, str(exc))
+            return
+        if not self._post(self._on_scanner_ready, scanner):
+            scanner.shutdown()
+
+    def _set_loading_message(self, message: str):
+        if self.inference is None and self.video_state == "live":
+            self._set_video_message(message)
+
+    def _on_inference_ready(self, worker: InferenceWorker):
+        if self._closing:
+            worker.stop()
+            return
+        self.inference = worker
+
+    def _on_inference_failed(self, message: str):
+        self.inference_error = message
+        self._maybe_print_profile()
+
+    def _on_scanner_ready(self, scanner: BiometricScanner):
+        if self._closing:
+            scanner.shutdown()
+            return
+        self.scanner = scanner
+        if self._capture_requested:
+            self._capture_requested = False
+            self._begin_capture()
+
+    def _on_scanner_failed(self, message: str):
+        self.scanner_error = message
+        if self._capture_requested:
+            self._capture_requested = False
+            self._set_error(f"Capture failed: {message}")
+
+    def _on_loader_done(self):
+        self._loader_done = True
+        self._maybe_print_profile()
+
+    def _maybe_print_profile(self):
+        if self._profile_printed or not self._loader_done:
+            return
+        if not (self._first_frame or self.inference_error):
+            return
+        self._profile_printed = True
+        self.profile.print_report()
 
     # --- GUI helpers --------------------------------------------------
     def _resolve_model_path(self, hint: Union[str, Path]) -> Path:
@@ -477,8 +796,20 @@ class ClinicKioskApp:
         if self.inference:
             frame = self.inference.get_frame()
             if frame is not None and self.video_state == "live":
-                display_img = self._frame_to_display_image(frame)
-                self._render_on_canvas(display_img)
+                trace = self.inference.trace
+                if trace is not None:
+                    trace.stamp(self.inference.frame_id(), "render")
+                # written into the persistent photo; Tk copies it once
+                with self.inference.stats.stage("display", self.video_side * self.video_side * 3):
+                    self._render_frame(frame)
+                if trace is not None:
+                    trace.stamp(self.inference.frame_id(), "shown")
+                if self.args.frame_stats:
+                    self._maybe_print_frame_stats()
+                if not self._first_frame:
+                    self._first_frame = True
+                    self.profile.mark("first frame")
+                    self._maybe_print_profile()
         elif self.inference_error and self.video_state == "live":
             install_hint = (
                 "Camera feed unavailable. Install Picamera2 with:\n"
@@ -488,52 +819,111 @@ class ClinicKioskApp:
         self.root.after(self.display_interval_ms, self._refresh_video)
 
     def start_capture(self):
-        if self.capture_thread and self.capture_thread.is_alive():
+        if self.capture_future is not None or self._capture_requested:
+            self._cancel_capture()
             return
+        self.shown_reading = None
         self.status_var.set("Place your finger on the sensor and remain still…")
         self.result_var.set("")
         self.tip_label.configure(text="Reading biometrics…")
-        self.start_button.config(state="disabled")
+        self.start_button.config(text="Cancel Capture")
         self.video_state = "live"
         self._set_video_message("Starting camera…")
-        self.capture_thread = threading.Thread(target=self._capture_worker, daemon=True)
-        self.capture_thread.start()
+        if self.scanner is not None:
+            self._begin_capture()
+            return
+        self._capture_requested = True
+        if self.scanner_error is not None:  # the last attempt failed; try the sensors again
+            self.scanner_error = None
+            threading.Thread(target=self._open_scanner, name="open-sensors", daemon=True).start()
 
-    def _ensure_scanner(self) -> BiometricScanner:
-        if self.scanner is None:
-            self.scanner = BiometricScanner(qr_output=self.args.qr_path)
-        return self.scanner
+    def _begin_capture(self):
+        future = self.scanner.capture_async(
+            timeout=self.args.capture_timeout,
+            on_progress=lambda progress: self._post(self._show_progress, progress),
+        )
+        self.capture_future = future
+        future.add_done_callback(self._capture_finished)
 
-    def _capture_worker(self):
-        try:
-            scanner = self._ensure_scanner()
-            reading = scanner.capture_once(timeout=self.args.capture_timeout)
-        except TimeoutError:
-            self._set_error("Timed out waiting for stable biometric data")
-            return
-        except Exception as exc:
-            self._set_error(f"Capture failed: {exc}")
+    def _cancel_capture(self):
+        self._capture_requested = False
+        if self.capture_future is not None:
+            self.capture_future.cancel()  # _on_capture_done resets the controls
+        else:
+            self._set_error("Capture cancelled", "Start Capture")
+
+    def _capture_finished(self, future: Future):
+        # normally called on the scanner's thread: render the QR there, the display hits the cache
+        if not future.cancelled() and future.exception() is None:
+            try:
+                future.result().qr_image(self.video_side)
+            except Exception:
+                pass  # _display_qr_in_video reports it
+        self._post(self._on_capture_done, future)
+
+    def _on_capture_done(self, future: Future):
+        if future is not self.capture_future:
             return
-        self.root.after(0, lambda: self._display_reading(reading))
+        self.capture_future = None
+        if future.cancelled():
+            self._set_error("Capture cancelled", "Start Capture")
+        elif isinstance(future.exception(), NoFingerError):
+            self._set_error("No finger detected – place a finger on the sensor and retry")
+        elif isinstance(future.exception(), TimeoutError):
+            self._set_error("Timed out waiting for stable biometric data")
+        elif future.exception() is not None:
+            self._set_error(f"Capture failed: {future.exception()}")
+        else:
+            self._display_reading(future.result())
+
+    def _show_progress(self, progress: CaptureProgress):
+        if self.capture_future is not None:  # not finished or cancelled meanwhile
+            self.result_var.set(self._format_vitals(progress.temperature_c, progress.heart_rate, progress.spo2))
+
+    @staticmethod
+    def _format_vitals(temperature_c: float, heart_rate: float, spo2: float) -> str:
+        def value(number: float, fmt: str) -> str:
+            return format(number, fmt) if number > 0 else "--"
+
+        return (
+            f"Temp: {value(temperature_c, '.1f')}°C\n"
+            f"Heart Rate: {value(heart_rate, '.0f')} BPM\n"
+            f"SpO₂: {value(spo2, '.0f')}%"
+        )
 
     def _display_reading(self, reading: BiometricReading):
+        self.shown_reading = reading
         self.status_var.set("QR ready – please scan to check in")
-        self.result_var.set(
-            f"Temp: {reading.temperature_c:.1f}°C\n"
-            f"Heart Rate: {reading.heart_rate:.0f} BPM\n"
-            f"SpO₂: {reading.spo2:.0f}%"
-        )
+        self.result_var.set(self._format_vitals(reading.temperature_c, reading.heart_rate, reading.spo2))
         self.tip_label.configure(text="Show the on-screen QR to the patient for check-in.")
-        self._display_qr_in_video(reading.qr_path)
+        self._display_qr_in_video(reading)
         self.start_button.config(state="normal", text="Capture Next Patient")
+        if reading.qr_saved is not None:
+            reading.qr_saved.add_done_callback(lambda saved: self._qr_saved(reading, saved))
+
+    def _qr_saved(self, reading: BiometricReading, saved: Future):
+        # called on the QR writer thread; the on-screen QR does not depend on the file
+        if saved.cancelled() or saved.exception() is None:
+            return
+        print(f"Warning: unable to save QR to {reading.qr_path} ({saved.exception()})")
+        self._post(self._warn_qr_not_saved, reading, saved.exception())
+
+    def _warn_qr_not_saved(self, reading: BiometricReading, exc: BaseException):
+        if reading is self.shown_reading:  # not replaced by the next patient meanwhile
+            self.status_var.set(f"QR ready – please scan to check in (saving the QR file failed: {exc})")
 
-    def _set_error(self, message: str):
+    def _set_error(self, message: str, button: str = "Retry Capture"):
         self.status_var.set(message)
-        self.start_button.config(state="normal", text="Retry Capture")
+        self.start_button.config(state="normal", text=button)
 
     def on_close(self):
+        self._closing = True
         if self.inference:
             self.inference.stop()
+            self._write_trace()
+        self._capture_requested = False
+        if self.capture_future is not None:
+            self.capture_future.cancel()
         if self.scanner:
             self.scanner.shutdown()
         self.root.destroy()
@@ -541,16 +931,38 @@ class ClinicKioskApp:
     def run(self):
         self.root.mainloop()
 
-    def _display_qr_in_video(self, qr_path: Union[str, Path]):
+    def _display_qr_in_video(self, reading: BiometricReading):
+        # rendered in memory at the canvas size, pixel-exact; no PNG decode or resample
         try:
-            img = Image.open(qr_path)
+            img = reading.qr_image(self.video_side)
         except Exception as exc:
             self.status_var.set(f"QR display failed: {exc}")
             return
-        fitted = ImageOps.fit(img, (self.video_side, self.video_side), Image.Resampling.LANCZOS)
-        self._render_on_canvas(fitted)
+        self._render_on_canvas(img)
         self.video_state = "qr"
 
+    def _maybe_print_frame_stats(self, interval: float = 5.0):
+        stats = self.inference.stats
+        if time.perf_counter() - stats.started >= interval:
+            print("[Frames] per-stage cost\n" + stats.report())
+            fps = ", ".join(f"{name} {rate:.1f}" for name, rate in self.inference.stage_fps().items())
+            print(f"[Frames] fps: {fps}")
+            print(f"[Frames] {self.inference.gate.report()}")
+            if self.inference.trace is not None:
+                print("[Frames] latency\n" + self.inference.trace.report())
+            stats.reset()
+
+    def _write_trace(self):
+        trace = self.inference.trace
+        if trace is None:
+            return
+        for path, chrome in ((self.args.trace_json, False), (self.args.trace_chrome, True)):
+            if path:
+                try:
+                    print(f"[Frames] trace written to {trace.write(path, chrome=chrome)}")
+                except OSError as exc:
+                    print(f"Warning: unable to write trace '{path}' ({exc})")
+
     def _frame_to_display_image(self, frame: np.ndarray) -> Image.Image:
         h, w = frame.shape[:2]
         side = min(h, w)
@@ -560,15 +972,32 @@ class ClinicKioskApp:
         rgb = Image.fromarray(cropped)
         return rgb.resize((self.video_side, self.video_side), Image.Resampling.BILINEAR)
 
-    def _render_on_canvas(self, pil_image: Image.Image):
-        tk_img = ImageTk.PhotoImage(pil_image)
-        cx = self.video_side // 2
-        cy = self.video_side // 2
-        if self.video_canvas_image is None:
-            self.video_canvas_image = self.video_canvas.create_image(cx, cy, image=tk_img, state="normal")
+    def _ensure_surface(self) -> PhotoSurface:
+        if self.video_surface is None:
+            load_display(self.profile)
+            center = (self.video_side // 2, self.video_side // 2)
+            self.video_surface = PhotoSurface(
+                self.video_canvas,
+                (self.video_side, self.video_side),
+                center,
+                mode=self.args.display_mode,
+            )
+        return self.video_surface
+
+    def _render_frame(self, frame: np.ndarray):
+        """Show an RGB frame, writing it into the persistent photo when it already fits."""
+        surface = self._ensure_surface()
+        if frame.shape[:2] == (self.video_side, self.video_side):
+            surface.show_frame(frame)
         else:
-            self.video_canvas.itemconfigure(self.video_canvas_image, image=tk_img, state="normal")
-        self.video_canvas.image = tk_img
+            surface.show_image(self._frame_to_display_image(frame))
+        self._hide_video_message()
+
+    def _render_on_canvas(self, pil_image: Image.Image):
+        self._ensure_surface().show_image(pil_image)
+        self._hide_video_message()
+
+    def _hide_video_message(self):
         if self.video_canvas_text is not None:
             self.video_canvas.itemconfigure(self.video_canvas_text, state="hidden")
 
@@ -585,8 +1014,8 @@ class ClinicKioskApp:
             )
         else:
             self.video_canvas.itemconfigure(self.video_canvas_text, text=message, state="normal")
-        if self.video_canvas_image is not None:
-            self.video_canvas.itemconfigure(self.video_canvas_image, state="hidden")
+        if self.video_surface is not None:
+            self.video_surface.hide()
 
     def _toggle_fullscreen(self, enable: Optional[bool] = None):
         if enable is None:
@@ -599,21 +1028,89 @@ def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Clinic intake GUI for Raspberry Pi")
     default_model = Path(__file__).resolve().parents[1] / "yolo" / "best_ncnn_model"
     parser.add_argument("--model", default=str(default_model), help="YOLO model path or name")
-    parser.add_argument("--camera", default="picamera0", help="Camera source index/URL (default picamera0)")
+    parser.add_argument(
+        "--camera",
+        default="picamera0",
+        help="Camera source: picamera0, USB index, URL, video file (looped) or synthetic",
+    )
     parser.add_argument("--video-width", type=int, default=640)
     parser.add_argument("--video-height", type=int, default=480)
     parser.add_argument("--video-size", type=int, default=640, help="Square dimension for preview/inference")
     parser.add_argument("--video-fps", type=float, default=14.0, help="Live feed target FPS")
-    parser.add_argument("--infer-fps", type=float, default=1.0, help="YOLO inference FPS")
+    parser.add_argument(
+        "--infer-fps",
+        type=float,
+        default=None,
+        help="Fixed YOLO inference FPS (turns off motion gating)",
+    )
+    parser.add_argument("--infer-min-fps", type=float, default=0.2, help="Inference FPS while the scene is static")
+    parser.add_argument(
+        "--infer-max-fps",
+        type=float,
+        default=4.0,
+        help="Inference FPS while there is motion or a detection",
+    )
+    parser.add_argument(
+        "--motion-threshold",
+        type=float,
+        default=3.0,
+        help="Mean per-pixel luma change (0-255) that counts as motion",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="ultralytics",
+        help="Inference backend: Ultralytics (torch) or ncnn directly on the exported model",
+    )
     parser.add_argument("--debug-inference", action="store_true", help="Print inference diagnostics")
     parser.add_argument("--capture-timeout", type=float, default=45.0)
-    parser.add_argument("--qr-path", default=str(Path(__file__).resolve().parents[1] / "qrgen" / "health_qr.png"))
-    return parser.parse_args()
+    parser.add_argument(
+        "--isolate-sensors",
+        action="store_true",
+        help="Read the biometric sensors in a separate process so inference cannot stall them",
+    )
+    parser.add_argument(
+        "--display-mode",
+        choices=("ppm", "paste"),
+        default="ppm",
+        help="How frames are written into the persistent preview photo",
+    )
+    parser.add_argument(
+        "--frame-stats",
+        action="store_true",
+        help="Print per-stage time and bytes copied for the camera preview every 5 s",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="Print import and init times of each startup stage",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Stamp every preview frame from capture to Tk and keep p50/p95/p99 latency per stage",
+    )
+    parser.add_argument("--trace-overlay", action="store_true", help="Draw latency percentiles on the preview")
+    parser.add_argument("--trace-json", help="On exit, write latency percentiles and recent frame stamps here")
+    parser.add_argument("--trace-chrome", help="On exit, write recent frames as a Chrome/Perfetto trace here")
+    parser.add_argument(
+        "--qr-path",
+        default=str(Path(__file__).resolve().parents[1] / "qrgen" / "health_qr.png"),
+        help="Where a copy of each QR code is written in the background",
+    )
+    parser.add_argument("--no-qr-file", action="store_true", help="Keep QR codes in memory only")
+    args = parser.parse_args()
+    # the overlay and the exports need the trace
+    args.trace = args.trace or args.trace_overlay or bool(args.trace_json or args.trace_chrome)
+    return args
 
 
 def main() -> None:
     args = parse_args()
-    app = ClinicKioskApp(args)
+    profile = BOOT_PROFILE
+    profile.enabled = args.startup_profile
+    with profile.stage("build window"):
+        app = ClinicKioskApp(args, profile=profile)
     app.run()
 
 
@@ -0,0 +1,90 @@
+"""Timing of the kiosk's staged startup, printed with ``kiosk_gui.py --startup-profile``."""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+# set when this module is first imported, i.e. right at the top of kiosk_gui.py
+PROCESS_T0 = time.perf_counter()
+
+
+@dataclass
+class Stage:
+    name: str
+    kind: str  # "import", "init" or "mark"
+    start: float
+    duration: float
+    thread: str
+    error: Optional[str] = None
+
+
+class StartupProfile:
+    """Collects named stages with their start offset and duration.
+
+    ``stage()`` is safe to use from the Tk thread and the loader thread at the
+    same time; stages are reported in start order. ``enabled`` only controls
+    printing, so stages recorded before the command line is parsed are kept;
+    ``record=False`` gives a profile that drops everything.
+    """
+
+    def __init__(self, enabled: bool = True, t0: float = PROCESS_T0, record: bool = True) -> None:
+        self.enabled = enabled
+        self.record = record
+        self.t0 = t0
+        self.stages: List[Stage] = []
+        self._lock = threading.Lock()
+
+    def _add(self, stage: Stage) -> None:
+        if not self.record:
+            return
+        with self._lock:
+            self.stages.append(stage)
+
+    @contextmanager
+    def stage(self, name: str, kind: str = "init") -> Iterator[None]:
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._add(
+                Stage(
+                    name,
+                    kind,
+                    start - self.t0,
+                    time.perf_counter() - start,
+                    threading.current_thread().name,
+                    error,
+                )
+            )
+
+    def mark(self, name: str) -> None:
+        """Record a point in time, e.g. when the window first became visible."""
+        self._add(Stage(name, "mark", time.perf_counter() - self.t0, 0.0, threading.current_thread().name))
+
+    def total(self, kind: str) -> float:
+        return sum(stage.duration for stage in self.stages if stage.kind == kind)
+
+    def report(self) -> str:
+        lines = [f"{'stage':<34} {'kind':<7} {'start s':>8} {'took s':>8}  thread"]
+        for stage in sorted(self.stages, key=lambda s: s.start):
+            took = "" if stage.kind == "mark" else f"{stage.duration:8.3f}"
+            line = f"{stage.name:<34} {stage.kind:<7} {stage.start:8.3f} {took:>8}  {stage.thread}"
+            if stage.error:
+                line += f"  [failed: {stage.error}]"
+            lines.append(line)
+        lines.append(f"imports {self.total('import'):.3f}s, init {self.total('init'):.3f}s")
+        return "\n".join(lines)
+
+    def print_report(self) -> None:
+        if self.enabled:
+            print("[Startup] profile\n" + self.report())
+
+
+__all__ = ["PROCESS_T0", "Stage", "StartupProfile"]
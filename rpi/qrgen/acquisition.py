@@ -0,0 +1,155 @@
+"""Sample acquisition timing for the MAX30102 thread.
+
+``AcquisitionScheduler`` replaces the fixed 10 ms polling sleep: it sleeps for
+as long as the FIFO needs to collect the next batch of samples at the
+configured sample rate, or, with an ``EdgeSource``, waits for the sensor's
+INT pin (A_FULL interrupt). ``AcquisitionStats`` counts samples, FIFO overflow
+events and samples lost to overflows (from ``REG_OVF_COUNTER``).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional
+
+try:  # gpiozero ships with Raspberry Pi OS
+    from gpiozero import DigitalInputDevice  # type: ignore
+except Exception:  # pragma: no cover - not available off the Pi
+    DigitalInputDevice = None  # type: ignore
+
+
+class EdgeSource:
+    """A level/edge notification that the acquisition loop can block on.
+
+    ``trigger()`` is called from whatever observes the INT line (a GPIO
+    callback, a simulator thread or a test); ``wait()`` returns True if an
+    edge arrived within the timeout and re-arms for the next one.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.edges = 0
+
+    def trigger(self) -> None:
+        self.edges += 1
+        self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        fired = self._event.wait(timeout)
+        self._event.clear()
+        return fired
+
+    def close(self) -> None:
+        self._event.set()
+
+
+class GPIOEdgeSource(EdgeSource):
+    """Edge source on a Raspberry Pi GPIO wired to the MAX30102 INT pin (active low)."""
+
+    def __init__(self, pin: int) -> None:
+        super().__init__()
+        if DigitalInputDevice is None:
+            raise RuntimeError("gpiozero is not installed; interrupt mode needs it")
+        # INT is open-drain, so pull the line up and treat "low" as active
+        self._device = DigitalInputDevice(pin, pull_up=True)
+        self._device.when_activated = self.trigger
+
+    def close(self) -> None:
+        self._device.close()
+        super().close()
+
+
+class AcquisitionStats:
+    """Counters for one acquisition run."""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.samples = 0
+        self.reads = 0
+        self.wakeups = 0
+        self.overflow_events = 0
+        self.missed_samples = 0
+
+    def record(self, samples: int, ovf_count: int) -> None:
+        self.wakeups += 1
+        if samples:
+            self.reads += 1
+            self.samples += samples
+        if ovf_count:
+            self.overflow_events += 1
+            # OVF_COUNTER saturates at 31, so this is a lower bound
+            self.missed_samples += ovf_count
+
+    def as_dict(self) -> Dict[str, float]:
+        elapsed = max(1e-9, time.monotonic() - self.started)
+        return {
+            "samples": self.samples,
+            "samples_per_s": self.samples / elapsed,
+            "wakeups_per_s": self.wakeups / elapsed,
+            "samples_per_read": self.samples / max(1, self.reads),
+            "overflow_events": self.overflow_events,
+            "missed_samples": self.missed_samples,
+        }
+
+
+class AcquisitionScheduler:
+    """Work out how long the sensor thread can sleep before the next FIFO read.
+
+    In timed mode the thread sleeps until ``target_fill`` samples should be
+    waiting, which is the FIFO almost-full level capped by ``max_latency``
+    worth of samples so estimates still update promptly. The rate starts at
+    the configured sample rate and follows the rate actually observed
+    (samples read plus samples lost), so a fast-running clock or a sped-up
+    simulator does not overflow the FIFO.
+
+    In interrupt mode it blocks on the edge source instead, with a timeout of
+    twice the expected fill time so a missed edge only delays one read.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float,
+        almost_full: int,
+        max_latency: float = 0.2,
+        min_sleep: float = 0.002,
+        edge: Optional[EdgeSource] = None,
+    ) -> None:
+        self.sample_rate = max(1e-3, sample_rate)
+        self.rate = self.sample_rate
+        self.almost_full = max(1, almost_full)
+        self.target_fill = max(1, min(self.almost_full, int(round(max_latency * self.sample_rate))))
+        self.min_sleep = min_sleep
+        self.edge = edge
+        self.stats = AcquisitionStats()
+        self._last_record: Optional[float] = None
+
+    @classmethod
+    def for_sensor(cls, sensor, edge: Optional[EdgeSource] = None, **kwargs) -> "AcquisitionScheduler":
+        return cls(sensor.sample_rate, sensor.fifo_almost_full, edge=edge, **kwargs)
+
+    def record(self, samples: int, ovf_count: int) -> None:
+        """Account for one FIFO poll and update the observed sample rate."""
+        self.stats.record(samples, ovf_count)
+        now = time.monotonic()
+        if self._last_record is not None and samples:
+            elapsed = now - self._last_record
+            if elapsed > 0:
+                observed = (samples + ovf_count) / elapsed
+                # smooth, but never plan for less than the configured rate
+                self.rate = max(self.sample_rate, 0.8 * self.rate + 0.2 * observed)
+        self._last_record = now
+
+    def sleep_time(self, fill: int, busy: float = 0.0) -> float:
+        """Seconds until ``target_fill`` samples are expected, given ``fill`` waiting now."""
+        missing = max(0, self.target_fill - fill)
+        return max(self.min_sleep, missing / self.rate - busy)
+
+    def wait(self, fill: int = 0, busy: float = 0.0) -> None:
+        if self.edge is not None:
+            timeout = 2.0 * self.almost_full / self.rate
+            self.edge.wait(timeout)
+            return
+        time.sleep(self.sleep_time(fill, busy))
+
+
+__all__ = ["AcquisitionScheduler", "AcquisitionStats", "EdgeSource", "GPIOEdgeSource"]
@@ -1,14 +1,32 @@
-"""Reusable helpers for reading biometric sensors and producing QR codes."""
+"""Reusable helpers for reading biometric sensors and producing QR codes.
+
+QR codes are built in memory: ``qr_matrix`` encodes a URL once (LRU-cached
+per URL) and ``render_qr`` scales the modules to a display size by whole
+pixels, with no PNG round trip. Writing the PNG is optional and happens on
+a background thread through ``save_qr_async``; the pixels and the PNG come
+from ``qr_raster`` rather than qrcode's image factories.
+
+A capture is accepted on signal quality: a ``signal_quality.StabilityDetector``
+rates the heart-rate monitor's recent estimates, and the capture gives up
+early with ``NoFingerError`` when nothing is on the sensor.
+"""
 from __future__ import annotations
 
 import json
+import math
+import os
 import socket
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Callable, Dict, Optional, Tuple
+from typing import Callable, Dict, Iterator, Optional, Tuple
 
+import numpy as np
 import qrcode
+from PIL import Image
 
 try:  # Hardware libs only exist on the Pi
     import board  # type: ignore
@@ -21,8 +39,16 @@ except Exception:  # pragma: no cover - Windows dev box fallback
 
 try:
     from .heartrate_monitor import HeartRateMonitor
+    from .qr_raster import qr_png, rasterize_qr
+    from .shared_sensor import SensorProcess
+    from .signal_quality import NO_FINGER, StabilityDetector
+    from .simbus import SensorBackend
 except ImportError:  # pragma: no cover - fallback when executed directly
     from heartrate_monitor import HeartRateMonitor
+    from qr_raster import qr_png, rasterize_qr
+    from shared_sensor import SensorProcess
+    from signal_quality import NO_FINGER, StabilityDetector
+    from simbus import SensorBackend
 
 
 SERVER_HOSTNAME = "LAPTOP-OCP2J7E0.local"
@@ -50,65 +76,166 @@ def build_qr_url(base_url: str, temp: float, spo2: float, hr: float) -> str:
     return f"{base_url}temp={temp:.1f}&spo2={spo2:.0f}&hr={hr:.0f}"
 
 
-def generate_qr_code(url: str, output_path: Path) -> Path:
+QR_BOX_SIZE = 10  # pixels per module in the PNG
+QR_BORDER = 4  # quiet zone, in modules
+
+_qr_writer: Optional[ThreadPoolExecutor] = None
+_qr_writer_lock = threading.Lock()
+
+
+@lru_cache(maxsize=32)
+def qr_matrix(url: str) -> np.ndarray:
+    """Modules of the QR code for ``url`` including the quiet zone, True = dark.
+
+    Cached per URL and read-only, so a reading shown, saved and shown again
+    is only encoded once.
+    """
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+        box_size=QR_BOX_SIZE,
+        border=QR_BORDER,
     )
     qr.add_data(url)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    img.save(output_path)
+    matrix = np.array(qr.get_matrix(), dtype=bool)
+    matrix.flags.writeable = False
+    return matrix
+
+
+@lru_cache(maxsize=16)
+def render_qr(url: str, size: int) -> Image.Image:
+    """The QR code for ``url`` as a ``size`` x ``size`` RGB image, for display.
+
+    Modules are scaled nearest-neighbour by the largest whole factor that
+    fits and centred on white (``qr_raster.rasterize_qr``). The image is
+    cached per (url, size) and shared: do not modify it.
+    """
+    return Image.fromarray(rasterize_qr(qr_matrix(url), size=size), "L").convert("RGB")
+
+
+def generate_qr_code(url: str, output_path: Path) -> Path:
+    """Write the QR code for ``url`` as a 1-bit PNG with ``QR_BOX_SIZE`` pixels per module."""
+    output_path = Path(output_path)
+    data = qr_png(qr_matrix(url), QR_BOX_SIZE)
+    # written next to the target and renamed, so readers never see half a file
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, output_path)
     return output_path
 
 
+def save_qr_async(url: str, output_path: Path) -> "Future[Path]":
+    """``generate_qr_code`` on a background writer thread; writes happen in call order."""
+    global _qr_writer
+    with _qr_writer_lock:
+        if _qr_writer is None:
+            _qr_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qr-writer")
+    return _qr_writer.submit(generate_qr_code, url, output_path)
+
+
 @dataclass
 class BiometricReading:
     temperature_c: float
     spo2: float
     heart_rate: float
-    qr_path: Path
+    qr_path: Optional[Path]  # None when no file is written
     url: str
+    qr_saved: Optional["Future[Path]"] = None  # resolves once qr_path is on disk
 
     def as_dict(self) -> Dict[str, str]:
         return {
             "temperature_c": f"{self.temperature_c:.1f}",
             "spo2": f"{self.spo2:.0f}",
             "heart_rate": f"{self.heart_rate:.0f}",
-            "qr_path": str(self.qr_path),
+            "qr_path": str(self.qr_path) if self.qr_path else "",
             "url": self.url,
         }
 
+    def qr_image(self, size: int) -> Image.Image:
+        """This reading's QR code at ``size`` x ``size`` (cached, do not modify)."""
+        return render_qr(self.url, size)
+
     def to_json(self) -> str:
         return json.dumps(self.as_dict())
 
 
+@dataclass(frozen=True)
+class CaptureProgress:
+    """One intermediate reading while waiting for a stable capture."""
+
+    elapsed: float
+    temperature_c: float
+    spo2: float
+    heart_rate: float
+    valid: bool
+    confidence: float = math.nan  # StabilityDetector confidence, 0..1
+    finger: float = math.nan  # share of recent estimates that look like a finger
+
+
+class NoFingerError(TimeoutError):
+    """The capture gave up early because nothing was on the pulse sensor."""
+
+
 class BiometricScanner:
-    """Wrapper around MLX90614 + MAX30105 sensors that blocks until readings are stable."""
+    """Wrapper around MLX90614 + MAX30105 sensors that waits until readings are stable.
+
+    ``capture_once`` blocks; ``capture_async`` returns a ``Future`` at once
+    (``asyncio.wrap_future`` makes it awaitable) and can report each
+    intermediate reading to a callback. Both wake when the heart-rate
+    monitor publishes a new estimate rather than on a fixed poll, so a
+    valid reading is returned as soon as it exists.
+
+    Each capture feeds the estimates it sees into a new detector from
+    ``stability`` and returns the detector's medians once it accepts them.
+    With ``stability=None`` the fixed thresholds in ``_is_valid`` are used
+    instead, on the monitor's averaged values.
+    """
 
     def __init__(
         self,
         hostname: str = SERVER_HOSTNAME,
         port: int = SERVER_PORT,
-        qr_output: Path | str = DEFAULT_QR_PATH,
+        qr_output: Optional[Path | str] = DEFAULT_QR_PATH,
         logger: Callable[[str], None] = print,
+        sensors: Optional[SensorBackend] = None,
+        isolated: bool = False,
+        stability: Optional[Callable[[], StabilityDetector]] = StabilityDetector,
     ) -> None:
         self.logger = logger
+        self.stability = stability
         self.base_url, self.server_ip = resolve_base_url(hostname, port)
-        self.qr_output = Path(qr_output)
+        self.qr_output = Path(qr_output) if qr_output else None  # None: keep the QR in memory only
+        self.sensors = sensors
+        self.sensor_process: Optional[SensorProcess] = None
+        self._capture_executor: Optional[ThreadPoolExecutor] = None
+        self._capture_future: Optional["Future[BiometricReading]"] = None
 
         self.logger(f"Resolved check-in base URL: {self.base_url}")
 
-        if not busio or not board:
-            raise RuntimeError("busio/board libraries are unavailable on this platform")
-
-        self.i2c = busio.I2C(board.SCL, board.SDA)
-        self.mlx = self._init_mlx()
-        self.hrm = self._init_hrm()
+        if isolated:
+            # sensors run in a child process and publish through shared memory,
+            # so inference in this process cannot starve the FIFO reads
+            self.i2c = None
+            self.hrm = self._init_sensor_process(sensors)
+            self.mlx = self.sensor_process.mlx if self.sensor_process else None
+            warmup = 2.0 / max(1.0, sensors.speed) if sensors is not None else 2.0
+        elif sensors is not None:
+            # simulated / replayed sensors, no I2C hardware needed
+            self.i2c = None
+            self.mlx = sensors.mlx
+            self.hrm = self._init_hrm(bus=sensors.max30102_bus)
+            warmup = 2.0 / max(1.0, sensors.speed)
+        else:
+            if not busio or not board:
+                raise RuntimeError("busio/board libraries are unavailable on this platform")
+
+            self.i2c = busio.I2C(board.SCL, board.SDA)
+            self.mlx = self._init_mlx()
+            self.hrm = self._init_hrm()
+            warmup = 2.0
         if self.hrm:
-            time.sleep(2)  # give MAX30105 thread time to warm up
+            time.sleep(warmup)  # give MAX30105 thread time to warm up
 
     def _init_mlx(self):
         if not adafruit_mlx90614:
@@ -121,9 +248,9 @@ class BiometricScanner:
             self.logger("MLX90614 (0x5A) not found; temperature readings will be zero")
             return None
 
-    def _init_hrm(self):
+    def _init_hrm(self, bus=None):
         try:
-            hrm = HeartRateMonitor(print_result=False)
+            hrm = HeartRateMonitor(print_result=False, bus=bus)
             hrm.start_sensor()
             self.logger("MAX30105 heart monitor started")
             return hrm
@@ -131,7 +258,23 @@ class BiometricScanner:
             self.logger(f"MAX30105 failed to start: {exc}")
             return None
 
+    def _init_sensor_process(self, sensors: Optional[SensorBackend]):
+        try:
+            process = SensorProcess(sensors)
+            process.start()
+            self.sensor_process = process
+            self.logger("Sensor process started")
+            return process.hrm
+        except Exception as exc:  # pragma: no cover - hardware specific
+            self.logger(f"Sensor process failed to start: {exc}")
+            return None
+
     def shutdown(self) -> None:
+        if self._capture_future is not None:
+            self._capture_future.cancel()
+        if self._capture_executor is not None:
+            self._capture_executor.shutdown(wait=False)
+            self._capture_executor = None
         if self.hrm:
             try:
                 self.hrm.stop_sensor()
@@ -154,6 +297,10 @@ class BiometricScanner:
     def read_spo2_hr(self) -> Tuple[float, float]:
         if not self.hrm:
             return 0.0, 0.0
+        read = getattr(self.hrm, "read_spo2_hr", None)  # the shared monitor reads both at once
+        if read is not None:
+            spo2, bpm = read()
+            return float(spo2), float(bpm)
         return float(self.hrm.spo2), float(self.hrm.bpm)
 
     def _is_valid(self, temp: float, spo2: float, hr: float) -> bool:
@@ -165,34 +312,138 @@ class BiometricScanner:
         strong_pulse = hr > VALID_HR_THRESHOLD and spo2 > VALID_SPO2_THRESHOLD
         return (sum(checks) >= MIN_VALID_SIGNALS and strong_pulse) or strong_pulse
 
+    def _wait_for_sensor(self, seen: int, timeout: float, poll_interval: float) -> int:
+        """Wait for the next heart-rate estimate, or ``poll_interval`` without a monitor that signals."""
+        wait = getattr(self.hrm, "wait_for_update", None)
+        if wait is None:
+            time.sleep(min(timeout, poll_interval))
+            return seen
+        return wait(seen, timeout)
+
     # --- Public API ------------------------------------------------------
-    def capture_once(
+    def readings(
         self,
         timeout: float = 45.0,
         poll_interval: float = 0.5,
-    ) -> BiometricReading:
-        start = time.time()
-        while time.time() - start <= timeout:
+        cancelled: Callable[[], bool] = lambda: False,
+    ) -> Iterator[CaptureProgress]:
+        """Yield the current reading, then one per new sensor estimate, until one is valid.
+
+        The valid reading is the last one yielded. Stops early, without a
+        valid reading, once ``cancelled()`` is true (checked at least every
+        0.25 s); raises ``TimeoutError`` after ``timeout`` seconds, or
+        ``NoFingerError`` as soon as the detector decides nothing is on
+        the sensor. ``poll_interval`` only applies to monitors that cannot
+        signal updates.
+        """
+        start = time.monotonic()
+        seen = getattr(self.hrm, "updates", 0)
+        detector = self.stability() if self.stability is not None and hasattr(self.hrm, "estimate") else None
+        fed = seen  # estimates from before the capture started are not used
+        last_logged = None
+        while not cancelled():
+            elapsed = time.monotonic() - start
             temp_c = self.read_temp()
             spo2, hr = self.read_spo2_hr()
-            self.logger(
-                f"Waiting for stable data... (T:{temp_c:.1f}, HR:{hr:.0f}, SpO2:{spo2:.0f})"
-            )
-            if self._is_valid(temp_c, spo2, hr):
-                url = build_qr_url(self.base_url, temp_c, spo2, hr)
-                qr_path = generate_qr_code(url, self.qr_output)
+            if detector is None:
+                valid = self._is_valid(temp_c, spo2, hr)
+                confidence, finger = float(valid), math.nan
+            else:
+                updates = self.hrm.updates
+                estimate = self.hrm.estimate  # read after updates, so never older
+                quality = detector.add(estimate) if updates != fed and estimate is not None else detector.assess()
+                fed = updates
+                if quality.status == NO_FINGER:
+                    raise NoFingerError(f"No finger detected on the sensor for {detector.no_finger_timeout:.0f} s")
+                valid, confidence, finger = quality.accepted, quality.confidence, quality.finger
+                if valid:
+                    spo2, hr = quality.spo2, quality.bpm
+            shown = (round(temp_c, 1), round(hr), round(spo2), round(confidence, 1))
+            if shown != last_logged and not valid:
                 self.logger(
-                    f"Valid reading captured -> Temp:{temp_c:.1f}C HR:{hr:.0f} SpO2:{spo2:.0f}%"
+                    f"Waiting for stable data... (T:{temp_c:.1f}, HR:{hr:.0f}, SpO2:{spo2:.0f}, "
+                    f"confidence:{confidence:.2f})"
                 )
-                return BiometricReading(
-                    temperature_c=temp_c,
-                    spo2=spo2,
-                    heart_rate=hr,
-                    qr_path=qr_path,
-                    url=url,
-                )
-            time.sleep(poll_interval)
-        raise TimeoutError("Timed out waiting for a stable biometric reading")
+                last_logged = shown
+            yield CaptureProgress(elapsed, temp_c, spo2, hr, valid, confidence, finger)
+            if valid:
+                return
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                raise TimeoutError("Timed out waiting for a stable biometric reading")
+            seen = self._wait_for_sensor(seen, min(remaining, 0.25), poll_interval)
+
+    def _finish(self, progress: CaptureProgress) -> BiometricReading:
+        temp_c, spo2, hr = progress.temperature_c, progress.spo2, progress.heart_rate
+        url = build_qr_url(self.base_url, temp_c, spo2, hr)
+        qr_matrix(url)  # encode here, not on the caller's (GUI) thread
+        qr_saved = save_qr_async(url, self.qr_output) if self.qr_output else None
+        self.logger(f"Valid reading captured -> Temp:{temp_c:.1f}C HR:{hr:.0f} SpO2:{spo2:.0f}%")
+        return BiometricReading(
+            temperature_c=temp_c,
+            spo2=spo2,
+            heart_rate=hr,
+            qr_path=self.qr_output,
+            url=url,
+            qr_saved=qr_saved,
+        )
 
+    def capture_once(
+        self,
+        timeout: float = 45.0,
+        poll_interval: float = 0.5,
+    ) -> BiometricReading:
+        for progress in self.readings(timeout, poll_interval):
+            if progress.valid:
+                return self._finish(progress)
+        raise TimeoutError("Timed out waiting for a stable biometric reading")  # pragma: no cover
 
-__all__ = ["BiometricScanner", "BiometricReading", "generate_qr_code", "build_qr_url"]
+    def capture_async(
+        self,
+        timeout: float = 45.0,
+        on_progress: Optional[Callable[[CaptureProgress], None]] = None,
+        poll_interval: float = 0.5,
+    ) -> "Future[BiometricReading]":
+        """Start a capture on the scanner's worker thread and return its ``Future``.
+
+        ``on_progress`` is called on that thread with every ``CaptureProgress``.
+        The future stays pending until the capture ends, so ``cancel()``
+        succeeds and stops the capture at the next sensor update (within
+        0.25 s). It fails with ``TimeoutError`` after ``timeout`` seconds.
+        Captures queue behind each other.
+        """
+        future: "Future[BiometricReading]" = Future()
+        if self._capture_executor is None:
+            self._capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="biometric-capture")
+        self._capture_future = future
+        self._capture_executor.submit(self._run_capture, future, timeout, on_progress, poll_interval)
+        return future
+
+    def _run_capture(self, future, timeout, on_progress, poll_interval) -> None:
+        reading = None
+        try:
+            for progress in self.readings(timeout, poll_interval, cancelled=future.cancelled):
+                if on_progress is not None:
+                    on_progress(progress)
+                if progress.valid:
+                    reading = self._finish(progress)
+        except BaseException as exc:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(exc)
+            return
+        # False (and the waiters notified) if it was cancelled meanwhile
+        if future.set_running_or_notify_cancel():
+            future.set_result(reading)
+
+
+__all__ = [
+    "BiometricScanner",
+    "BiometricReading",
+    "CaptureProgress",
+    "NoFingerError",
+    "build_qr_url",
+    "generate_qr_code",
+    "qr_matrix",
+    "render_qr",
+    "save_qr_async",
+]
@@ -1,4 +1,7 @@
-from max30102 import MAX30102
+from max30102 import MAX30102, REG_INTR_ENABLE_1, INTR_A_FULL
+from ringbuffer import SampleRing
+from acquisition import AcquisitionScheduler
+from signal_quality import Estimate
 import hrcalc
 import threading
 import time
@@ -10,68 +13,134 @@ class HeartRateMonitor(object):
     A class that encapsulates the max30102 device into a thread
     """
 
-    LOOP_TIME = 0.01
-
-    def __init__(self, print_raw=False, print_result=False):
+    def __init__(self, print_raw=False, print_result=False, streaming=False, burst=True, bus=None,
+                 interrupt=None, publisher=None):
         self.bpm = 0
         self.spo2 = 0  # <--- FIX 1: Initialize spo2 variable
         if print_raw is True:
             print('IR, Red')
         self.print_raw = print_raw
         self.print_result = print_result
+        # streaming=True updates the estimate per sample instead of
+        # re-running hrcalc over the whole 100-sample window
+        self.streaming = streaming
+        # burst=True drains the FIFO with block reads, False reads it one
+        # sample (three I2C transactions) at a time
+        self.burst = burst
+        # optional SMBus-like object (e.g. simbus.FakeMAX30102Bus) for the sensor
+        self.bus = bus
+        # optional acquisition.EdgeSource on the sensor INT pin; without it the
+        # thread sleeps until the FIFO should hold the next batch of samples
+        self.interrupt = interrupt
+        self.stats = None
+        # optional object with publish_samples(ir, red), called with every
+        # block read from the FIFO (shared_sensor uses it to export samples)
+        self.publisher = publisher
+        # bumped whenever bpm/spo2 are recomputed, see wait_for_update()
+        self.updates = 0
+        self._updated = threading.Condition()
+        # raw result of the last recomputation (signal_quality.Estimate), before
+        # the averaging and finger check applied to bpm/spo2
+        self.estimate = None
 
     def run_sensor(self):
-        sensor = MAX30102()
-        ir_data = []
-        red_data = []
-        bpms = []
+        sensor = MAX30102(bus=self.bus)
+        if self.interrupt is not None:
+            # wake on FIFO almost full only, not on every new sample
+            sensor.set_config(REG_INTR_ENABLE_1, [INTR_A_FULL])
+        scheduler = AcquisitionScheduler.for_sensor(sensor, edge=self.interrupt)
+        self.stats = scheduler.stats
+        # rows: IR, red; preallocated so the loop does not allocate per sample
+        samples = SampleRing(hrcalc.BUFFER_SIZE, channels=2)
+        bpms = SampleRing(4, dtype=np.float64)
+        estimator = hrcalc.StreamingHrSpo2Estimator() if self.streaming else None
 
         # run until told to stop
         while not self._thread.stopped:
+            poll_start = time.monotonic()
+            if self.interrupt is not None:
+                sensor.read_interrupt_status()  # releases the INT line
             # check if any data is available
-            num_bytes = sensor.get_data_present()
+            num_bytes, ovf_count = sensor.get_fifo_status()
+            scheduler.record(num_bytes, ovf_count)
             if num_bytes > 0:
-                # grab all the data and stash it into arrays
-                while num_bytes > 0:
-                    red, ir = sensor.read_fifo()
-                    num_bytes -= 1
-                    ir_data.append(ir)
-                    red_data.append(red)
-                    if self.print_raw:
+                result = None
+                # grab all the data and stash it into the ring
+                if self.burst:
+                    red_buf, ir_buf = sensor.read_fifo_burst(num_bytes)
+                else:
+                    red_buf, ir_buf = np.array([sensor.read_fifo() for _ in range(num_bytes)]).T
+                samples.extend((ir_buf, red_buf))
+                if self.publisher is not None:
+                    self.publisher.publish_samples(ir_buf, red_buf)
+                if self.print_raw:
+                    for ir, red in zip(ir_buf.tolist(), red_buf.tolist()):
                         print("{0}, {1}".format(ir, red))
 
-                while len(ir_data) > 100:
-                    ir_data.pop(0)
-                    red_data.pop(0)
+                if estimator is not None:
+                    for red, ir in zip(red_buf.tolist(), ir_buf.tolist()):
+                        result = estimator.push(red, ir)
+                    if not estimator.ready:
+                        result = None
+                    ir_mean, red_mean = estimator.ir_dc, estimator.red_dc
+                    ir_win = estimator.window_data()[0]
+                elif samples.full:
+                    ir_win, red_win = samples.view()
+                    result = hrcalc.calc_hr_and_spo2(ir_win, red_win)
+                    ir_mean, red_mean = ir_win.mean(), red_win.mean()
 
-                if len(ir_data) == 100:
-                    bpm, valid_bpm, spo2, valid_spo2 = hrcalc.calc_hr_and_spo2(ir_data, red_data)
+                if result is not None:
+                    bpm, valid_bpm, spo2, valid_spo2 = result
+                    self.estimate = Estimate(float(bpm), bool(valid_bpm), float(spo2), bool(valid_spo2),
+                                             float(ir_mean), hrcalc.perfusion_index(ir_win))
                     if valid_bpm:
                         bpms.append(bpm)
-                        while len(bpms) > 4:
-                            bpms.pop(0)
-                        self.bpm = np.mean(bpms)
+                        self.bpm = np.mean(bpms.view()[0])
                         self.spo2 = spo2  # <--- FIX 2: Store the calculated spo2
                         
-                        if (np.mean(ir_data) < 50000 and np.mean(red_data) < 50000):
+                        if (ir_mean < 50000 and red_mean < 50000):
                             self.bpm = 0
                             self.spo2 = 0  # <--- FIX 3: Reset spo2 when finger is not detected
                             if self.print_result:
                                 print("Finger not detected")
                         if self.print_result:
                             print("BPM: {0}, SpO2: {1}".format(self.bpm, self.spo2)) # Changed spo2 to self.spo2 for consistency
+                    self._notify_update()
 
-            time.sleep(self.LOOP_TIME)
+            scheduler.wait(busy=time.monotonic() - poll_start)
 
         sensor.shutdown()
 
+    def _notify_update(self):
+        with self._updated:
+            self.updates += 1
+            self._updated.notify_all()
+
+    def wait_for_update(self, seen, timeout=None):
+        """
+        Block until ``updates`` differs from ``seen`` (a new estimate, or the
+        sensor stopping) or ``timeout`` passes; returns the current ``updates``.
+        """
+        with self._updated:
+            self._updated.wait_for(lambda: self.updates != seen, timeout)
+            return self.updates
+
     def start_sensor(self):
         self._thread = threading.Thread(target=self.run_sensor)
         self._thread.stopped = False
         self._thread.start()
 
+    def acquisition_stats(self):
+        """
+        Samples/s, overflow events and missed samples of the current run.
+        """
+        return self.stats.as_dict() if self.stats is not None else {}
+
     def stop_sensor(self, timeout=2.0):
         self._thread.stopped = True
+        if self.interrupt is not None:
+            self.interrupt.trigger()  # wake the thread if it waits for INT
         self.bpm = 0
         self.spo2 = 0 # <--- FIX 4: Reset spo2 when sensor is stopped
+        self._notify_update()
         self._thread.join(timeout)
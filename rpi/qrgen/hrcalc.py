@@ -2,6 +2,11 @@
 
 import numpy as np
 
+try:
+    from .ringbuffer import SampleRing
+except ImportError:  # executed as a script / plain module
+    from ringbuffer import SampleRing
+
 # 25 samples per second (in algorithm.h)
 SAMPLE_FREQ = 25
 # taking moving average of 4 samples when calculating HR
@@ -10,24 +15,38 @@ MA_SIZE = 4
 # sampling frequency * 4 (in algorithm.h)
 BUFFER_SIZE = 100
 
+# the C implementation initialises the DC maxima with -2^24
+DC_MAX_FLOOR = -16777216
+# at most this many AC/DC ratios are used for the median
+MAX_RATIOS = 5
+
 
-# this assumes ir_data and red_data as np.array
+# ir_data and red_data may be lists or np.arrays of raw integer samples.
+# everything below works on whole arrays; the original per-sample loops
+# (a straight port of algorithm.cpp) are kept in benchmarks/hrcalc_reference.py
+# and the results are identical on the benchmark corpus.
 def calc_hr_and_spo2(ir_data, red_data):
     """
     By detecting  peaks of PPG cycle and corresponding AC/DC
     of red/infra-red signal, the an_ratio for the SPO2 is computed.
     """
+    ir = np.asarray(ir_data, dtype=np.int64)
+    red = np.asarray(red_data, dtype=np.int64)
+
     # get dc mean
-    ir_mean = int(np.mean(ir_data))
+    ir_mean = int(np.mean(ir))
 
     # remove DC mean and inver signal
     # this lets peak detecter detect valley
-    x = -1 * (np.array(ir_data) - ir_mean)
+    x = -1 * (ir - ir_mean)
 
     # 4 point moving average
-    # x is np.array with int values, so automatically casted to int
-    for i in range(x.shape[0] - MA_SIZE):
-        x[i] = np.sum(x[i:i+MA_SIZE]) / MA_SIZE
+    # only the first len - MA_SIZE samples are averaged (as in algorithm.h),
+    # the float result is truncated back to int like the in-place loop did
+    n_avg = x.shape[0] - MA_SIZE
+    if n_avg > 0:
+        sums = np.convolve(x, np.ones(MA_SIZE), mode="valid")[:n_avg]
+        x[:n_avg] = (sums / MA_SIZE).astype(np.int64)
 
     # calculate threshold
     n_th = int(np.mean(x))
@@ -35,11 +54,9 @@ def calc_hr_and_spo2(ir_data, red_data):
     n_th = 60 if n_th > 60 else n_th  # max allowed
 
     ir_valley_locs, n_peaks = find_peaks(x, BUFFER_SIZE, n_th, 4, 15)
-    # print(ir_valley_locs[:n_peaks], ",", end="")
-    peak_interval_sum = 0
     if n_peaks >= 2:
-        for i in range(1, n_peaks):
-            peak_interval_sum += (ir_valley_locs[i] - ir_valley_locs[i-1])
+        # sum of the intervals between consecutive valleys
+        peak_interval_sum = int(ir_valley_locs[n_peaks - 1] - ir_valley_locs[0])
         peak_interval_sum = int(peak_interval_sum / (n_peaks - 1))
         hr = int(SAMPLE_FREQ * 60 / peak_interval_sum)
         hr_valid = True
@@ -49,54 +66,16 @@ def calc_hr_and_spo2(ir_data, red_data):
 
     # ---------spo2---------
 
-    # find precise min near ir_valley_locs (???)
-    exact_ir_valley_locs_count = n_peaks
-
-    # find ir-red DC and ir-red AC for SPO2 calibration ratio
-    # find AC/DC maximum of raw
+    valleys = ir_valley_locs[:n_peaks]
 
     # FIXME: needed??
-    for i in range(exact_ir_valley_locs_count):
-        if ir_valley_locs[i] > BUFFER_SIZE:
-            spo2 = -999  # do not use SPO2 since valley loc is out of range
-            spo2_valid = False
-            return hr, hr_valid, spo2, spo2_valid
-
-    i_ratio_count = 0
-    ratio = []
-
-    # find max between two valley locations
-    # and use ratio between AC component of Ir and Red DC component of Ir and Red for SpO2
-    red_dc_max_index = -1
-    ir_dc_max_index = -1
-    for k in range(exact_ir_valley_locs_count-1):
-        red_dc_max = -16777216
-        ir_dc_max = -16777216
-        if ir_valley_locs[k+1] - ir_valley_locs[k] > 3:
-            for i in range(ir_valley_locs[k], ir_valley_locs[k+1]):
-                if ir_data[i] > ir_dc_max:
-                    ir_dc_max = ir_data[i]
-                    ir_dc_max_index = i
-                if red_data[i] > red_dc_max:
-                    red_dc_max = red_data[i]
-                    red_dc_max_index = i
-
-            red_ac = int((red_data[ir_valley_locs[k+1]] - red_data[ir_valley_locs[k]]) * (red_dc_max_index - ir_valley_locs[k]))
-            red_ac = red_data[ir_valley_locs[k]] + int(red_ac / (ir_valley_locs[k+1] - ir_valley_locs[k]))
-            red_ac = red_data[red_dc_max_index] - red_ac  # subtract linear DC components from raw
-
-            ir_ac = int((ir_data[ir_valley_locs[k+1]] - ir_data[ir_valley_locs[k]]) * (ir_dc_max_index - ir_valley_locs[k]))
-            ir_ac = ir_data[ir_valley_locs[k]] + int(ir_ac / (ir_valley_locs[k+1] - ir_valley_locs[k]))
-            ir_ac = ir_data[ir_dc_max_index] - ir_ac  # subtract linear DC components from raw
-
-            nume = red_ac * ir_dc_max
-            denom = ir_ac * red_dc_max
-            if (denom > 0 and i_ratio_count < 5) and nume != 0:
-                # original cpp implementation uses overflow intentionally.
-                # but at 64-bit OS, Pyhthon 3.X uses 64-bit int and nume*100/denom does not trigger overflow
-                # so using bit operation ( &0xffffffff ) is needed
-                ratio.append(int(((nume * 100) & 0xffffffff) / denom))
-                i_ratio_count += 1
+    if np.any(valleys > BUFFER_SIZE):
+        spo2 = -999  # do not use SPO2 since valley loc is out of range
+        spo2_valid = False
+        return hr, hr_valid, spo2, spo2_valid
+
+    ratio = _ac_dc_ratios(ir, red, valleys)
+    i_ratio_count = len(ratio)
 
     # choose median value since PPG signal may vary from beat to beat
     ratio = sorted(ratio)  # sort to ascending order
@@ -110,7 +89,6 @@ def calc_hr_and_spo2(ir_data, red_data):
             ratio_ave = ratio[mid_index]
 
     # why 184?
-    # print("ratio average: ", ratio_ave)
     if ratio_ave > 2 and ratio_ave < 184:
         # -45.060 * ratioAverage * ratioAverage / 10000 + 30.354 * ratioAverage / 100 + 94.845
         spo2 = -45.060 * (ratio_ave**2) / 10000.0 + 30.054 * ratio_ave / 100.0 + 94.845
@@ -122,6 +100,88 @@ def calc_hr_and_spo2(ir_data, red_data):
     return hr, hr_valid, spo2, spo2_valid
 
 
+def perfusion_index(ir_data):
+    """
+    IR perfusion index: the pulsatile (AC) part of the light over the
+    steady (DC) part, in percent.
+
+    AC is the 5th to 95th percentile spread once a straight line through
+    the window is removed, so slow baseline drift does not count as pulse.
+    Returns 0 for a window that is too short or dark.
+    """
+    ir = np.asarray(ir_data, dtype=np.float64)
+    n = ir.shape[0]
+    if n < 2:
+        return 0.0
+    dc = ir.mean()
+    if dc <= 0:
+        return 0.0
+    t = np.arange(n) - (n - 1) / 2.0
+    slope = np.dot(t, ir - dc) / np.dot(t, t)
+    low, high = np.percentile(ir - dc - slope * t, (5, 95))
+    return float(100.0 * (high - low) / dc)
+
+
+def _ac_dc_ratios(ir, red, valleys):
+    """
+    Compute the red/IR AC/DC ratio for every valley-to-valley segment.
+
+    Each segment is gathered into a row of a padded matrix so the DC maxima
+    are found with one argmax call. Returns at most MAX_RATIOS ratios as ints,
+    in segment order.
+    """
+    if valleys.shape[0] < 2:
+        return []
+
+    starts = valleys[:-1]
+    ends = valleys[1:]
+    widths = ends - starts
+    # segments of 3 samples or less are skipped
+    keep = widths > 3
+    if not np.any(keep):
+        return []
+    starts = starts[keep]
+    ends = ends[keep]
+    widths = widths[keep]
+
+    # rows hold ir/red[start:end], padded with the floor value so the
+    # padding never wins the argmax (argmax returns the first maximum,
+    # matching the strict ">" of the original scan)
+    offsets = np.arange(int(widths.max()))
+    idx = starts[:, None] + offsets[None, :]
+    inside = offsets[None, :] < widths[:, None]
+    idx = np.where(inside, idx, 0)
+    ir_seg = np.where(inside, ir[idx], DC_MAX_FLOOR)
+    red_seg = np.where(inside, red[idx], DC_MAX_FLOOR)
+
+    rows = np.arange(starts.shape[0])
+    ir_dc_max_index = starts + np.argmax(ir_seg, axis=1)
+    red_dc_max_index = starts + np.argmax(red_seg, axis=1)
+    ir_dc_max = ir_seg[rows, ir_dc_max_index - starts]
+    red_dc_max = red_seg[rows, red_dc_max_index - starts]
+
+    # subtract linear DC components from raw
+    red_ac = (red[ends] - red[starts]) * (red_dc_max_index - starts)
+    red_ac = red[starts] + np.trunc(red_ac / widths).astype(np.int64)
+    red_ac = red[red_dc_max_index] - red_ac
+
+    ir_ac = (ir[ends] - ir[starts]) * (ir_dc_max_index - starts)
+    ir_ac = ir[starts] + np.trunc(ir_ac / widths).astype(np.int64)
+    ir_ac = ir[ir_dc_max_index] - ir_ac
+
+    nume = red_ac * ir_dc_max
+    denom = ir_ac * red_dc_max
+    valid = (denom > 0) & (nume != 0)
+    nume = nume[valid][:MAX_RATIOS]
+    denom = denom[valid][:MAX_RATIOS]
+
+    # original cpp implementation uses overflow intentionally.
+    # but at 64-bit OS, Pyhthon 3.X uses 64-bit int and nume*100/denom does not trigger overflow
+    # so using bit operation ( &0xffffffff ) is needed
+    ratios = np.trunc(((nume * 100) & 0xffffffff) / denom).astype(np.int64)
+    return [int(r) for r in ratios]
+
+
 def find_peaks(x, size, min_height, min_dist, max_num):
     """
     Find at most MAX_NUM peaks above MIN_HEIGHT separated by at least MIN_DISTANCE
@@ -137,59 +197,254 @@ def find_peaks(x, size, min_height, min_dist, max_num):
 def find_peaks_above_min_height(x, size, min_height, max_num):
     """
     Find all peaks above MIN_HEIGHT
+
+    A sample is a peak when it rises above its left neighbour and the next
+    sample with a different value (i.e. after a flat top) is lower. The scan
+    stops at size - 1, and at index 0 the left neighbour is x[-1], both as in
+    the original while-loop.
     """
+    x = np.asarray(x)
+    if size < 2:
+        return np.zeros(0, dtype=np.int64), 0
+    head = x[:size]
+    n = size - 1  # candidate positions 0 .. size-2
 
-    i = 0
-    n_peaks = 0
-    ir_valley_locs = []  # [0 for i in range(max_num)]
-    while i < size - 1:
-        if x[i] > min_height and x[i] > x[i-1]:  # find the left edge of potential peaks
-            n_width = 1
-            # original condition i+n_width < size may cause IndexError
-            # so I changed the condition to i+n_width < size - 1
-            while i + n_width < size - 1 and x[i] == x[i+n_width]:  # find flat peaks
-                n_width += 1
-            if x[i] > x[i+n_width] and n_peaks < max_num:  # find the right edge of peaks
-                # ir_valley_locs[n_peaks] = i
-                ir_valley_locs.append(i)
-                n_peaks += 1  # original uses post increment
-                i += n_width + 1
-            else:
-                i += n_width
-        else:
-            i += 1
+    left = np.empty(n, dtype=head.dtype)
+    left[0] = x[-1]
+    left[1:] = head[:n - 1]
 
-    return ir_valley_locs, n_peaks
+    # index of the first sample after each position whose value differs,
+    # capped at size - 1 (the flat-peak search never looks further)
+    changed = np.flatnonzero(head[1:] != head[:-1]) + 1
+    next_change = np.full(size, size - 1, dtype=np.int64)
+    next_change[changed] = changed
+    next_change = np.minimum.accumulate(next_change[::-1])[::-1]
+    right = head[next_change[1:]]
+
+    cand = head[:n]
+    is_peak = (cand > min_height) & (cand > left) & (cand > right)
+    ir_valley_locs = np.flatnonzero(is_peak)[:max_num]
+
+    return ir_valley_locs, int(ir_valley_locs.shape[0])
 
 
 def remove_close_peaks(n_peaks, ir_valley_locs, x, min_dist):
     """
     Remove peaks separated by less than MIN_DISTANCE
     """
+    locs = np.asarray(ir_valley_locs[:n_peaks], dtype=np.int64)
+    if locs.shape[0] == 0:
+        return locs, 0
+    heights = np.asarray(x)[locs]
 
     # should be equal to maxim_sort_indices_descend
-    # order peaks from large to small
-    # should ignore index:0
-    sorted_indices = sorted(ir_valley_locs, key=lambda i: x[i])
-    sorted_indices.reverse()
-
-    # this "for" loop expression does not check finish condition
-    # for i in range(-1, n_peaks):
-    i = -1
-    while i < n_peaks:
-        old_n_peaks = n_peaks
-        n_peaks = i + 1
-        # this "for" loop expression does not check finish condition
-        # for j in (i + 1, old_n_peaks):
-        j = i + 1
-        while j < old_n_peaks:
-            n_dist = (sorted_indices[j] - sorted_indices[i]) if i != -1 else (sorted_indices[j] + 1)  # lag-zero peak of autocorr is at index -1
-            if n_dist > min_dist or n_dist < -1 * min_dist:
-                sorted_indices[n_peaks] = sorted_indices[j]
-                n_peaks += 1  # original uses post increment
-            j += 1
-        i += 1
-
-    sorted_indices[:n_peaks] = sorted(sorted_indices[:n_peaks])
-
-    return sorted_indices, n_peaks
+    # order peaks from large to small, ties keep the later index first
+    order = locs[np.lexsort((locs, heights))[::-1]]
+
+    # lag-zero peak of autocorr is at index -1
+    order = order[order + 1 > min_dist]
+
+    # greedy suppression: the tallest remaining peak removes its neighbours
+    kept = []
+    while order.shape[0] > 0:
+        peak = order[0]
+        kept.append(peak)
+        rest = order[1:]
+        order = rest[np.abs(rest - peak) > min_dist]
+
+    kept = np.sort(np.array(kept, dtype=np.int64))
+
+    return kept, int(kept.shape[0])
+
+
+class StreamingHrSpo2Estimator(object):
+    """
+    Per-sample HR/SpO2 estimator that keeps its state between samples.
+
+    push(red, ir) updates a running DC mean, the 4-point moving average, the
+    valley detector and the per-beat AC/DC ratios in O(1) amortized time
+    (a ratio is computed once per beat over that beat's samples) and returns
+    (hr, hr_valid, spo2, spo2_valid) for the last `window` samples.
+
+    The streaming estimates follow the batch algorithm but subtract the DC
+    mean known when a sample arrives rather than the mean of the final
+    window, so numbers can differ slightly from calc_hr_and_spo2. With
+    compat=True the same state is kept but every estimate is taken from
+    calc_hr_and_spo2 on the current window, giving identical numbers at the
+    batch cost.
+    """
+
+    def __init__(self, window=BUFFER_SIZE, compat=False, min_dist=4, max_peaks=15):
+        self.window = window
+        self.compat = compat
+        self.min_dist = min_dist
+        self.max_peaks = max_peaks
+        self.reset()
+
+    def reset(self):
+        # rows: IR, red
+        self._samples = SampleRing(self.window, channels=2)
+        self._x = np.zeros(self.window, dtype=np.int64)
+        self._ir_sum = 0
+        self._red_sum = 0
+        self._ma_sum = 0
+        self._x_sum = 0
+        self._n_x = 0
+        # valley detector state
+        self._prev_x = None
+        self._edge = None  # (index, height) of a rising edge / flat top
+        self._pending = None  # (index, height) of a peak not yet final
+        self._valleys = []  # [index, ratio of the segment ending here]
+        self._estimate = (-999, False, -999, False)
+
+    # --- running statistics --------------------------------------------
+    @property
+    def n_samples(self):
+        return self._samples.total
+
+    @property
+    def ready(self):
+        return self.n_samples >= self.window
+
+    @property
+    def ir_dc(self):
+        n = min(self.n_samples, self.window)
+        return self._ir_sum / n if n else 0.0
+
+    @property
+    def red_dc(self):
+        n = min(self.n_samples, self.window)
+        return self._red_sum / n if n else 0.0
+
+    def window_data(self):
+        """
+        Return (ir, red) views of the current window, oldest sample first.
+        """
+        ir_win, red_win = self._samples.view()
+        return ir_win, red_win
+
+    # --- sample input ----------------------------------------------------
+    def push(self, red, ir):
+        """
+        Add one sample and return (hr, hr_valid, spo2, spo2_valid).
+        """
+        t = self.n_samples
+        window = self._samples.view()
+        if self._samples.full:
+            self._ir_sum -= int(window[0, 0])
+            self._red_sum -= int(window[1, 0])
+        if t >= MA_SIZE:
+            self._ma_sum -= int(window[0, -MA_SIZE])
+        self._samples.append(ir, red)
+        self._ir_sum += ir
+        self._red_sum += red
+
+        # 4-point moving average over raw samples t-3 .. t, it becomes the
+        # filtered value of sample t-3 exactly like x[i] in the batch code
+        self._ma_sum += ir
+        if t >= MA_SIZE - 1:
+            ir_mean = int(self.ir_dc)
+            value = int((MA_SIZE * ir_mean - self._ma_sum) / MA_SIZE)
+            self._push_filtered(t - MA_SIZE + 1, value)
+
+        if self.ready:
+            if self.compat:
+                ir_win, red_win = self.window_data()
+                self._estimate = calc_hr_and_spo2(ir_win, red_win)
+            else:
+                self._estimate = self._streaming_estimate()
+        return self._estimate
+
+    def _push_filtered(self, idx, value):
+        x_slot = self._n_x % self.window
+        if self._n_x >= self.window:
+            self._x_sum -= int(self._x[x_slot])
+        self._x[x_slot] = value
+        self._x_sum += value
+        self._n_x += 1
+
+        n_th = int(self._x_sum / min(self._n_x, self.window))
+        n_th = min(max(n_th, 30), 60)
+
+        # forget valleys that left the window
+        oldest = self.n_samples - self.window
+        while self._valleys and self._valleys[0][0] < oldest:
+            self._valleys.pop(0)
+            if self._valleys:
+                self._valleys[0][1] = None
+
+        prev = self._prev_x
+        self._prev_x = value
+        if prev is not None:
+            if value > prev:
+                # rising edge, remember where a (possibly flat) top starts
+                self._edge = (idx, value) if value > n_th else None
+            elif value < prev and self._edge is not None:
+                self._add_peak(*self._edge)
+                self._edge = None
+
+        # a pending peak can no longer be displaced once it is min_dist old
+        if self._pending is not None and idx - self._pending[0] > self.min_dist:
+            self._commit(self._pending[0])
+            self._pending = None
+
+    def _add_peak(self, idx, height):
+        pending = self._pending
+        if pending is not None and idx - pending[0] <= self.min_dist:
+            # close peaks: keep the taller one (the later one on a tie)
+            if height >= pending[1]:
+                self._pending = (idx, height)
+            return
+        if pending is not None:
+            self._commit(pending[0])
+        self._pending = (idx, height)
+
+    def _commit(self, idx):
+        ratio = None
+        if self._valleys:
+            start = self._valleys[-1][0]
+            if idx - start > 3:
+                ratio = self._segment_ratio(start, idx)
+        self._valleys.append([idx, ratio])
+        if len(self._valleys) > self.max_peaks:
+            self._valleys.pop(0)
+            self._valleys[0][1] = None
+
+    def _segment_ratio(self, start, end):
+        window = self._samples.view()
+        offset = start - (self.n_samples - window.shape[1])
+        if offset < 0:
+            return None
+        length = end - start + 1
+        ir_seg = window[0, offset:offset + length]
+        red_seg = window[1, offset:offset + length]
+        ratios = _ac_dc_ratios(ir_seg, red_seg, np.array([0, length - 1]))
+        return ratios[0] if ratios else None
+
+    def _streaming_estimate(self):
+        valleys = self._valleys
+        n_peaks = len(valleys)
+        if n_peaks >= 2:
+            interval = int((valleys[-1][0] - valleys[0][0]) / (n_peaks - 1))
+            hr = int(SAMPLE_FREQ * 60 / interval)
+            hr_valid = True
+        else:
+            hr = -999
+            hr_valid = False
+
+        ratio = sorted([v[1] for v in valleys if v[1] is not None][:MAX_RATIOS])
+        mid_index = int(len(ratio) / 2)
+        ratio_ave = 0
+        if mid_index > 1:
+            ratio_ave = int((ratio[mid_index-1] + ratio[mid_index])/2)
+        elif ratio:
+            ratio_ave = ratio[mid_index]
+
+        if ratio_ave > 2 and ratio_ave < 184:
+            spo2 = -45.060 * (ratio_ave**2) / 10000.0 + 30.054 * ratio_ave / 100.0 + 94.845
+            spo2_valid = True
+        else:
+            spo2 = -999
+            spo2_valid = False
+
+        return hr, hr_valid, spo2, spo2_valid
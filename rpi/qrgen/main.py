@@ -1,4 +1,6 @@
 from heartrate_monitor import HeartRateMonitor
+from simbus import FakeMAX30102Bus, PPGWaveform, TraceReplay
+from acquisition import EdgeSource, GPIOEdgeSource
 import time
 import argparse
 
@@ -7,15 +9,45 @@ parser.add_argument("-r", "--raw", action="store_true",
                     help="print raw data instead of calculation result")
 parser.add_argument("-t", "--time", type=int, default=30,
                     help="duration in seconds to read from sensor, default 30")
+parser.add_argument("-s", "--streaming", action="store_true",
+                    help="update the estimate per sample instead of per 100-sample window")
+parser.add_argument("--simulate", action="store_true",
+                    help="use a simulated sensor instead of the I2C device")
+parser.add_argument("--replay", metavar="TRACE",
+                    help="replay a trace recorded with --raw instead of the I2C device")
+parser.add_argument("--speed", type=float, default=1.0,
+                    help="playback speed for --simulate/--replay, default 1")
+parser.add_argument("--int-pin", type=int, metavar="GPIO",
+                    help="wait for the sensor INT pin on this GPIO instead of timed polling")
 args = parser.parse_args()
 
+bus = None
+if args.replay:
+    bus = FakeMAX30102Bus(TraceReplay(args.replay), speed=args.speed)
+elif args.simulate:
+    bus = FakeMAX30102Bus(PPGWaveform(), speed=args.speed)
+
+interrupt = None
+if args.int_pin is not None:
+    if bus is not None:
+        # the simulator drives the edge source itself
+        interrupt = EdgeSource()
+        bus.connect_interrupt(interrupt)
+    else:
+        interrupt = GPIOEdgeSource(args.int_pin)
+
 print('sensor starting...')
-hrm = HeartRateMonitor(print_raw=args.raw, print_result=(not args.raw))
+hrm = HeartRateMonitor(print_raw=args.raw, print_result=(not args.raw),
+                       streaming=args.streaming, bus=bus, interrupt=interrupt)
 hrm.start_sensor()
 try:
     time.sleep(args.time)
 except KeyboardInterrupt:
     print('keyboard interrupt detected, exiting...')
 
+stats = hrm.acquisition_stats()
 hrm.stop_sensor()
-print('sensor stoped!')
\ No newline at end of file
+print('sensor stoped!')
+if not args.raw:
+    print("{samples_per_s:.1f} samples/s, {wakeups_per_s:.1f} wakeups/s, "
+          "{overflow_events} FIFO overflows, {missed_samples} missed samples".format(**stats))
\ No newline at end of file
@@ -3,7 +3,12 @@
 # this code is currently for python 2.7
 from __future__ import print_function
 from time import sleep
-import smbus
+import numpy as np
+
+try:  # only available on the Pi; pass `bus` to MAX30102 elsewhere
+    import smbus
+except ImportError:
+    smbus = None
 
 # register addresses
 REG_INTR_STATUS_1 = 0x00
@@ -34,14 +39,48 @@ REG_PROX_INT_THRESH = 0x30
 REG_REV_ID = 0xFE
 REG_PART_ID = 0xFF
 
+# the FIFO holds 32 samples, each sample is 3 bytes red + 3 bytes IR
+FIFO_DEPTH = 32
+BYTES_PER_SAMPLE = 6
+# SMBus block transfers are limited to 32 bytes, so read 5 whole samples at a time
+SAMPLES_PER_BLOCK = 32 // BYTES_PER_SAMPLE
+
+# SPO2_CONFIG[4:2] ADC sample rates and FIFO_CONFIG[7:5] sample averaging
+ADC_SAMPLE_RATES = (50, 100, 200, 400, 800, 1000, 1600, 3200)
+FIFO_AVERAGING = (1, 2, 4, 8, 16, 32, 32, 32)
+
+# INTR_STATUS_1 / INTR_ENABLE_1 bits
+INTR_A_FULL = 0x80
+INTR_PPG_RDY = 0x40
+
+
+def decode_fifo(data):
+    """
+    Decode raw FIFO bytes (6 per sample) into red and IR uint32 arrays.
+    """
+    raw = np.frombuffer(bytes(data), dtype=np.uint8).reshape(-1, BYTES_PER_SAMPLE)
+    raw = raw.astype(np.uint32)
+    # mask MSB [23:18]
+    red = (raw[:, 0] << 16 | raw[:, 1] << 8 | raw[:, 2]) & 0x03FFFF
+    ir = (raw[:, 3] << 16 | raw[:, 4] << 8 | raw[:, 5]) & 0x03FFFF
+    return red, ir
+
 
 class MAX30102():
     # by default, this assumes that the device is at 0x57 on channel 1
-    def __init__(self, channel=1, address=0x57):
+    # pass `bus` to use an already opened (or fake) SMBus-like object
+    def __init__(self, channel=1, address=0x57, bus=None):
         #print("Channel: {0}, address: {1}".format(channel, address))
         self.address = address
         self.channel = channel
-        self.bus = smbus.SMBus(self.channel)
+        if bus is None:
+            if smbus is None:
+                raise RuntimeError("smbus is not installed; pass an SMBus-like `bus` instead")
+            bus = smbus.SMBus(self.channel)
+        self.bus = bus
+        # register values written by setup(), used to derive the sample timing
+        self.fifo_config = 0x00
+        self.spo2_config = 0x00
 
         self.reset()
 
@@ -85,13 +124,13 @@ class MAX30102():
 
         # 0b 0100 1111
         # sample avg = 4, fifo rollover = false, fifo almost full = 17
-        self.bus.write_i2c_block_data(self.address, REG_FIFO_CONFIG, [0x4f])
+        self.set_config(REG_FIFO_CONFIG, [0x4f])
 
         # 0x02 for read-only, 0x03 for SpO2 mode, 0x07 multimode LED
         self.bus.write_i2c_block_data(self.address, REG_MODE_CONFIG, [led_mode])
         # 0b 0010 0111
         # SPO2_ADC range = 4096nA, SPO2 sample rate = 100Hz, LED pulse-width = 411uS
-        self.bus.write_i2c_block_data(self.address, REG_SPO2_CONFIG, [0x27])
+        self.set_config(REG_SPO2_CONFIG, [0x27])
 
         # choose value for ~7mA for LED1
         self.bus.write_i2c_block_data(self.address, REG_LED1_PA, [0x24])
@@ -104,18 +143,58 @@ class MAX30102():
     # use when changing the values from default
     def set_config(self, reg, value):
         self.bus.write_i2c_block_data(self.address, reg, value)
+        if reg == REG_FIFO_CONFIG:
+            self.fifo_config = value[0]
+        elif reg == REG_SPO2_CONFIG:
+            self.spo2_config = value[0]
+
+    @property
+    def sample_rate(self):
+        """
+        Samples per second entering the FIFO (ADC rate / sample averaging).
+        """
+        adc_rate = ADC_SAMPLE_RATES[(self.spo2_config >> 2) & 0x07]
+        return adc_rate / FIFO_AVERAGING[(self.fifo_config >> 5) & 0x07]
+
+    @property
+    def fifo_almost_full(self):
+        """
+        Number of samples in the FIFO at which A_FULL is raised.
+        """
+        return FIFO_DEPTH - (self.fifo_config & 0x0F)
+
+    def read_interrupt_status(self):
+        """
+        Read (and so clear) both interrupt status registers in one transaction.
+        """
+        status_1, status_2 = self.bus.read_i2c_block_data(self.address, REG_INTR_STATUS_1, 2)
+        return status_1, status_2
+
+    def read_fifo_pointers(self):
+        """
+        Read FIFO_WR_PTR, OVF_COUNTER and FIFO_RD_PTR in one transaction
+        (the three registers are adjacent).
+        """
+        write_ptr, ovf_count, read_ptr = self.bus.read_i2c_block_data(self.address, REG_FIFO_WR_PTR, 3)
+        return write_ptr, ovf_count, read_ptr
+
+    def get_fifo_status(self):
+        """
+        Return (samples waiting in the FIFO, OVF_COUNTER) from one pointer read.
+        OVF_COUNTER counts samples lost to a full FIFO (saturates at 31).
+        """
+        write_ptr, ovf_count, read_ptr = self.read_fifo_pointers()
+        num_samples = write_ptr - read_ptr
+        # account for pointer wrap around
+        if num_samples < 0:
+            num_samples += FIFO_DEPTH
+        # equal pointers with lost samples means the FIFO is full, not empty
+        if num_samples == 0 and ovf_count > 0:
+            num_samples = FIFO_DEPTH
+        return num_samples, ovf_count
 
     def get_data_present(self):
-        read_ptr = self.bus.read_byte_data(self.address, REG_FIFO_RD_PTR)
-        write_ptr = self.bus.read_byte_data(self.address, REG_FIFO_WR_PTR)
-        if read_ptr == write_ptr:
-            return 0
-        else:
-            num_samples = write_ptr - read_ptr
-            # account for pointer wrap around
-            if num_samples < 0:
-                num_samples += 32
-            return num_samples
+        return self.get_fifo_status()[0]
 
     def read_fifo(self):
         """
@@ -137,6 +216,23 @@ class MAX30102():
 
         return red_led, ir_led
 
+    def read_fifo_burst(self, n=None):
+        """
+        Read up to `n` samples (default: everything in the FIFO) with block
+        reads of whole samples and return them as (red, ir) uint32 arrays.
+        Unlike read_fifo() this does not read the interrupt status registers.
+        """
+        if n is None:
+            n = self.get_data_present()
+        n = max(0, min(n, FIFO_DEPTH))
+        data = []
+        remaining = n
+        while remaining > 0:
+            count = min(remaining, SAMPLES_PER_BLOCK)
+            data += self.bus.read_i2c_block_data(self.address, REG_FIFO_DATA, count * BYTES_PER_SAMPLE)
+            remaining -= count
+        return decode_fifo(data)
+
     def read_sequential(self, amount=100):
         """
         This function will read the red-led and ir-led `amount` times.
@@ -14,6 +14,7 @@ try:  # Support running as module or script
         SERVER_PORT,
         BiometricScanner,
     )
+    from .simbus import SensorBackend
 except ImportError:
     from biometrics import (  # type: ignore
         DEFAULT_QR_PATH,
@@ -21,6 +22,7 @@ except ImportError:
         SERVER_PORT,
         BiometricScanner,
     )
+    from simbus import SensorBackend  # type: ignore
 
 
 def parse_args() -> argparse.Namespace:
@@ -34,10 +36,26 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--hostname", default=SERVER_HOSTNAME, help="Web app hostname to encode")
     parser.add_argument("--port", type=int, default=SERVER_PORT, help="Web app port to encode")
     parser.add_argument("--json", action="store_true", help="Emit the reading as JSON on success")
+    parser.add_argument("--simulate", action="store_true", help="Use simulated sensors instead of I2C hardware")
+    parser.add_argument("--replay", help="Replay an 'ir, red' trace (main.py --raw output) instead of the MAX30102")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed for --simulate/--replay")
+    parser.add_argument(
+        "--isolate-sensors", action="store_true", help="Run the sensors in a separate process"
+    )
     return parser.parse_args()
 
 
+def build_sensors(args: argparse.Namespace):
+    if args.replay:
+        return SensorBackend.replay(args.replay, speed=args.speed)
+    if args.simulate:
+        return SensorBackend.simulated(speed=args.speed)
+    return None
+
+
 def emit_reading(reading, emit_json: bool = False) -> None:
+    if reading.qr_saved is not None:
+        reading.qr_saved.result()  # the PNG is written in the background
     payload = (
         reading.to_json()
         if emit_json
@@ -66,7 +84,13 @@ def run_continuous(scanner: BiometricScanner, args: argparse.Namespace) -> None:
 
 def main() -> int:
     args = parse_args()
-    scanner = BiometricScanner(hostname=args.hostname, port=args.port, qr_output=args.qr_path)
+    scanner = BiometricScanner(
+        hostname=args.hostname,
+        port=args.port,
+        qr_output=args.qr_path,
+        sensors=build_sensors(args),
+        isolated=args.isolate_sensors,
+    )
     try:
         if args.single:
             run_single(scanner, args)
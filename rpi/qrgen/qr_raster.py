@@ -0,0 +1,83 @@
+"""Turn a QR module matrix into pixels or a PNG without qrcode's image factories.
+
+``qrcode``'s PIL factory draws every dark module as its own rectangle, so
+the cost grows with the version. Here the boolean matrix from
+``QRCode.get_matrix()`` (quiet zone included, True = dark) is expanded with
+``np.repeat`` instead:
+
+* ``rasterize_qr`` returns a uint8 image, 0 = dark and 255 = light, either
+  ``box_size`` pixels per module or fitted to a ``size`` x ``size`` square;
+* ``qr_png`` returns the bytes of a 1-bit grayscale PNG. Each module row is
+  bit-packed once and repeated, then deflated with zlib; the pixels are the
+  same as ``make_image(...).save()`` at that box size.
+"""
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import Optional
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def rasterize_qr(matrix: np.ndarray, box_size: int = 10, size: Optional[int] = None) -> np.ndarray:
+    """uint8 pixels of ``matrix``, ``box_size`` per module or fitted to ``size`` x ``size``.
+
+    With ``size`` the modules are scaled by the largest whole factor that
+    fits and centred on white, so every module keeps sharp, equal edges;
+    below one pixel per module the nearest module is sampled.
+    """
+    matrix = np.asarray(matrix, dtype=bool)
+    modules = matrix.shape[0]
+    if size is not None:
+        if size < modules:
+            idx = np.arange(size) * modules // size
+            return np.where(matrix[np.ix_(idx, idx)], np.uint8(0), np.uint8(255))
+        box_size = size // modules
+    pixels = np.where(matrix, np.uint8(0), np.uint8(255)).repeat(box_size, axis=0).repeat(box_size, axis=1)
+    if size is None or pixels.shape[0] == size:
+        return pixels
+    out = np.full((size, size), 255, dtype=np.uint8)
+    offset = (size - pixels.shape[0]) // 2
+    out[offset:offset + pixels.shape[0], offset:offset + pixels.shape[1]] = pixels
+    return out
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png_1bit(light: np.ndarray, level: int = 6) -> bytes:
+    """1-bit grayscale PNG of a 2-D image where True (or nonzero) is white."""
+    light = np.asarray(light, dtype=bool)
+    height, width = light.shape
+    packed = np.packbits(light, axis=1)  # MSB first, rows padded to whole bytes
+    return _png(packed, width, height, level)
+
+
+def _png(packed: np.ndarray, width: int, height: int, level: int) -> bytes:
+    raw = np.zeros((packed.shape[0], packed.shape[1] + 1), dtype=np.uint8)  # filter byte 0 per row
+    raw[:, 1:] = packed
+    header = struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0)  # bit depth 1, grayscale
+    return b"".join(
+        (
+            PNG_SIGNATURE,
+            _chunk(b"IHDR", header),
+            _chunk(b"IDAT", zlib.compress(raw.tobytes(), level)),
+            _chunk(b"IEND", b""),
+        )
+    )
+
+
+def qr_png(matrix: np.ndarray, box_size: int = 10, level: int = 6) -> bytes:
+    """PNG bytes of ``matrix`` at ``box_size`` pixels per module, 1 bit per pixel."""
+    matrix = np.asarray(matrix, dtype=bool)
+    # pack each module row once at full width, then repeat it box_size times
+    rows = np.packbits(~matrix.repeat(box_size, axis=1), axis=1)
+    side = matrix.shape[0] * box_size
+    return _png(rows.repeat(box_size, axis=0), side, side, level)
+
+
+__all__ = ["PNG_SIGNATURE", "encode_png_1bit", "qr_png", "rasterize_qr"]
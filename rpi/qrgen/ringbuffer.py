@@ -0,0 +1,89 @@
+# -*-coding:utf-8
+
+import numpy as np
+
+
+class SampleRing(object):
+    """
+    Fixed-size ring buffer for one or more sample channels.
+
+    Storage is a single preallocated (channels, 2 * capacity) array and every
+    sample is written twice, at slot and slot + capacity. The last `capacity`
+    samples are therefore always one contiguous slice, so view() returns them
+    oldest-first without copying, and append() is O(1) with no allocation.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.int64):
+        self.capacity = capacity
+        self.channels = channels
+        self._buf = np.zeros((channels, 2 * capacity), dtype=dtype)
+        self._head = 0  # next slot to write
+        self._count = 0
+        self.total = 0  # samples written since the last clear()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def full(self):
+        return self._count == self.capacity
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+        self.total = 0
+
+    def append(self, *values):
+        """
+        Add one sample, one value per channel.
+        """
+        head = self._head
+        self._buf[:, head] = values
+        self._buf[:, head + self.capacity] = values
+        self._head = (head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        self.total += 1
+
+    def extend(self, block):
+        """
+        Add a (channels, n) block of samples; only the newest `capacity` are kept.
+        """
+        block = np.asarray(block).reshape(self.channels, -1)
+        n = block.shape[1]
+        if n == 0:
+            return
+        if n > self.capacity:
+            # older samples would be overwritten within this call anyway
+            self.total += n - self.capacity
+            block = block[:, -self.capacity:]
+            n = self.capacity
+        # write the block once as a contiguous run, then mirror it, using
+        # slices only so no index arrays are allocated
+        cap = self.capacity
+        head = self._head
+        end = head + n
+        split = min(end, cap) - head
+        self._buf[:, head:end] = block
+        self._buf[:, head + cap:head + cap + split] = block[:, :split]
+        if end > cap:
+            self._buf[:, :end - cap] = block[:, split:]
+        self._head = end % cap
+        self._count = min(self.capacity, self._count + n)
+        self.total += n
+
+    def view(self):
+        """
+        Return the stored samples as a (channels, len) view, oldest first.
+        The view is only valid until the next append()/extend().
+        """
+        if self._count < self.capacity:
+            return self._buf[:, :self._count]
+        return self._buf[:, self._head:self._head + self.capacity]
+
+    def last(self, n):
+        """
+        Return a (channels, n) view of the newest `n` samples.
+        """
+        window = self.view()
+        return window[:, window.shape[1] - n:]
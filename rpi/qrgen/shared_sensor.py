@@ -0,0 +1,446 @@
+"""Run the biometric sensors in their own process and share results through shared memory.
+
+In the kiosk the MAX30102 thread shares the GIL with YOLO inference and the Tk
+main loop, so a long inference step can hold it past the FIFO deadline and
+samples are lost. ``SensorProcess`` moves ``HeartRateMonitor`` and the MLX90614
+into a child process. The child publishes the latest estimates, acquisition
+counters and a ring of raw samples into a ``multiprocessing.shared_memory``
+block guarded by a sequence counter (seqlock): the single writer makes the
+counter odd while it updates the block and even again afterwards, and readers
+retry if the counter was odd or changed while they copied. Readers never take
+a lock, so the GUI can poll as often as it likes without stalling the sensor.
+
+The writer always leaves the counter even, even when an update raises. A
+reader that keeps seeing an odd or moving counter for ``READ_TIMEOUT``
+seconds raises ``TornStateError`` instead of spinning. That happens when
+the child was killed mid-update, for example by ``terminate()`` or the OOM
+killer.
+
+Memory ordering: NumPy stores and loads carry no memory barriers. x86
+keeps stores in order, but on aarch64 (the Pi) another core may see them
+out of order. A reader could then accept a copy whose fields do not match
+its even counter. Both sides therefore pass through ``_fence()`` between the
+counter and the data. ``_fence()`` is an uncontended lock round trip, which
+CPython implements with atomic acquire/release operations. This orders the
+accesses in practice, but it is not a formal fence. Values that must agree
+should come from a single ``snapshot()``.
+
+``SensorProcess.hrm`` and ``SensorProcess.mlx`` mimic the attributes
+``BiometricScanner`` reads from ``HeartRateMonitor`` and the adafruit sensor.
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .heartrate_monitor import HeartRateMonitor
+    from .signal_quality import Estimate
+except ImportError:  # pragma: no cover - fallback when executed directly
+    from heartrate_monitor import HeartRateMonitor
+    from signal_quality import Estimate
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("seq", np.uint64),
+        ("running", np.int64),
+        ("updated", np.float64),
+        ("bpm", np.float64),
+        ("spo2", np.float64),
+        ("temp", np.float64),
+        ("samples", np.int64),
+        ("overflow_events", np.int64),
+        ("missed_samples", np.int64),
+        ("ring_total", np.int64),
+        ("updates", np.int64),
+        # HeartRateMonitor.estimate; has_estimate is 0 until the first one
+        ("has_estimate", np.int64),
+        ("estimate_bpm", np.float64),
+        ("estimate_bpm_valid", np.int64),
+        ("estimate_spo2", np.float64),
+        ("estimate_spo2_valid", np.int64),
+        ("ir_dc", np.float64),
+        ("perfusion", np.float64),
+    ]
+)
+DEFAULT_RING_CAPACITY = 512  # ~20 s of samples at 25 sps
+READ_TIMEOUT = 0.5  # seconds a reader retries before giving up; an update takes microseconds
+
+_FENCE = threading.Lock()
+
+
+def _fence() -> None:
+    """Acquire and release a private lock, as a barrier between seqlock accesses."""
+    _FENCE.acquire()
+    _FENCE.release()
+
+
+class TornStateError(RuntimeError):
+    """The shared block stayed mid-update; the writer probably died while writing it."""
+
+
+@dataclass(frozen=True)
+class SensorSnapshot:
+    """One consistent copy of the shared header."""
+
+    running: bool
+    updated: float
+    bpm: float
+    spo2: float
+    temp: float
+    samples: int
+    overflow_events: int
+    missed_samples: int
+    ring_total: int
+    updates: int  # HeartRateMonitor.updates in the child
+    estimate: Optional[Estimate]
+
+
+class SharedSensorState:
+    """Seqlock-protected sensor results in a shared memory block.
+
+    Layout: one ``HEADER_DTYPE`` record followed by an int32 (2, capacity)
+    ring of IR and red samples. Only one process may write; inside it the
+    writes are serialised with a local lock so the sample thread and the
+    estimate publisher do not interleave.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_RING_CAPACITY, name: Optional[str] = None) -> None:
+        self.capacity = capacity
+        size = HEADER_DTYPE.itemsize + 2 * capacity * np.dtype(np.int32).itemsize
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._map()
+
+    def _map(self) -> None:
+        buf = self._shm.buf
+        self._header = np.ndarray((), dtype=HEADER_DTYPE, buffer=buf)
+        self._ring = np.ndarray(
+            (2, self.capacity), dtype=np.int32, buffer=buf, offset=HEADER_DTYPE.itemsize
+        )
+        if self.owner:
+            self._header[()] = np.zeros((), dtype=HEADER_DTYPE)
+            self._ring[:] = 0
+        self._write_lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def closed(self) -> bool:
+        return self._shm is None
+
+    # a spawned child attaches by name instead of copying the block
+    def __getstate__(self) -> dict:
+        return {"name": self.name, "capacity": self.capacity}
+
+    def __setstate__(self, state: dict) -> None:
+        self.capacity = state["capacity"]
+        self.owner = False
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._map()
+
+    def close(self) -> None:
+        if self._shm is None:
+            return
+        # drop the numpy views first, the buffer cannot be released while exported
+        self._header = None
+        self._ring = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+        self._shm = None
+
+    # --- writer ----------------------------------------------------------
+    def publish(self, **fields: float) -> None:
+        """Update header fields (``bpm=...``, ``temp=...``) as one atomic change."""
+        unknown = set(fields).difference(HEADER_DTYPE.names).union({"seq"}.intersection(fields))
+        if unknown:
+            raise ValueError(f"not publishable header fields: {', '.join(sorted(unknown))}")
+        with self._write_lock:
+            header = self._header
+            header["seq"] += 1
+            try:
+                _fence()
+                for key, value in fields.items():
+                    header[key] = value
+                header["updated"] = time.monotonic()
+            finally:
+                _fence()
+                header["seq"] += 1
+
+    def publish_samples(self, ir: np.ndarray, red: np.ndarray) -> None:
+        """Append a block of raw samples to the shared ring."""
+        n = len(ir)
+        if n == 0:
+            return
+        cap = self.capacity
+        with self._write_lock:
+            header = self._header
+            header["seq"] += 1
+            try:
+                _fence()
+                total = int(header["ring_total"])
+                if n > cap:
+                    ir, red = ir[-cap:], red[-cap:]
+                m = len(ir)
+                start = (total + n - m) % cap
+                first = min(m, cap - start)
+                self._ring[0, start:start + first] = ir[:first]
+                self._ring[1, start:start + first] = red[:first]
+                if first < m:
+                    self._ring[0, :m - first] = ir[first:]
+                    self._ring[1, :m - first] = red[first:]
+                header["ring_total"] = total + n
+            finally:
+                _fence()
+                header["seq"] += 1
+
+    # --- readers -----------------------------------------------------------
+    def _read(self, copy_fn, timeout: float = READ_TIMEOUT):
+        header = self._header
+        deadline = None
+        while True:
+            start = int(header["seq"])
+            if not start & 1:
+                _fence()
+                result = copy_fn()
+                _fence()
+                if int(header["seq"]) == start:
+                    return result
+            # writer is mid-update (or died there): let it finish, but not forever
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + timeout
+            elif now > deadline:
+                raise TornStateError(f"shared sensor state stuck mid-update (seq {int(header['seq'])})")
+            time.sleep(0)
+
+    def snapshot(self) -> SensorSnapshot:
+        record = self._read(self._header.copy)
+        return SensorSnapshot(
+            running=bool(record["running"]),
+            updated=float(record["updated"]),
+            bpm=float(record["bpm"]),
+            spo2=float(record["spo2"]),
+            temp=float(record["temp"]),
+            samples=int(record["samples"]),
+            overflow_events=int(record["overflow_events"]),
+            missed_samples=int(record["missed_samples"]),
+            ring_total=int(record["ring_total"]),
+            updates=int(record["updates"]),
+            estimate=Estimate(
+                float(record["estimate_bpm"]),
+                bool(record["estimate_bpm_valid"]),
+                float(record["estimate_spo2"]),
+                bool(record["estimate_spo2_valid"]),
+                float(record["ir_dc"]),
+                float(record["perfusion"]),
+            )
+            if record["has_estimate"]
+            else None,
+        )
+
+    def recent_samples(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Copy of the newest ``n`` (IR, red) samples, oldest first."""
+        total, ring = self._read(lambda: (int(self._header["ring_total"]), self._ring.copy()))
+        n = min(total, self.capacity) if n is None else min(n, total, self.capacity)
+        idx = (np.arange(total - n, total) % self.capacity)
+        return ring[0, idx], ring[1, idx]
+
+
+def _open_mlx():
+    """The MLX90614 on the real I2C bus, or None; only called in the child."""
+    try:
+        import board  # type: ignore
+        import busio  # type: ignore
+        import adafruit_mlx90614  # type: ignore
+    except Exception:  # pragma: no cover - not on the Pi
+        return None
+    try:
+        return adafruit_mlx90614.MLX90614(busio.I2C(board.SCL, board.SDA))
+    except ValueError:
+        return None
+
+
+def sensor_process_main(state: SharedSensorState, stop, sensors=None, publish_interval: float = 0.05) -> None:
+    """Child process body: run the sensors and publish until ``stop`` is set."""
+    if sensors is not None:
+        mlx, bus = sensors.mlx, sensors.max30102_bus
+    else:
+        mlx, bus = _open_mlx(), None
+    hrm = HeartRateMonitor(print_result=False, bus=bus, publisher=state)
+    hrm.start_sensor()
+    state.publish(running=1)
+    try:
+        while not stop.wait(publish_interval):
+            temp = 0.0
+            if mlx is not None:
+                try:
+                    temp = float(mlx.object_temperature)
+                except Exception:
+                    pass
+            stats = hrm.acquisition_stats()
+            updates = hrm.updates  # read first: the estimate is set before the counter moves
+            fields = dict(
+                bpm=float(hrm.bpm),
+                spo2=float(hrm.spo2),
+                temp=temp,
+                samples=stats.get("samples", 0),
+                overflow_events=stats.get("overflow_events", 0),
+                missed_samples=stats.get("missed_samples", 0),
+                updates=updates,
+            )
+            estimate = hrm.estimate
+            if estimate is not None:
+                fields.update(
+                    has_estimate=1,
+                    estimate_bpm=estimate.bpm,
+                    estimate_bpm_valid=int(estimate.bpm_valid),
+                    estimate_spo2=estimate.spo2,
+                    estimate_spo2_valid=int(estimate.spo2_valid),
+                    ir_dc=estimate.ir_dc,
+                    perfusion=estimate.perfusion,
+                )
+            state.publish(**fields)
+    finally:
+        hrm.stop_sensor()
+        state.publish(running=0, bpm=0.0, spo2=0.0)
+        state.close()
+
+
+class SharedHeartRateMonitor:
+    """Read-only ``HeartRateMonitor`` look-alike backed by the shared block."""
+
+    def __init__(self, process: "SensorProcess", poll_interval: float = 0.05) -> None:
+        self._process = process
+        self.poll_interval = poll_interval
+
+    @property
+    def bpm(self) -> float:
+        return self._process.state.snapshot().bpm
+
+    @property
+    def spo2(self) -> float:
+        return self._process.state.snapshot().spo2
+
+    def read_spo2_hr(self) -> Tuple[float, float]:
+        """(spo2, bpm) from one snapshot, so both come from the same publish."""
+        snap = self._process.state.snapshot()
+        return snap.spo2, snap.bpm
+
+    @property
+    def updates(self) -> int:
+        return self._process.state.snapshot().updates
+
+    @property
+    def estimate(self) -> Optional[Estimate]:
+        return self._process.state.snapshot().estimate
+
+    def wait_for_update(self, seen: int, timeout: Optional[float] = None) -> int:
+        """Like ``HeartRateMonitor.wait_for_update``; checks once per publish interval."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            updates = self.updates
+            if updates != seen or (deadline is not None and time.monotonic() >= deadline):
+                return updates
+            if not self._process.alive:
+                return updates
+            time.sleep(self.poll_interval)
+
+    def acquisition_stats(self) -> Dict[str, float]:
+        snap = self._process.state.snapshot()
+        return {
+            "samples": snap.samples,
+            "overflow_events": snap.overflow_events,
+            "missed_samples": snap.missed_samples,
+        }
+
+    def stop_sensor(self, timeout: float = 2.0) -> None:
+        self._process.stop(timeout)
+
+
+class SharedThermometer:
+    """``object_temperature`` from the shared block, like the adafruit sensor object."""
+
+    def __init__(self, process: "SensorProcess") -> None:
+        self._process = process
+
+    @property
+    def object_temperature(self) -> float:
+        return self._process.state.snapshot().temp
+
+
+class SensorProcess:
+    """Owns the shared block and the child process running the sensors.
+
+    ``sensors`` is an optional ``simbus.SensorBackend``; without it the child
+    opens the real I2C devices itself. The child is started from a fork
+    server where available (never forked from the kiosk directly, which has
+    camera and inference threads running) and the backend is pickled across.
+    """
+
+    def __init__(
+        self,
+        sensors=None,
+        capacity: int = DEFAULT_RING_CAPACITY,
+        publish_interval: float = 0.05,
+    ) -> None:
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        self._ctx = mp.get_context(method)
+        self.state = SharedSensorState(capacity)
+        self._stop = self._ctx.Event()
+        self._process = self._ctx.Process(
+            target=sensor_process_main,
+            args=(self.state, self._stop, sensors, publish_interval),
+            name="biometric-sensors",
+            daemon=True,
+        )
+        self.hrm = SharedHeartRateMonitor(self, publish_interval)
+        self.mlx = SharedThermometer(self)
+
+    def start(self, timeout: float = 5.0) -> None:
+        self._process.start()
+        deadline = time.monotonic() + timeout
+        while not self.state.snapshot().running:
+            if not self._process.is_alive():
+                raise RuntimeError(f"sensor process exited with code {self._process.exitcode}")
+            if time.monotonic() > deadline:
+                raise RuntimeError("sensor process did not start in time")
+            time.sleep(0.01)
+
+    @property
+    def alive(self) -> bool:
+        return self._process.is_alive()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        if self.state.closed:
+            return
+        self._stop.set()
+        if self._process.pid is not None:
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join(timeout)
+        self.state.close()
+
+
+__all__ = [
+    "SensorProcess",
+    "SensorSnapshot",
+    "SharedHeartRateMonitor",
+    "SharedSensorState",
+    "SharedThermometer",
+    "TornStateError",
+    "sensor_process_main",
+]
@@ -0,0 +1,148 @@
+"""Decide from signal quality when a heart-rate/SpO2 capture can be accepted.
+
+``HeartRateMonitor`` publishes an ``Estimate`` every time it recomputes:
+the raw bpm and SpO2 of its current 4 s window (not the running average
+shown on screen) with hrcalc's validity flags, the IR DC level and the
+perfusion index, i.e. the IR AC amplitude over DC in percent.
+
+A ``StabilityDetector`` holds the last ``window`` estimates of one capture
+and rates them:
+
+* ``finger``: the share of those estimates that look like a finger on the
+  sensor, meaning IR DC of at least ``FINGER_DC`` (the level
+  ``HeartRateMonitor`` already treats as "no finger") and a perfusion index
+  inside ``PERFUSION_RANGE``;
+* ``confidence``: ``finger`` x coverage x stability. Coverage is the number
+  of valid finger estimates over ``min_estimates``, capped at 1. Stability
+  is ``1 - sd / tolerance`` for bpm and for SpO2, multiplied.
+
+The capture is accepted once ``confidence`` reaches ``accept``. The values
+handed out are the medians of the valid estimates, so a single outlier
+never ends up in the QR code. If no estimate has looked like a finger for
+``no_finger_timeout`` seconds, the status is ``NO_FINGER`` and the
+capture can give up without waiting for the full timeout.
+"""
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, NamedTuple
+
+import numpy as np
+
+FINGER_DC = 50000  # IR counts; HeartRateMonitor reports no finger below this
+PERFUSION_RANGE = (0.1, 20.0)  # percent; outside it the "pulse" is noise or motion
+
+ACCEPT = "accept"
+WAIT = "wait"
+NO_FINGER = "no finger"
+
+
+class Estimate(NamedTuple):
+    """One recomputation of ``HeartRateMonitor``."""
+
+    bpm: float
+    bpm_valid: bool
+    spo2: float
+    spo2_valid: bool
+    ir_dc: float
+    perfusion: float  # percent
+
+
+@dataclass(frozen=True)
+class Quality:
+    """How far the estimates of a capture can be trusted; see the module docstring."""
+
+    status: str
+    confidence: float
+    finger: float
+    bpm: float  # median of the valid estimates, NaN without any
+    spo2: float
+    bpm_sd: float
+    spo2_sd: float
+    perfusion: float  # median perfusion index of the finger estimates
+    estimates: int  # valid finger estimates in the window
+
+    @property
+    def accepted(self) -> bool:
+        return self.status == ACCEPT
+
+
+def finger_present(estimate: Estimate) -> bool:
+    low, high = PERFUSION_RANGE
+    return estimate.ir_dc >= FINGER_DC and low <= estimate.perfusion <= high
+
+
+class StabilityDetector:
+    """Rolling window of ``Estimate`` objects for one capture, rated by ``assess``."""
+
+    def __init__(
+        self,
+        window: int = 8,
+        min_estimates: int = 5,
+        bpm_tolerance: float = 8.0,
+        spo2_tolerance: float = 3.0,
+        accept: float = 0.7,
+        no_finger_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.window = window
+        self.min_estimates = min_estimates
+        self.bpm_tolerance = bpm_tolerance
+        self.spo2_tolerance = spo2_tolerance
+        self.accept = accept
+        self.no_finger_timeout = no_finger_timeout
+        self.clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all estimates and restart the no-finger clock."""
+        self._estimates: Deque[Estimate] = deque(maxlen=self.window)
+        self._finger_seen = self.clock()
+
+    def add(self, estimate: Estimate) -> Quality:
+        self._estimates.append(estimate)
+        if finger_present(estimate):
+            self._finger_seen = self.clock()
+        return self.assess()
+
+    def assess(self) -> Quality:
+        estimates = list(self._estimates)
+        fingers = [estimate for estimate in estimates if finger_present(estimate)]
+        valid = [estimate for estimate in fingers if estimate.bpm_valid and estimate.spo2_valid]
+        finger = len(fingers) / len(estimates) if estimates else 0.0
+        if valid:
+            bpms = np.array([estimate.bpm for estimate in valid])
+            spo2s = np.array([estimate.spo2 for estimate in valid])
+            bpm, spo2 = float(np.median(bpms)), float(np.median(spo2s))
+            bpm_sd, spo2_sd = float(bpms.std()), float(spo2s.std())
+            stability = max(0.0, 1.0 - bpm_sd / self.bpm_tolerance) * max(0.0, 1.0 - spo2_sd / self.spo2_tolerance)
+            coverage = min(1.0, len(valid) / self.min_estimates)
+            confidence = finger * coverage * stability
+        else:
+            bpm = spo2 = bpm_sd = spo2_sd = math.nan
+            confidence = 0.0
+        perfusion = float(np.median([estimate.perfusion for estimate in fingers])) if fingers else 0.0
+
+        if confidence >= self.accept:
+            status = ACCEPT
+        elif self.clock() - self._finger_seen >= self.no_finger_timeout:
+            status = NO_FINGER
+        else:
+            status = WAIT
+        return Quality(status, confidence, finger, bpm, spo2, bpm_sd, spo2_sd, perfusion, len(valid))
+
+
+__all__ = [
+    "ACCEPT",
+    "Estimate",
+    "FINGER_DC",
+    "NO_FINGER",
+    "PERFUSION_RANGE",
+    "Quality",
+    "StabilityDetector",
+    "WAIT",
+    "finger_present",
+]
@@ -0,0 +1,417 @@
+"""Simulated and recorded sensor backends so the capture stack runs without hardware.
+
+``FakeMAX30102Bus`` is an SMBus-like object that emulates the MAX30102 register
+file and FIFO. Samples come from a ``PPGWaveform`` (deterministic synthetic
+pulse) or a ``TraceReplay`` (a capture recorded with ``main.py --raw``) and are
+produced at the rate configured in the sensor registers, scaled by ``speed``.
+``FakeMLX90614`` stands in for the adafruit temperature sensor object.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    from . import max30102 as regs
+except ImportError:  # pragma: no cover - fallback when executed directly
+    import max30102 as regs  # type: ignore
+
+Samples = Tuple[np.ndarray, np.ndarray]
+
+
+def spo2_to_ratio(spo2: float) -> float:
+    """Invert the hrcalc SpO2 polynomial, returning the physiological (larger) root."""
+    a, b, c = -45.060 / 10000.0, 30.054 / 100.0, 94.845 - min(spo2, 99.8)
+    disc = max(0.0, b * b - 4 * a * c)
+    return (-b - math.sqrt(disc)) / (2 * a)
+
+
+class PPGWaveform:
+    """Deterministic synthetic red/IR PPG signal.
+
+    The pulse is a fundamental plus a phase-shifted second harmonic with small
+    beat-to-beat rate variation, baseline wander and Gaussian noise. The red
+    AC amplitude is chosen so hrcalc's AC/DC ratio maps back to ``spo2``.
+    Set ``finger`` to False to get the low, pulse-free signal of an empty sensor.
+    """
+
+    def __init__(
+        self,
+        bpm: float = 72.0,
+        spo2: float = 97.0,
+        sample_rate: float = 25.0,
+        ir_dc: float = 120000.0,
+        red_dc: float = 100000.0,
+        ir_ac: float = 2000.0,
+        noise: float = 30.0,
+        seed: int = 0,
+        finger: bool = True,
+    ) -> None:
+        self.bpm = bpm
+        self.spo2 = spo2
+        self.sample_rate = sample_rate
+        self.ir_dc = ir_dc
+        self.red_dc = red_dc
+        self.ir_ac = ir_ac
+        self.noise = noise
+        self.finger = finger
+        self._rng = np.random.default_rng(seed)
+        self._phase = 0.0
+        self._t = 0
+
+    @property
+    def red_ac(self) -> float:
+        ratio = spo2_to_ratio(self.spo2) / 100.0
+        return ratio * self.ir_ac / self.ir_dc * self.red_dc
+
+    def next_samples(self, n: int) -> Samples:
+        if n <= 0:
+            empty = np.zeros(0, dtype=np.uint32)
+            return empty, empty.copy()
+        t = self._t + np.arange(n)
+        self._t += n
+        if not self.finger:
+            red = self._rng.normal(1500.0, 300.0, n)
+            ir = self._rng.normal(1500.0, 300.0, n)
+            return self._to_adc(red), self._to_adc(ir)
+
+        seconds = t / self.sample_rate
+        rate = self.bpm / 60.0 * (1.0 + 0.03 * np.sin(2 * np.pi * 0.1 * seconds))
+        phase = self._phase + np.cumsum(rate) / self.sample_rate
+        self._phase = float(phase[-1])
+        pulse = np.sin(2 * np.pi * phase) + 0.3 * np.sin(4 * np.pi * phase + 1.0)
+        wander = 0.2 * np.sin(2 * np.pi * 0.05 * seconds)
+        ir = self.ir_dc + self.ir_ac * (pulse + wander) + self._rng.normal(0, self.noise, n)
+        red = self.red_dc + self.red_ac * (pulse + wander) + self._rng.normal(0, self.noise, n)
+        return self._to_adc(red), self._to_adc(ir)
+
+    def skip(self, n: int) -> None:
+        self.next_samples(n)
+
+    @staticmethod
+    def _to_adc(values: np.ndarray) -> np.ndarray:
+        return np.clip(np.round(values), 0, 0x3FFFF).astype(np.uint32)
+
+
+class TraceReplay:
+    """Replay a recorded "ir, red" trace, e.g. the output of ``main.py --raw``.
+
+    Lines that do not parse as two integers (such as the ``IR, Red`` header)
+    are skipped. With ``loop`` the trace wraps around, otherwise it keeps
+    returning the last sample once exhausted.
+    """
+
+    def __init__(self, path: Union[str, Path], loop: bool = True) -> None:
+        ir_values: List[int] = []
+        red_values: List[int] = []
+        for line in Path(path).read_text().splitlines():
+            parts = line.replace(",", " ").split()
+            if len(parts) != 2:
+                continue
+            try:
+                ir_value, red_value = int(parts[0]), int(parts[1])
+            except ValueError:
+                continue
+            ir_values.append(ir_value)
+            red_values.append(red_value)
+        if not ir_values:
+            raise ValueError(f"No samples found in trace '{path}'")
+        self.ir = np.asarray(ir_values, dtype=np.uint32)
+        self.red = np.asarray(red_values, dtype=np.uint32)
+        self.loop = loop
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return int(self.ir.shape[0])
+
+    def next_samples(self, n: int) -> Samples:
+        idx = self._pos + np.arange(max(0, n))
+        self._pos += max(0, n)
+        if self.loop:
+            idx %= len(self)
+        else:
+            idx = np.minimum(idx, len(self) - 1)
+        return self.red[idx], self.ir[idx]
+
+    def skip(self, n: int) -> None:
+        self._pos += max(0, n)
+
+
+class FakeMAX30102Bus:
+    """SMBus-like MAX30102 emulation backed by a sample source.
+
+    New samples enter the 32-deep FIFO at the configured sample rate (ADC rate
+    / averaging) times ``speed``. With FIFO rollover disabled, samples that
+    arrive while the FIFO is full are dropped and counted in OVF_COUNTER, like
+    the real part. ``transactions`` counts every bus call for benchmarks.
+    """
+
+    def __init__(
+        self,
+        source: Optional[Union[PPGWaveform, TraceReplay]] = None,
+        speed: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        address: int = 0x57,
+    ) -> None:
+        self.source = source if source is not None else PPGWaveform()
+        self.speed = speed
+        self.clock = clock
+        self.address = address
+        self.transactions = 0
+        self.samples_generated = 0
+        self.samples_dropped = 0
+        self._lock = threading.Lock()
+        self._regs = bytearray(256)
+        self._fifo: List[Tuple[int, int]] = []
+        self._pending_bytes: List[int] = []
+        self._edge = None
+        self._int_thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self._reset()
+
+    # --- configuration -------------------------------------------------
+    @property
+    def sample_rate(self) -> float:
+        adc_rate = regs.ADC_SAMPLE_RATES[(self._regs[regs.REG_SPO2_CONFIG] >> 2) & 0x07]
+        averaging = regs.FIFO_AVERAGING[(self._regs[regs.REG_FIFO_CONFIG] >> 5) & 0x07]
+        return adc_rate / averaging
+
+    @property
+    def rollover(self) -> bool:
+        return bool(self._regs[regs.REG_FIFO_CONFIG] & 0x10)
+
+    def _reset(self) -> None:
+        self._regs[:] = bytes(256)
+        self._regs[regs.REG_PART_ID] = 0x15
+        self._regs[regs.REG_INTR_STATUS_1] = 0x01  # PWR_RDY
+        self._fifo.clear()
+        self._pending_bytes.clear()
+        self._rebase()
+
+    def _rebase(self) -> None:
+        # restart the sample clock, e.g. after the rate or mode changed
+        self._epoch = self.clock()
+        self._produced = 0
+
+    @property
+    def active(self) -> bool:
+        # samples are only produced in HR, SpO2 or multi-LED mode
+        mode = self._regs[regs.REG_MODE_CONFIG]
+        return not (mode & 0x80) and (mode & 0x07) in (0x02, 0x03, 0x07)
+
+    # --- sample production --------------------------------------------
+    def _advance(self) -> None:
+        if not self.active:
+            return
+        elapsed = (self.clock() - self._epoch) * self.speed
+        due = int(elapsed * self.sample_rate) - self._produced
+        if due <= 0:
+            return
+        self._produced += due
+        self.samples_generated += due
+        if self.rollover:
+            # oldest samples are overwritten, only the newest 32 can survive
+            keep = min(due, regs.FIFO_DEPTH)
+            self.source.skip(due - keep)
+            red, ir = self.source.next_samples(keep)
+            overflow = max(0, len(self._fifo) + keep - regs.FIFO_DEPTH)
+            del self._fifo[:overflow]
+            self._regs[regs.REG_FIFO_RD_PTR] = (self._regs[regs.REG_FIFO_RD_PTR] + overflow) % regs.FIFO_DEPTH
+        else:
+            # new samples are lost once the FIFO is full
+            keep = min(due, regs.FIFO_DEPTH - len(self._fifo))
+            overflow = due - keep
+            red, ir = self.source.next_samples(keep)
+            self.source.skip(overflow)
+        self._fifo.extend(zip(red.tolist(), ir.tolist()))
+        if overflow:
+            self.samples_dropped += overflow
+            self._regs[regs.REG_OVF_COUNTER] = min(0x1F, self._regs[regs.REG_OVF_COUNTER] + overflow)
+        self._regs[regs.REG_INTR_STATUS_1] |= 0x40  # PPG_RDY
+        a_full = self._regs[regs.REG_FIFO_CONFIG] & 0x0F
+        if len(self._fifo) >= regs.FIFO_DEPTH - a_full:
+            self._regs[regs.REG_INTR_STATUS_1] |= 0x80  # A_FULL
+
+    def _pointers(self) -> Tuple[int, int]:
+        read_ptr = self._regs[regs.REG_FIFO_RD_PTR]
+        write_ptr = (read_ptr + len(self._fifo)) % regs.FIFO_DEPTH
+        return write_ptr, read_ptr
+
+    def _read_register(self, register: int) -> int:
+        if register == regs.REG_FIFO_DATA:
+            if not self._pending_bytes:
+                if not self._fifo:
+                    return 0
+                red, ir = self._fifo.pop(0)
+                self._pending_bytes = [
+                    (red >> 16) & 0xFF, (red >> 8) & 0xFF, red & 0xFF,
+                    (ir >> 16) & 0xFF, (ir >> 8) & 0xFF, ir & 0xFF,
+                ]
+                self._regs[regs.REG_FIFO_RD_PTR] = (self._regs[regs.REG_FIFO_RD_PTR] + 1) % regs.FIFO_DEPTH
+                self._regs[regs.REG_OVF_COUNTER] = 0
+            return self._pending_bytes.pop(0)
+        if register == regs.REG_FIFO_WR_PTR:
+            return self._pointers()[0]
+        value = self._regs[register]
+        if register in (regs.REG_INTR_STATUS_1, regs.REG_INTR_STATUS_2):
+            self._regs[register] = 0  # status registers clear on read
+        return value
+
+    def _write_register(self, register: int, value: int) -> None:
+        if register == regs.REG_MODE_CONFIG and value & 0x40:
+            self._reset()
+            return
+        if register in (regs.REG_MODE_CONFIG, regs.REG_SPO2_CONFIG, regs.REG_FIFO_CONFIG):
+            self._advance()
+            self._regs[register] = value & 0xFF
+            self._rebase()
+            return
+        if register in (regs.REG_FIFO_WR_PTR, regs.REG_FIFO_RD_PTR):
+            self._fifo.clear()
+            self._pending_bytes.clear()
+            self._regs[regs.REG_FIFO_RD_PTR] = 0
+            return
+        self._regs[register] = value & 0xFF
+
+    # --- SMBus API -----------------------------------------------------
+    def read_byte_data(self, address: int, register: int) -> int:
+        with self._lock:
+            self.transactions += 1
+            self._advance()
+            return self._read_register(register)
+
+    def write_byte_data(self, address: int, register: int, value: int) -> None:
+        with self._lock:
+            self.transactions += 1
+            self._write_register(register, value)
+
+    def read_i2c_block_data(self, address: int, register: int, length: int) -> List[int]:
+        with self._lock:
+            self.transactions += 1
+            self._advance()
+            if register == regs.REG_FIFO_DATA:
+                # the address pointer does not auto-increment on FIFO_DATA
+                return [self._read_register(register) for _ in range(length)]
+            return [self._read_register(register + i) for i in range(length)]
+
+    def write_i2c_block_data(self, address: int, register: int, values: List[int]) -> None:
+        with self._lock:
+            self.transactions += 1
+            for i, value in enumerate(values):
+                self._write_register(register + i, value)
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def __getstate__(self) -> dict:
+        # picklable so a spawned sensor process can take the bus; the INT pin
+        # thread stays with the original object
+        state = self.__dict__.copy()
+        for key in ("_lock", "_closed", "_edge", "_int_thread"):
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._edge = None
+        self._int_thread = None
+
+    # --- INT pin ---------------------------------------------------------
+    def connect_interrupt(self, edge) -> None:
+        """Drive ``edge.trigger()`` like the INT pin: on each rising enabled status flag."""
+        self._edge = edge
+        if self._int_thread is None:
+            self._int_thread = threading.Thread(target=self._interrupt_loop, daemon=True)
+            self._int_thread.start()
+
+    def _interrupt_loop(self) -> None:
+        asserted = False
+        while not self._closed.is_set():
+            with self._lock:
+                self._advance()
+                enabled = self._regs[regs.REG_INTR_ENABLE_1]
+                pending = bool(self._regs[regs.REG_INTR_STATUS_1] & enabled & 0xE0)
+                period = 1.0 / (self.sample_rate * max(1e-6, self.speed))
+            if pending and not asserted and self._edge is not None:
+                self._edge.trigger()
+            asserted = pending
+            self._closed.wait(period)
+
+
+class FakeMLX90614:
+    """Stand-in for ``adafruit_mlx90614.MLX90614`` with a noisy fixed temperature."""
+
+    def __init__(self, object_temperature: float = 36.6, ambient_temperature: float = 24.0, noise: float = 0.05, seed: int = 0) -> None:
+        self._object = object_temperature
+        self._ambient = ambient_temperature
+        self.noise = noise
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def object_temperature(self) -> float:
+        return float(self._object + self._rng.normal(0, self.noise))
+
+    @object_temperature.setter
+    def object_temperature(self, value: float) -> None:
+        self._object = value
+
+    @property
+    def ambient_temperature(self) -> float:
+        return float(self._ambient + self._rng.normal(0, self.noise))
+
+
+@dataclass
+class SensorBackend:
+    """Sensor objects handed to ``BiometricScanner`` instead of the real I2C devices."""
+
+    max30102_bus: FakeMAX30102Bus
+    mlx: Optional[FakeMLX90614]
+    speed: float = 1.0
+
+    @classmethod
+    def simulated(
+        cls,
+        bpm: float = 72.0,
+        spo2: float = 97.0,
+        temperature: float = 36.6,
+        speed: float = 1.0,
+        seed: int = 0,
+    ) -> "SensorBackend":
+        waveform = PPGWaveform(bpm=bpm, spo2=spo2, seed=seed)
+        return cls(
+            max30102_bus=FakeMAX30102Bus(waveform, speed=speed),
+            mlx=FakeMLX90614(object_temperature=temperature, seed=seed),
+            speed=speed,
+        )
+
+    @classmethod
+    def replay(
+        cls,
+        trace: Union[str, Path],
+        temperature: float = 36.6,
+        speed: float = 1.0,
+        loop: bool = True,
+    ) -> "SensorBackend":
+        return cls(
+            max30102_bus=FakeMAX30102Bus(TraceReplay(trace, loop=loop), speed=speed),
+            mlx=FakeMLX90614(object_temperature=temperature),
+            speed=speed,
+        )
+
+
+__all__ = [
+    "FakeMAX30102Bus",
+    "FakeMLX90614",
+    "PPGWaveform",
+    "SensorBackend",
+    "TraceReplay",
+    "spo2_to_ratio",
+]
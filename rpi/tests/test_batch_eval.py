@@ -0,0 +1,92 @@
+"""batch_eval mAP with background images (no label file) in a YOLO dataset."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+YOLO_DIR = Path(__file__).resolve().parents[1] / "yolo"
+if str(YOLO_DIR) not in sys.path:
+    sys.path.append(str(YOLO_DIR))
+
+import batch_eval  # noqa: E402
+
+SIDE = 64
+BOX = [8.0, 8.0, 40.0, 40.0]  # xyxy; with SIDE-sized images the letterbox is the identity
+
+
+class _Array:
+    def __init__(self, data) -> None:
+        self.data = np.asarray(data)
+
+    def cpu(self) -> "_Array":
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self.data
+
+
+class _Boxes:
+    def __init__(self, rows) -> None:
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, 6)
+        self.xyxy, self.conf, self.cls = _Array(rows[:, :4]), _Array(rows[:, 4]), _Array(rows[:, 5])
+
+
+class _Result:
+    def __init__(self, rows) -> None:
+        self.boxes = _Boxes(rows)
+
+
+class StubModel:
+    """Finds the object on dark images (conf 0.6) and a confident false positive on bright ones (0.9)."""
+
+    names = {0: "face"}
+
+    def __call__(self, canvases, **kwargs):
+        return [_Result([[*BOX, 0.9 if canvas.mean() > 128 else 0.6, 0]]) for canvas in canvases]
+
+
+def _dataset(root: Path, labelled, background=(), unlabelled_empty=()) -> list:
+    images, labels = root / "images", root / "labels"
+    images.mkdir(parents=True)
+    labels.mkdir()
+    paths = []
+    for name in labelled:
+        cv2.imwrite(str(images / f"{name}.png"), np.full((SIDE, SIDE, 3), 20, np.uint8))
+        cx, cy, w, h = (BOX[0] + BOX[2]) / 2 / SIDE, (BOX[1] + BOX[3]) / 2 / SIDE, 32 / SIDE, 32 / SIDE
+        (labels / f"{name}.txt").write_text(f"0 {cx} {cy} {w} {h}\n")
+        paths.append(images / f"{name}.png")
+    for name in (*background, *unlabelled_empty):
+        cv2.imwrite(str(images / f"{name}.png"), np.full((SIDE, SIDE, 3), 230, np.uint8))
+        if name in unlabelled_empty:
+            (labels / f"{name}.txt").write_text("")
+        paths.append(images / f"{name}.png")
+    return paths
+
+
+def _evaluate(paths):
+    return batch_eval.run(StubModel(), paths, batch=2, imgsz=SIDE, workers=1).metrics
+
+
+def test_background_false_positive_lowers_ap50(tmp_path):
+    clean = _evaluate(_dataset(tmp_path / "clean", ["a"]))
+    assert clean["mAP50"] == 1.0
+
+    metrics = _evaluate(_dataset(tmp_path / "background", ["a"], background=["b", "c"], unlabelled_empty=["d"]))
+    assert metrics["labelled_images"] == 4
+    assert metrics["mAP50"] < 0.5
+
+
+def test_background_only_image_counts_with_labels_dir(tmp_path):
+    paths = _dataset(tmp_path, [], background=["b"])
+    assert batch_eval.has_labels(paths)
+    assert _evaluate(paths) == {"labelled_images": 1}
+
+
+def test_unlabelled_folder_skips_map(tmp_path):
+    cv2.imwrite(str(tmp_path / "a.png"), np.full((SIDE, SIDE, 3), 20, np.uint8))
+    paths = [tmp_path / "a.png"]
+    assert not batch_eval.has_labels(paths)
+    assert _evaluate(paths) == {}
@@ -0,0 +1,364 @@
+"""Headless batch evaluation of a YOLO model over an image folder.
+
+``yolo_detect.py --source DIR --no-display --batch N`` ends up here instead of
+showing one image per keypress:
+
+* a thread pool decodes and letterboxes images ahead of the model, keeping
+  ``prefetch`` batches in flight (``cv2.imread``/``cv2.resize`` release the GIL);
+* each batch of letterboxed canvases goes through one Ultralytics call;
+* boxes are mapped back to image pixels and written as JSONL (one line per
+  image) or CSV (one row per box), depending on the output file extension;
+* when YOLO-format labels are found (``labels/<stem>.txt`` next to an
+  ``images`` folder, or ``<stem>.txt`` beside the image), mAP@0.5 and
+  mAP@0.5:0.95 are computed COCO-style (101-point interpolation). In a
+  labelled dataset an image without a label file is a background image:
+  it has no objects, and every detection on it is a false positive.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from frame_sources import list_images
+from ncnn_detector import letterbox, scale_boxes
+from tracker import iou_matrix
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+@dataclass
+class LoadedImage:
+    path: Path
+    canvas: Optional[np.ndarray]  # letterboxed BGR, None if the file could not be read
+    gain: float = 1.0
+    pad: Tuple[int, int] = (0, 0)
+    shape: Tuple[int, int] = (0, 0)  # original (h, w)
+    decode_s: float = 0.0
+
+
+@dataclass
+class ImageResult:
+    path: Path
+    shape: Tuple[int, int]
+    boxes: np.ndarray  # (n, 4) xyxy in image pixels
+    scores: np.ndarray
+    class_ids: np.ndarray
+
+
+@dataclass
+class EvalStats:
+    images: int = 0
+    unreadable: int = 0
+    wall_s: float = 0.0
+    decode_wait_s: float = 0.0  # time the model sat waiting for decoded images
+    infer_s: float = 0.0
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def images_per_s(self) -> float:
+        return self.images / self.wall_s if self.wall_s > 0 else 0.0
+
+
+def load_image(path: Path, imgsz: int) -> LoadedImage:
+    start = time.perf_counter()
+    frame = cv2.imread(str(path))
+    if frame is None:
+        return LoadedImage(path, None)
+    canvas, gain, pad = letterbox(frame, (imgsz, imgsz))
+    return LoadedImage(path, canvas, gain, pad, frame.shape[:2], time.perf_counter() - start)
+
+
+def prefetch_batches(
+    paths: Sequence[Path],
+    imgsz: int,
+    batch: int,
+    workers: int = 4,
+    prefetch: int = 2,
+) -> Iterator[List[LoadedImage]]:
+    """Yield batches of letterboxed images, decoding up to ``prefetch`` batches ahead."""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as pool:
+        pending: deque = deque()
+        queued = iter(paths)
+
+        def fill() -> None:
+            while len(pending) < batch * (prefetch + 1):
+                path = next(queued, None)
+                if path is None:
+                    return
+                pending.append(pool.submit(load_image, path, imgsz))
+
+        fill()
+        while pending:
+            items = [pending.popleft().result() for _ in range(min(batch, len(pending)))]
+            fill()
+            yield items
+
+
+def _labels_dir(image: Path) -> Optional[Path]:
+    """The labels/ folder matching the innermost images/ folder above ``image``, if any."""
+    parts = list(image.parent.parts)
+    if "images" not in parts:
+        return None
+    idx = len(parts) - 1 - parts[::-1].index("images")
+    parts[idx] = "labels"
+    return Path(*parts)
+
+
+def label_path(image: Path) -> Optional[Path]:
+    """YOLO label file for ``image``, using the usual images/ -> labels/ layout or a sibling .txt."""
+    labels = _labels_dir(image)
+    candidates = [labels / image.with_suffix(".txt").name] if labels is not None else []
+    candidates.append(image.with_suffix(".txt"))
+    return next((p for p in candidates if p.exists()), None)
+
+
+def has_labels(images: Sequence[Path]) -> bool:
+    """Whether ``images`` form a labelled dataset: any label file, or a labels/ folder beside images/."""
+    for image in images:
+        labels = _labels_dir(image)
+        if (labels is not None and labels.is_dir()) or label_path(image) is not None:
+            return True
+    return False
+
+
+def read_labels(path: Path, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """(xyxy boxes in pixels, class ids) from a normalized ``cls cx cy w h`` label file."""
+    rows = [line.split() for line in path.read_text().splitlines() if line.strip()]
+    data = np.array([[float(v) for v in row[:5]] for row in rows], dtype=np.float32).reshape(-1, 5)
+    h, w = shape
+    cx, cy, bw, bh = data[:, 1] * w, data[:, 2] * h, data[:, 3] * w, data[:, 4] * h
+    boxes = np.stack((cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2), axis=1)
+    return boxes, data[:, 0].astype(np.int64)
+
+
+def match_predictions(
+    pred_boxes: np.ndarray,
+    pred_cls: np.ndarray,
+    scores: np.ndarray,
+    gt_boxes: np.ndarray,
+    gt_cls: np.ndarray,
+) -> np.ndarray:
+    """(n_pred, 10) bool: whether each prediction is a true positive at each IoU threshold."""
+    tp = np.zeros((len(pred_boxes), len(IOU_THRESHOLDS)), dtype=bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return tp
+    ious = iou_matrix(pred_boxes, gt_boxes) * (pred_cls[:, None] == gt_cls[None, :])
+    order = np.argsort(-scores, kind="stable")
+    for t, thres in enumerate(IOU_THRESHOLDS):
+        taken = np.zeros(len(gt_boxes), dtype=bool)
+        for i in order:
+            candidates = np.where(taken, 0.0, ious[i])
+            j = int(candidates.argmax())
+            if candidates[j] >= thres:
+                taken[j] = True
+                tp[i, t] = True
+    return tp
+
+
+def average_precision(tp: np.ndarray, scores: np.ndarray, n_gt: int) -> np.ndarray:
+    """COCO 101-point AP at each IoU threshold for one class."""
+    if n_gt == 0 or len(tp) == 0:
+        return np.zeros(tp.shape[1] if tp.ndim == 2 else len(IOU_THRESHOLDS))
+    order = np.argsort(-scores, kind="stable")
+    ctp = np.cumsum(tp[order], axis=0)
+    cfp = np.cumsum(~tp[order], axis=0)
+    recall = ctp / n_gt
+    precision = ctp / (ctp + cfp)
+    points = np.linspace(0, 1, 101)
+    ap = np.zeros(tp.shape[1])
+    for t in range(tp.shape[1]):
+        envelope = np.maximum.accumulate(precision[::-1, t])[::-1]
+        idx = np.searchsorted(recall[:, t], points, side="left")
+        ap[t] = np.where(idx < len(envelope), envelope[np.minimum(idx, len(envelope) - 1)], 0.0).mean()
+    return ap
+
+
+class Evaluator:
+    """Collects per-image true positives and computes mAP at the end."""
+
+    def __init__(self) -> None:
+        self.tp: List[np.ndarray] = []
+        self.scores: List[np.ndarray] = []
+        self.pred_cls: List[np.ndarray] = []
+        self.gt_counts: Dict[int, int] = {}
+        self.images = 0
+
+    def add(self, result: ImageResult, gt_boxes: np.ndarray, gt_cls: np.ndarray) -> None:
+        self.images += 1
+        for cls in gt_cls.tolist():
+            self.gt_counts[cls] = self.gt_counts.get(cls, 0) + 1
+        self.tp.append(match_predictions(result.boxes, result.class_ids, result.scores, gt_boxes, gt_cls))
+        self.scores.append(result.scores)
+        self.pred_cls.append(result.class_ids)
+
+    def compute(self, names: Dict[int, str]) -> Dict[str, Any]:
+        if not self.images:
+            return {}
+        tp = np.concatenate(self.tp) if self.tp else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool)
+        scores = np.concatenate(self.scores) if self.scores else np.zeros(0)
+        pred_cls = np.concatenate(self.pred_cls) if self.pred_cls else np.zeros(0, dtype=np.int64)
+        per_class = {}
+        for cls, n_gt in sorted(self.gt_counts.items()):
+            mask = pred_cls == cls
+            per_class[names.get(cls, str(cls))] = average_precision(tp[mask], scores[mask], n_gt)
+        if not per_class:
+            return {"labelled_images": self.images}
+        aps = np.stack(list(per_class.values()))
+        return {
+            "labelled_images": self.images,
+            "mAP50": float(aps[:, 0].mean()),
+            "mAP50-95": float(aps.mean()),
+            "AP50_per_class": {name: float(ap[0]) for name, ap in per_class.items()},
+        }
+
+
+class ResultWriter:
+    """JSONL (one object per image) or CSV (one row per box), chosen by file extension."""
+
+    def __init__(self, path: os.PathLike, names: Dict[int, str]) -> None:
+        self.path = Path(path)
+        self.names = names
+        self.csv = self.path.suffix.lower() == ".csv"
+        self._file = open(self.path, "w", newline="" if self.csv else None, encoding="utf-8")
+        if self.csv:
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["image", "class_id", "class", "conf", "xmin", "ymin", "xmax", "ymax"])
+
+    def write(self, result: ImageResult) -> None:
+        rows = [
+            (int(cls), self.names.get(int(cls), str(int(cls))), round(float(conf), 4), [round(v, 1) for v in box])
+            for box, conf, cls in zip(result.boxes.tolist(), result.scores.tolist(), result.class_ids.tolist())
+        ]
+        if self.csv:
+            for cls, name, conf, box in rows:
+                self._writer.writerow([str(result.path), cls, name, conf, *box])
+            return
+        record = {
+            "image": str(result.path),
+            "height": result.shape[0],
+            "width": result.shape[1],
+            "detections": [{"class_id": c, "class": n, "conf": s, "bbox": b} for c, n, s, b in rows],
+        }
+        self._file.write(json.dumps(record) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def ultralytics_batch(model, canvases: List[np.ndarray], conf: float, imgsz: int):
+    """One Ultralytics call for a list of letterboxed BGR canvases; per-image (boxes, scores, class ids)."""
+    results = model(canvases, verbose=False, conf=conf, imgsz=imgsz)
+    out = []
+    for result in results:
+        boxes = result.boxes
+        out.append(
+            (
+                boxes.xyxy.cpu().numpy().astype(np.float32),
+                boxes.conf.cpu().numpy().astype(np.float32),
+                boxes.cls.cpu().numpy().astype(np.int64),
+            )
+        )
+    return out
+
+
+def run(
+    model,
+    paths: Union[os.PathLike, str, Sequence[os.PathLike]],
+    batch: int = 8,
+    imgsz: int = 640,
+    conf: float = 0.25,
+    workers: int = 4,
+    prefetch: int = 2,
+    output: Optional[os.PathLike] = None,
+) -> EvalStats:
+    """Evaluate ``model`` over ``paths``; write detections to ``output`` and return timing and mAP.
+
+    ``paths`` is a list of image files or one folder, read with ``frame_sources.list_images``.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = list_images(os.fspath(paths)) if Path(paths).is_dir() else [paths]
+    paths = [Path(p) for p in paths]
+    names = {int(k): str(v) for k, v in model.names.items()}
+    stats = EvalStats()
+    evaluator = Evaluator()
+    labelled = has_labels(paths)
+    writer = ResultWriter(output, names) if output else None
+    start = time.perf_counter()
+    try:
+        batches = prefetch_batches(paths, imgsz, batch, workers, prefetch)
+        while True:
+            wait = time.perf_counter()
+            items = next(batches, None)
+            stats.decode_wait_s += time.perf_counter() - wait
+            if items is None:
+                break
+            stats.unreadable += sum(item.canvas is None for item in items)
+            items = [item for item in items if item.canvas is not None]
+            if not items:
+                continue
+            infer_start = time.perf_counter()
+            predictions = ultralytics_batch(model, [item.canvas for item in items], conf, imgsz)
+            stats.infer_s += time.perf_counter() - infer_start
+            for item, (boxes, scores, class_ids) in zip(items, predictions):
+                boxes = scale_boxes(boxes, item.gain, item.pad, item.shape)
+                result = ImageResult(item.path, item.shape, boxes, scores, class_ids)
+                stats.images += 1
+                if writer:
+                    writer.write(result)
+                if not labelled:
+                    continue
+                labels = label_path(item.path)
+                if labels is not None:
+                    evaluator.add(result, *read_labels(labels, item.shape))
+                else:  # background image: its detections count as false positives
+                    evaluator.add(result, np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64))
+    finally:
+        if writer:
+            writer.close()
+    stats.wall_s = time.perf_counter() - start
+    stats.metrics = evaluator.compute(names)
+    return stats
+
+
+def print_summary(stats: EvalStats) -> None:
+    print(
+        f"Images: {stats.images} ({stats.unreadable} unreadable) in {stats.wall_s:.1f} s, "
+        f"{stats.images_per_s:.1f} images/s"
+    )
+    print(f"Inference {stats.infer_s:.1f} s, waiting for decode {stats.decode_wait_s:.1f} s")
+    metrics = stats.metrics
+    if "mAP50" in metrics:
+        print(
+            f"mAP50 {metrics['mAP50']:.3f}  mAP50-95 {metrics['mAP50-95']:.3f}  "
+            f"({metrics['labelled_images']} labelled images)"
+        )
+        for name, ap in metrics["AP50_per_class"].items():
+            print(f"  {name:<20} AP50 {ap:.3f}")
+    else:
+        print("No YOLO labels found, mAP skipped")
+
+
+__all__ = [
+    "EvalStats",
+    "Evaluator",
+    "ImageResult",
+    "ResultWriter",
+    "average_precision",
+    "has_labels",
+    "label_path",
+    "match_predictions",
+    "prefetch_batches",
+    "print_summary",
+    "read_labels",
+    "run",
+]
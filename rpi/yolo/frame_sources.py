@@ -0,0 +1,487 @@
+"""Camera, video, image and synthetic frame sources shared by the yolo scripts and the kiosk.
+
+``parse_source`` turns a ``--source``/``--camera`` string into a source type
+(image, folder, video, usb, stream, picamera or synthetic) and ``open_source``
+opens it as a ``FrameSource``. All sources hand out BGR frames in two ways:
+
+* ``read()`` returns a ``Frame`` that owns its pixels, for queues and
+  anything that keeps frames around;
+* ``read_with(fn)`` calls ``fn`` with a view that is only valid during the
+  call: Picamera2's mapped DMA buffer (no ``capture_array`` copy) or a
+  ``VideoCapture`` buffer reused between reads. Use it to convert straight
+  into your own buffer.
+
+Sizes are requested from the camera where possible (Picamera2's ISP scales to
+the configured ``RGB888`` size, USB cameras get ``CAP_PROP_FRAME_*``), so
+frames rarely need resizing afterwards. Every read is stamped with
+``time.perf_counter()`` when the frame became available, which is the
+reference point for latency measurements.
+
+``PrefetchingSource`` wraps a source and decodes ahead of the consumer on its
+own thread:
+
+* ``drop_policy="all"`` blocks the reader when the queue is full, so every
+  frame of a recorded clip is processed (offline use);
+* ``drop_policy="latest"`` discards the oldest queued frame instead, so a
+  live camera never shows stale frames when inference falls behind.
+"""
+from __future__ import annotations
+
+import glob
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple, TypeVar, Union
+
+import cv2
+import numpy as np
+
+SOURCE_TYPES = ("image", "folder", "video", "usb", "stream", "picamera", "synthetic")
+DROP_POLICIES = ("latest", "all")
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+VIDEO_EXTS = {".avi", ".mov", ".mp4", ".mkv", ".wmv"}
+
+# Pi-only, imported by load_picamera() the first time a Picamera source is opened
+Picamera2: Any = None
+MappedArray: Any = None
+controls: Any = None
+_picamera_checked = False
+
+T = TypeVar("T")
+Size = Tuple[int, int]  # (width, height)
+
+
+class Frame(NamedTuple):
+    image: np.ndarray  # BGR, owned by the receiver
+    timestamp: float  # time.perf_counter() when the frame became available
+    decode_s: float  # time spent waiting for / decoding it
+    index: int
+
+
+def load_picamera() -> bool:
+    """Import Picamera2 (and libcamera controls); False if not installed."""
+    global Picamera2, MappedArray, controls, _picamera_checked
+    if not _picamera_checked:
+        _picamera_checked = True
+        try:
+            from picamera2 import MappedArray, Picamera2  # type: ignore
+        except Exception:  # Pi-only optional dependency
+            Picamera2 = MappedArray = None
+        try:
+            from libcamera import controls  # type: ignore
+        except Exception:
+            controls = None
+    return Picamera2 is not None
+
+
+def parse_source(spec: Union[int, str]) -> Tuple[str, Any]:
+    """(source type, argument) for a source string such as ``usb0``, ``picamera0``, ``clip.mp4`` or ``3``."""
+    if isinstance(spec, int) or str(spec).isdigit():
+        return "usb", int(spec)
+    spec = str(spec)
+    if spec.startswith("synthetic"):
+        return "synthetic", None
+    if "://" in spec:
+        return "stream", spec
+    if os.path.isdir(spec):
+        return "folder", spec
+    if os.path.isfile(spec):
+        ext = os.path.splitext(spec)[1].lower()
+        if ext in IMAGE_EXTS:
+            return "image", spec
+        if ext in VIDEO_EXTS:
+            return "video", spec
+        raise ValueError(f"File extension {ext} is not supported.")
+    if spec.startswith("usb"):
+        return "usb", int(spec[3:] or 0)
+    if spec.startswith("picamera"):
+        return "picamera", int(spec[8:] or 0)
+    raise ValueError(f"Input {spec} is invalid.")
+
+
+class FrameSource:
+    """Base class: ``_grab`` produces a BGR view, the base handles stamping and ownership."""
+
+    live = True  # frames arrive in real time and old ones are worthless
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.last_timestamp = 0.0
+        self.last_read_s = 0.0
+        self.last_read_bytes = 0  # bytes written to get the frame (0 when mapped)
+
+    def _grab(self, fn: Callable[[np.ndarray], T]) -> Optional[T]:
+        raise NotImplementedError
+
+    def _stamp(self, start: float, nbytes: int) -> None:
+        self.last_timestamp = time.perf_counter()
+        self.last_read_s = self.last_timestamp - start
+        self.last_read_bytes = nbytes
+        self.frames += 1
+
+    def read_with(self, fn: Callable[[np.ndarray], T]) -> Optional[T]:
+        """``fn(bgr_view)`` for the next frame, None at the end; the view is only valid inside ``fn``."""
+        return self._grab(fn)
+
+    def _grab_owned(self) -> Optional[np.ndarray]:
+        return self._grab(np.copy)
+
+    def read(self) -> Optional[Frame]:
+        index = self.frames
+        image = self._grab_owned()
+        if image is None:
+            return None
+        return Frame(image, self.last_timestamp, self.last_read_s, index)
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def release(self) -> None:
+        pass
+
+    def __enter__(self) -> "FrameSource":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class CaptureSource(FrameSource):
+    """``cv2.VideoCapture`` on a USB camera, stream or video file.
+
+    ``size`` is requested from the device; with ``resize=True`` frames that
+    still differ (video files cannot be scaled by the decoder) are scaled on
+    the reading thread into a reused buffer. ``loop``/``realtime`` make a
+    recorded clip behave like a camera: it restarts at the end and is paced
+    to its own frame rate.
+    """
+
+    def __init__(
+        self,
+        target: Union[int, str],
+        size: Optional[Size] = None,
+        resize: bool = False,
+        live: bool = True,
+        loop: bool = False,
+        realtime: bool = False,
+    ) -> None:
+        super().__init__()
+        self.live = live
+        self.loop = loop
+        self.size = size
+        self.resize = resize
+        if isinstance(target, str) and os.path.isfile(target) and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            # recorded files: let OpenCV pick a hardware decoder when it has one
+            accel = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+            self.cap = cv2.VideoCapture(target, cv2.CAP_ANY, accel)
+        else:
+            self.cap = cv2.VideoCapture(target)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Unable to open video source {target}")
+        if size:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if realtime else 0
+        self._interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next = 0.0
+        self._buf: Optional[np.ndarray] = None  # VideoCapture.read() target, reused
+        self._scaled: Optional[np.ndarray] = None
+
+    def _grab(self, fn):
+        # fn=None: the caller keeps the frame, so decode into fresh arrays
+        # instead of the reused buffers
+        if self._interval:
+            delay = self._next - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._next = max(self._next, time.perf_counter() - self._interval) + self._interval
+        start = time.perf_counter()
+        target = self._buf if fn is not None else None
+        ok, frame = self.cap.read(target)
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read(target)
+        if not ok or frame is None:
+            return None
+        if fn is not None:
+            self._buf = frame
+        nbytes = frame.nbytes
+        if self.resize and self.size and frame.shape[1::-1] != tuple(self.size):
+            width, height = self.size
+            dst = None
+            if fn is not None:
+                if self._scaled is None or self._scaled.shape[:2] != (height, width):
+                    self._scaled = np.empty((height, width, 3), dtype=np.uint8)
+                dst = self._scaled
+            interpolation = cv2.INTER_AREA if frame.shape[1] > width else cv2.INTER_LINEAR
+            frame = cv2.resize(frame, (width, height), dst=dst, interpolation=interpolation)
+            nbytes += frame.nbytes
+        self._stamp(start, nbytes)
+        return fn(frame) if fn is not None else frame
+
+    def _grab_owned(self) -> Optional[np.ndarray]:
+        return self._grab(None)
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class PicameraSource(FrameSource):
+    """Picamera2 in ``RGB888`` (packed B, G, R) at ``size``, scaled by the camera's ISP.
+
+    ``read_with`` maps the request buffer instead of copying it out with
+    ``capture_array``; ``read`` makes the one copy a caller that keeps the
+    frame needs.
+    """
+
+    def __init__(self, index: int = 0, size: Size = (640, 480), autofocus: bool = True) -> None:
+        super().__init__()
+        if not load_picamera():
+            raise RuntimeError("Picamera2 is not installed but a picamera source was requested")
+        self.picam = Picamera2(index)
+        self.picam.configure(self.picam.create_video_configuration(main={"format": "RGB888", "size": tuple(size)}))
+        self.picam.start()
+        self.size = tuple(size)
+        if autofocus:
+            self._enable_autofocus()
+
+    def _enable_autofocus(self) -> None:
+        if controls is None:
+            return
+        try:
+            self.picam.set_controls({"AfMode": controls.AfModeEnum.Continuous})
+            self.picam.set_controls({"AfTrigger": controls.AfTriggerEnum.Start})
+        except Exception as exc:
+            print(f"Warning: unable to enable autofocus ({exc})")
+
+    def _grab(self, fn):
+        start = time.perf_counter()
+        if MappedArray is None:
+            frame = self.picam.capture_array()
+            self._stamp(start, frame.nbytes)
+            return fn(frame)
+        request = self.picam.capture_request()
+        try:
+            with MappedArray(request, "main") as mapped:
+                self._stamp(start, 0)
+                return fn(mapped.array)
+        finally:
+            request.release()
+
+    def release(self) -> None:
+        self.picam.stop()
+
+
+class ImageSource(FrameSource):
+    """Still images read one by one, optionally resized to ``size``."""
+
+    live = False
+
+    def __init__(self, paths: List[str], size: Optional[Size] = None) -> None:
+        super().__init__()
+        self.paths = list(paths)
+        self.size = size
+        self.current: Optional[str] = None
+
+    def _grab(self, fn):
+        while self.frames < len(self.paths):
+            start = time.perf_counter()
+            self.current = self.paths[self.frames]
+            frame = cv2.imread(self.current)
+            if frame is None:
+                self.frames += 1  # unreadable, skip it
+                continue
+            if self.size and frame.shape[1::-1] != tuple(self.size):
+                frame = cv2.resize(frame, tuple(self.size))
+            self._stamp(start, frame.nbytes)
+            return fn(frame)
+        return None
+
+
+class SyntheticSource(FrameSource):
+    """Moving boxes on a gray background, for benchmarks and running without a camera.
+
+    Frames are drawn into one preallocated buffer. ``fps`` paces reads like a
+    camera (0 = as fast as possible); ``frames`` limits the length (None =
+    endless).
+    """
+
+    def __init__(
+        self,
+        size: Size = (640, 480),
+        fps: float = 30.0,
+        frames: Optional[int] = None,
+        boxes: int = 3,
+    ) -> None:
+        super().__init__()
+        self.size = tuple(size)
+        self.limit = frames
+        self._interval = 1.0 / fps if fps > 0 else 0.0
+        self._next = 0.0
+        width, height = self.size
+        self._buf = np.empty((height, width, 3), dtype=np.uint8)
+        rng = np.random.default_rng(0)
+        self._boxes = rng.uniform(0, 1, (boxes, 4)) * [width * 0.6, height * 0.6, 3, 3]
+        self._colors = [tuple(int(c) for c in rng.integers(40, 255, 3)) for _ in range(boxes)]
+
+    def _grab(self, fn):
+        if self.limit is not None and self.frames >= self.limit:
+            return None
+        if self._interval:
+            delay = self._next - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._next = max(self._next, time.perf_counter() - self._interval) + self._interval
+        start = time.perf_counter()
+        width, height = self.size
+        side = max(8, min(width, height) // 4)
+        self._buf[...] = 96
+        for (x, y, dx, dy), color in zip(self._boxes, self._colors):
+            px = int((x + dx * self.frames) % max(1, width - side))
+            py = int((y + dy * self.frames) % max(1, height - side))
+            cv2.rectangle(self._buf, (px, py), (px + side, py + side), color, cv2.FILLED)
+        self._stamp(start, self._buf.nbytes)
+        return fn(self._buf)
+
+
+def list_images(folder: str) -> List[str]:
+    return sorted(p for p in glob.glob(os.path.join(folder, "*")) if os.path.splitext(p)[1].lower() in IMAGE_EXTS)
+
+
+def open_source(
+    spec: Union[int, str],
+    size: Optional[Size] = None,
+    resize: bool = False,
+    loop: bool = False,
+    realtime: bool = False,
+    fps: float = 30.0,
+) -> FrameSource:
+    """Open ``spec`` (see ``parse_source``) as a ``FrameSource``.
+
+    ``size`` is asked of the camera; ``resize=True`` also scales frames that
+    still come out differently (video files, still images). ``loop`` and
+    ``realtime`` replay a video file like a live camera; ``fps`` paces the
+    synthetic source.
+    """
+    kind, arg = parse_source(spec)
+    if kind == "picamera":
+        return PicameraSource(arg, size or (640, 480))
+    if kind == "synthetic":
+        return SyntheticSource(size or (640, 480), fps=fps)
+    if kind == "image":
+        return ImageSource([arg], size if resize else None)
+    if kind == "folder":
+        return ImageSource(list_images(arg), size if resize else None)
+    if kind == "video":
+        return CaptureSource(arg, size, resize=resize, live=realtime, loop=loop, realtime=realtime)
+    return CaptureSource(arg, size, resize=resize)
+
+
+_END = object()
+
+
+class PrefetchingSource:
+    """Read ``source`` on a background thread, ``depth`` frames ahead of ``read()``."""
+
+    def __init__(
+        self,
+        source: FrameSource,
+        depth: int = 2,
+        drop_policy: str = "all",
+        name: str = "frame-prefetch",
+    ) -> None:
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{drop_policy}' (choose from {', '.join(DROP_POLICIES)})")
+        self.source = source
+        self.depth = max(1, depth)
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=self.depth)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        if self.drop_policy == "latest":
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return True
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        if item is not _END:
+                            self.dropped += 1
+                    except queue.Empty:
+                        pass
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                frame = self.source.read()
+                if frame is None:
+                    break
+                if not self._put(frame):
+                    return
+        finally:
+            self._put(_END)
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Next frame, or None once the source has run out (or ``timeout`` passed)."""
+        if self._finished:
+            return None
+        try:
+            item = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if item is _END:
+            self._finished = True
+            return None
+        return item
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def stop(self) -> None:
+        self._stop.set()
+        # unblock a reader waiting on a full queue
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join(timeout=1.0)
+
+
+__all__ = [
+    "DROP_POLICIES",
+    "SOURCE_TYPES",
+    "CaptureSource",
+    "Frame",
+    "FrameSource",
+    "ImageSource",
+    "PicameraSource",
+    "PrefetchingSource",
+    "SyntheticSource",
+    "list_images",
+    "load_picamera",
+    "open_source",
+    "parse_source",
+]
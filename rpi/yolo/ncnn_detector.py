@@ -0,0 +1,221 @@
+"""YOLO detector that runs the exported ncnn model directly, without Ultralytics/torch.
+
+``NcnnDetector`` loads ``model.ncnn.param``/``model.ncnn.bin`` from an
+Ultralytics ncnn export folder (e.g. ``best_ncnn_model``) with the raw
+``ncnn.Net`` API, as ``best_ncnn_model/model_ncnn.py`` does. Pre- and
+post-processing follow Ultralytics' defaults so both backends give the same
+boxes:
+
+* letterbox: resize keeping aspect ratio, pad to ``imgsz`` with gray (114)
+  centered, BGR -> RGB, scale to 0..1;
+* ``out0`` is (4 + num_classes, anchors): cx, cy, w, h in input pixels followed
+  by per-class sigmoid scores;
+* class-aware NMS on the best class per anchor, then boxes are mapped back to
+  the original frame.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+try:
+    import ncnn  # type: ignore
+except Exception:  # pragma: no cover - optional, pip install ncnn
+    ncnn = None  # type: ignore
+
+try:
+    import yaml  # type: ignore
+except Exception:  # pragma: no cover - PyYAML normally arrives with ultralytics
+    yaml = None  # type: ignore
+
+PAD_VALUE = 114
+MAX_WH = 7680  # class offset for class-aware NMS, as in Ultralytics
+# best-scoring candidates kept before NMS; Ultralytics keeps 30000 of far more
+# anchors, out0 has 8400 and a noisy frame can pass most of them
+MAX_NMS = 2048
+
+
+def read_metadata(model_dir: Union[str, Path]) -> Dict[str, Any]:
+    """Class names and input size from an Ultralytics export's metadata.yaml."""
+    path = Path(model_dir) / "metadata.yaml"
+    if not path.exists():
+        return {"names": {}, "imgsz": [640, 640]}
+    text = path.read_text(encoding="utf-8")
+    if yaml is not None:
+        meta = yaml.safe_load(text) or {}
+    else:
+        # just enough YAML for the fields we need
+        meta = {"names": {}, "imgsz": []}
+        section = None
+        for line in text.splitlines():
+            if not line.startswith(" "):
+                section = line.split(":", 1)[0].strip()
+                continue
+            entry = line.strip()
+            if section == "names" and ":" in entry:
+                idx, name = entry.split(":", 1)
+                meta["names"][int(idx)] = name.strip().strip("'\"")
+            elif section == "imgsz" and entry.startswith("-"):
+                meta["imgsz"].append(int(entry[1:]))
+    names = {int(k): str(v) for k, v in (meta.get("names") or {}).items()}
+    imgsz = meta.get("imgsz") or [640, 640]
+    if isinstance(imgsz, int):
+        imgsz = [imgsz, imgsz]
+    return {"names": names, "imgsz": list(imgsz)}
+
+
+def letterbox(
+    frame: np.ndarray,
+    size: Tuple[int, int],
+    out: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize ``frame`` into a padded (h, w) canvas; return canvas, gain and (pad_x, pad_y).
+
+    Pass the previous canvas as ``out`` to reuse it between frames.
+    """
+    dst_h, dst_w = size
+    h, w = frame.shape[:2]
+    gain = min(dst_h / h, dst_w / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    pad_x, pad_y = (dst_w - new_w) // 2, (dst_h - new_h) // 2
+    if out is None or out.shape != (dst_h, dst_w, 3):
+        out = np.empty((dst_h, dst_w, 3), dtype=np.uint8)
+    out[...] = PAD_VALUE
+    region = out[pad_y:pad_y + new_h, pad_x:pad_x + new_w]
+    if (new_w, new_h) == (w, h):
+        region[...] = frame
+    else:
+        cv2.resize(frame, (new_w, new_h), dst=region, interpolation=cv2.INTER_LINEAR)
+    return out, gain, (pad_x, pad_y)
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """IoU of one xyxy box against (n, 4) xyxy boxes."""
+    iw = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    ih = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    inter = iw * ih
+    area = max(box[2] - box[0], 0) * max(box[3] - box[1], 0)
+    union = area + np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None) - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_thres: float, max_det: int = 300) -> np.ndarray:
+    """Greedy NMS; returns kept indices, best first.
+
+    Only the IoU of the current best box against the boxes still left is
+    computed, so memory stays O(n) rather than an n x n matrix.
+    """
+    order = np.argsort(-scores, kind="stable")
+    boxes = np.asarray(boxes, dtype=np.float32)[order]
+    remaining = np.arange(order.size)
+    keep = []
+    while remaining.size and len(keep) < max_det:
+        best, remaining = remaining[0], remaining[1:]
+        keep.append(best)
+        remaining = remaining[box_iou(boxes[best], boxes[remaining]) <= iou_thres]
+    return order[np.asarray(keep, dtype=np.intp)]
+
+
+def decode_output(
+    out0: np.ndarray,
+    conf_thres: float = 0.25,
+    iou_thres: float = 0.7,
+    max_det: int = 300,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Turn raw ``out0`` into (xyxy boxes, scores, class ids) in letterbox pixels."""
+    pred = np.asarray(out0, dtype=np.float32).reshape(out0.shape[-2], out0.shape[-1])
+    cls_scores = pred[4:]
+    class_ids = cls_scores.argmax(axis=0)
+    scores = cls_scores[class_ids, np.arange(pred.shape[1])]
+    candidates = np.flatnonzero(scores > conf_thres)
+    if candidates.size > MAX_NMS:
+        candidates = candidates[np.argsort(-scores[candidates])[:MAX_NMS]]
+    cx, cy, w, h = pred[:4, candidates]
+    boxes = np.stack((cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2), axis=1)
+    scores = scores[candidates]
+    class_ids = class_ids[candidates]
+    # offset each class so boxes of different classes never overlap
+    keep = nms(boxes + (class_ids * np.float32(MAX_WH))[:, None], scores, iou_thres, max_det)
+    return boxes[keep], scores[keep], class_ids[keep]
+
+
+def scale_boxes(
+    boxes: np.ndarray,
+    gain: float,
+    pad: Tuple[int, int],
+    shape: Tuple[int, int],
+) -> np.ndarray:
+    """Map letterbox xyxy boxes back onto an (h, w) frame."""
+    boxes = (boxes - np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)) / gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+    return boxes
+
+
+class NcnnDetector:
+    """Run an Ultralytics ncnn export with ``ncnn.Net`` and NumPy pre/post-processing."""
+
+    def __init__(
+        self,
+        model_dir: Union[str, Path],
+        conf: float = 0.25,
+        iou: float = 0.7,
+        max_det: int = 300,
+        num_threads: int = 4,
+    ) -> None:
+        if ncnn is None:
+            raise RuntimeError("ncnn is not installed. Run 'pip install ncnn'.")
+        model_dir = Path(model_dir)
+        param, weights = model_dir / "model.ncnn.param", model_dir / "model.ncnn.bin"
+        if not param.exists() or not weights.exists():
+            raise FileNotFoundError(f"ncnn model files missing in {model_dir}")
+        meta = read_metadata(model_dir)
+        self.names: Dict[int, str] = meta["names"]
+        self.imgsz: Tuple[int, int] = (int(meta["imgsz"][0]), int(meta["imgsz"][1]))
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+
+        self.net = ncnn.Net()
+        self.net.opt.use_vulkan_compute = False
+        self.net.opt.num_threads = num_threads
+        if self.net.load_param(str(param)) != 0 or self.net.load_model(str(weights)) != 0:
+            raise RuntimeError(f"Failed to load ncnn model from {model_dir}")
+        self._canvas: Optional[np.ndarray] = None
+        self._norm = [1 / 255.0] * 3
+
+    def infer(self, canvas: np.ndarray, rgb: bool = False) -> np.ndarray:
+        """Raw ``out0`` for an already letterboxed BGR (or RGB) canvas."""
+        h, w = canvas.shape[:2]
+        pixel_type = ncnn.Mat.PixelType.PIXEL_RGB if rgb else ncnn.Mat.PixelType.PIXEL_BGR2RGB
+        mat = ncnn.Mat.from_pixels(canvas, pixel_type, w, h)
+        mat.substract_mean_normalize([], self._norm)
+        with self.net.create_extractor() as ex:
+            ex.input("in0", mat)
+            _, out0 = ex.extract("out0")
+            return np.array(out0)
+
+    def predict(self, frame: np.ndarray, rgb: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(xyxy boxes, scores, class ids) for a BGR (or ``rgb=True``) frame, in frame pixels."""
+        self._canvas, gain, pad = letterbox(frame, self.imgsz, self._canvas)
+        out0 = self.infer(self._canvas, rgb=rgb)
+        boxes, scores, class_ids = decode_output(out0, self.conf, self.iou, self.max_det)
+        return scale_boxes(boxes, gain, pad, frame.shape[:2]), scores, class_ids
+
+    def detect(self, frame: np.ndarray, rgb: bool = False) -> List[Dict[str, Any]]:
+        """Detections in the dict format used by the kiosk and yolo scripts."""
+        boxes, scores, class_ids = self.predict(frame, rgb=rgb)
+        return [
+            {
+                "bbox": (int(x1), int(y1), int(x2), int(y2)),
+                "class": self.names.get(int(cls), str(int(cls))),
+                "conf": float(conf),
+            }
+            for (x1, y1, x2, y2), conf, cls in zip(boxes.tolist(), scores.tolist(), class_ids.tolist())
+        ]
+
+
+__all__ = ["NcnnDetector", "decode_output", "letterbox", "nms", "read_metadata", "scale_boxes"]
@@ -0,0 +1,313 @@
+"""Sticky box tracker: keeps a detection on screen between inferences until it ages out.
+
+Tracks live in one NumPy structured array (``TRACK_DTYPE``) rather than a
+dict of dicts. Each update computes the IoU of every track against every
+detection in a single matrix. The pairs are then assigned either optimally
+(Hungarian, ``scipy.optimize.linear_sum_assignment``, when SciPy is
+installed) or greedily, best IoU first. Either way a pair only matches at
+``iou_threshold`` or above. An unmatched track is kept until it is
+``max_age`` seconds old. An unmatched detection starts a new track.
+
+A kiosk camera usually sees one to a few faces, where NumPy's per-call
+overhead outweighs the work. Updates with no tracks or no detections
+skip matching altogether. Up to ``SMALL_MATCH`` track x detection pairs
+are scored with a plain Python loop and the tracks are rebuilt from
+tuples in one step, with the same assignment as the matrix path.
+
+Other threads read the tracks through ``snapshot()``. It returns an immutable
+``TrackSnapshot`` of frozen ``Track`` records, built once per update and
+tagged with a version. The publisher swaps the reference, readers keep it
+without copying, and a reader can skip work when the version has not changed.
+"""
+from __future__ import annotations
+
+import time
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment  # type: ignore
+except Exception:  # pragma: no cover - optional, greedy matching is used instead
+    linear_sum_assignment = None  # type: ignore
+
+TRACK_DTYPE = np.dtype(
+    [
+        ("id", np.int64),
+        ("bbox", np.float32, (4,)),  # xmin, ymin, xmax, ymax
+        ("cls", np.int32),  # index into StickyTracker.class_names
+        ("conf", np.float32),
+        ("last_seen", np.float64),
+    ]
+)
+MATCHERS = ("auto", "hungarian", "greedy")
+SMALL_MATCH = 256  # track x detection pairs; bench_tracker.py puts the crossover with the IoU matrix near 16 x 16
+
+
+class Track:
+    """One published track; read-only so a snapshot can be shared between threads."""
+
+    __slots__ = ("id", "bbox", "cls", "conf", "last_seen")
+
+    def __init__(self, id: int, bbox: Tuple[int, int, int, int], cls: str, conf: float, last_seen: float) -> None:
+        for name, value in zip(self.__slots__, (id, bbox, cls, conf, last_seen)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Track is immutable")
+
+    __delattr__ = __setattr__
+
+    def __repr__(self) -> str:
+        return f"Track(id={self.id}, bbox={self.bbox}, cls={self.cls!r}, conf={self.conf:.2f})"
+
+
+class TrackSnapshot(NamedTuple):
+    version: int
+    tracks: Tuple[Track, ...]
+
+
+EMPTY_SNAPSHOT = TrackSnapshot(0, ())
+
+
+def iou(boxA, boxB):
+    """IoU of two (xmin, ymin, xmax, ymax) boxes."""
+    return float(iou_matrix(np.asarray([boxA]), np.asarray([boxB]))[0, 0])
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU of every (n, 4) xyxy box in ``a`` against every (m, 4) box in ``b``, shape (n, m)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    # np.maximum rather than np.clip: same result, a fraction of the call overhead on tiny arrays
+    area_a = np.maximum(a[:, 2] - a[:, 0], 0) * np.maximum(a[:, 3] - a[:, 1], 0)
+    area_b = np.maximum(b[:, 2] - b[:, 0], 0) * np.maximum(b[:, 3] - b[:, 1], 0)
+    iw = np.maximum(np.minimum(a[:, None, 2], b[:, 2]) - np.maximum(a[:, None, 0], b[:, 0]), 0)
+    ih = np.maximum(np.minimum(a[:, None, 3], b[:, 3]) - np.maximum(a[:, None, 1], b[:, 1]), 0)
+    inter = iw * ih
+    union = area_a[:, None] + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _match_small(
+    a: Sequence[Sequence[float]], b: Sequence[Sequence[float]], threshold: float, method: str
+) -> Tuple[List[int], List[int]]:
+    """``match(iou_matrix(a, b), threshold, method)`` for a handful of boxes given as lists."""
+    # overlapping pairs only, row-major; IoU inlined since a call per pair costs more than the math
+    area_b = [max(x1 - x0, 0) * max(y1 - y0, 0) for x0, y0, x1, y1 in b]
+    pairs = []
+    for r, (ax0, ay0, ax1, ay1) in enumerate(a):
+        area_a = max(ax1 - ax0, 0) * max(ay1 - ay0, 0)
+        for c, (bx0, by0, bx1, by1) in enumerate(b):
+            iw = (ax1 if ax1 < bx1 else bx1) - (ax0 if ax0 > bx0 else bx0)
+            if iw <= 0:
+                continue
+            ih = (ay1 if ay1 < by1 else by1) - (ay0 if ay0 > by0 else by0)
+            if ih <= 0:
+                continue
+            inter = iw * ih
+            pairs.append((inter / (area_a + area_b[c] - inter), r, c))
+    if method == "hungarian" or (method == "auto" and linear_sum_assignment is not None):
+        ious = np.zeros((len(a), len(b)), dtype=np.float32)
+        for value, r, c in pairs:
+            ious[r, c] = value
+        rows, cols = match(ious, threshold, method)
+        return rows.tolist(), cols.tolist()
+    # a stable sort of row-major candidates, so ties break as in match()
+    pairs = [pair for pair in pairs if pair[0] >= threshold]
+    pairs.sort(key=itemgetter(0), reverse=True)
+    used_rows, used_cols, rows, cols = set(), set(), [], []
+    for _, r, c in pairs:
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        rows.append(r)
+        cols.append(c)
+    return rows, cols
+
+
+def match(ious: np.ndarray, threshold: float, method: str = "auto") -> Tuple[np.ndarray, np.ndarray]:
+    """(row, col) index pairs assigning rows to columns of an IoU matrix, each pair >= ``threshold``."""
+    if method not in MATCHERS:
+        raise ValueError(f"Unknown matcher '{method}' (choose from {', '.join(MATCHERS)})")
+    empty = np.empty(0, dtype=np.intp)
+    if ious.size == 0:
+        return empty, empty
+    if method == "hungarian" and linear_sum_assignment is None:
+        raise RuntimeError("Hungarian matching needs SciPy. Run 'pip install scipy'.")
+    if method != "greedy" and linear_sum_assignment is not None:
+        # pairs below the threshold can never match, so they add nothing to the total
+        rows, cols = linear_sum_assignment(np.where(ious >= threshold, ious, 0.0), maximize=True)
+        ok = ious[rows, cols] >= threshold
+        return rows[ok], cols[ok]
+    rows, cols = np.nonzero(ious >= threshold)
+    order = np.argsort(-ious[rows, cols], kind="stable")
+    used_rows = np.zeros(ious.shape[0], dtype=bool)
+    used_cols = np.zeros(ious.shape[1], dtype=bool)
+    keep = []
+    for k in order.tolist():
+        r, c = rows[k], cols[k]
+        if used_rows[r] or used_cols[c]:
+            continue
+        used_rows[r] = used_cols[c] = True
+        keep.append(k)
+    return rows[keep], cols[keep]
+
+
+class StickyTracker:
+    """Match detections to existing tracks by IoU and keep unmatched tracks for ``max_age`` seconds."""
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_age: float = 1.0,
+        matcher: str = "auto",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if matcher not in MATCHERS:
+            raise ValueError(f"Unknown matcher '{matcher}' (choose from {', '.join(MATCHERS)})")
+        self.next_id = 1
+        self.tracks = np.empty(0, dtype=TRACK_DTYPE)
+        self.iou_th = iou_threshold
+        self.max_age = max_age
+        self.matcher = matcher
+        self.clock = clock
+        self.class_names: List[str] = []
+        self._class_index: Dict[str, int] = {}
+        self.version = 0
+        self._snapshot = EMPTY_SNAPSHOT
+
+    def _class_id(self, name: str) -> int:
+        idx = self._class_index.get(name)
+        if idx is None:
+            idx = self._class_index[name] = len(self.class_names)
+            self.class_names.append(name)
+        return idx
+
+    def update(self, detections: Sequence[Dict[str, Any]]) -> None:
+        """Fold one inference's ``{'bbox', 'class', 'conf'}`` detections into the tracks."""
+        if len(self.tracks) * len(detections) <= SMALL_MATCH:
+            self._update_small(
+                self.clock(),
+                [det["bbox"] for det in detections],
+                [self._class_id(det["class"]) for det in detections],
+                [det["conf"] for det in detections],
+            )
+            return
+        boxes = np.array([det["bbox"] for det in detections], dtype=np.float32).reshape(-1, 4)
+        classes = np.array([self._class_id(det["class"]) for det in detections], dtype=np.int32)
+        confs = np.array([det["conf"] for det in detections], dtype=np.float32)
+        self.update_arrays(boxes, classes, confs)
+
+    def update_arrays(self, boxes: np.ndarray, classes: np.ndarray, confs: np.ndarray) -> None:
+        """Same as ``update`` for (n, 4) xyxy boxes, ``class_names`` indices and confidences."""
+        now = self.clock()
+        if len(self.tracks) * len(boxes) <= SMALL_MATCH:
+            boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+            self._update_small(now, boxes.tolist(), np.asarray(classes).tolist(), np.asarray(confs).tolist())
+            return
+        tracks = self.tracks.copy()
+        rows, cols = match(iou_matrix(tracks["bbox"], boxes), self.iou_th, self.matcher)
+        tracks["bbox"][rows] = boxes[cols]
+        tracks["cls"][rows] = classes[cols]
+        tracks["conf"][rows] = confs[cols]
+        tracks["last_seen"][rows] = now
+        # matched tracks were just refreshed, so this also drops only unmatched old ones
+        tracks = tracks[now - tracks["last_seen"] <= self.max_age]
+
+        unmatched = np.ones(len(boxes), dtype=bool)
+        unmatched[cols] = False
+        born = np.empty(int(unmatched.sum()), dtype=TRACK_DTYPE)
+        born["id"] = np.arange(self.next_id, self.next_id + len(born))
+        born["bbox"] = boxes[unmatched]
+        born["cls"] = classes[unmatched]
+        born["conf"] = confs[unmatched]
+        born["last_seen"] = now
+        self.next_id += len(born)
+        self.tracks = np.concatenate((tracks, born))
+        self.version += 1
+
+    def _update_small(
+        self, now: float, boxes: Sequence[Sequence[float]], classes: Sequence[int], confs: Sequence[float]
+    ) -> None:
+        """``update_arrays`` for up to ``SMALL_MATCH`` pairs, on Python sequences."""
+        self.version += 1
+        old = self.tracks
+        if not len(old) and not boxes:
+            return
+        old_boxes = old["bbox"].tolist()
+        rows, cols = _match_small(old_boxes, boxes, self.iou_th, self.matcher) if old_boxes and boxes else ((), ())
+        matched = dict(zip(rows, cols))
+        tracks = []
+        for r, (tid, bbox, cls, conf, seen) in enumerate(
+            zip(old["id"].tolist(), old_boxes, old["cls"].tolist(), old["conf"].tolist(), old["last_seen"].tolist())
+        ):
+            c = matched.get(r)
+            if c is not None:
+                tracks.append((tid, boxes[c], classes[c], confs[c], now))
+            elif now - seen <= self.max_age:
+                tracks.append((tid, bbox, cls, conf, seen))
+        taken = set(cols)
+        for c, bbox in enumerate(boxes):
+            if c not in taken:
+                tracks.append((self.next_id, bbox, classes[c], confs[c], now))
+                self.next_id += 1
+        self.tracks = np.array(tracks, dtype=TRACK_DTYPE) if tracks else np.empty(0, dtype=TRACK_DTYPE)
+
+    def active_tracks(self) -> np.ndarray:
+        """Structured array of the tracks seen within ``max_age``."""
+        return self.tracks[self.clock() - self.tracks["last_seen"] <= self.max_age]
+
+    def snapshot(self) -> TrackSnapshot:
+        """Immutable view of the current tracks, rebuilt only after an update.
+
+        Tracks unmatched by the last update are included until they age
+        out at the next one, so readers compare ``last_seen`` with ``max_age``
+        when that matters to them.
+        """
+        if self._snapshot.version != self.version:
+            tracks = self.tracks
+            self._snapshot = TrackSnapshot(
+                self.version,
+                tuple(
+                    Track(tid, tuple(int(v) for v in bbox), self.class_names[cls], conf, seen)
+                    for tid, bbox, cls, conf, seen in zip(
+                        tracks["id"].tolist(),
+                        tracks["bbox"].tolist(),
+                        tracks["cls"].tolist(),
+                        tracks["conf"].tolist(),
+                        tracks["last_seen"].tolist(),
+                    )
+                ),
+            )
+        return self._snapshot
+
+    def get_active(self) -> Dict[int, Dict[str, Any]]:
+        """Active tracks as ``id -> {'bbox', 'class', 'conf', 'last_seen'}``."""
+        active = self.active_tracks()
+        return {
+            tid: {"bbox": tuple(int(v) for v in bbox), "class": self.class_names[cls], "conf": conf, "last_seen": seen}
+            for tid, bbox, cls, conf, seen in zip(
+                active["id"].tolist(),
+                active["bbox"].tolist(),
+                active["cls"].tolist(),
+                active["conf"].tolist(),
+                active["last_seen"].tolist(),
+            )
+        }
+
+
+__all__ = [
+    "EMPTY_SNAPSHOT",
+    "MATCHERS",
+    "SMALL_MATCH",
+    "TRACK_DTYPE",
+    "StickyTracker",
+    "Track",
+    "TrackSnapshot",
+    "iou",
+    "iou_matrix",
+    "match",
+]
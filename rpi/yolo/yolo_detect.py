@@ -1,20 +1,23 @@
 import os
 import sys
 import argparse
-import glob
 import time
 
 import cv2
 import numpy as np
 from ultralytics import YOLO
 
+import batch_eval
+from frame_sources import DROP_POLICIES, PrefetchingSource, list_images, open_source, parse_source
+
 # Define and parse user input arguments
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--model', help='Path to YOLO model file (example: "runs/detect/train/weights/best.pt")',
                     required=True)
 parser.add_argument('--source', help='Image source, can be image file ("test.jpg"), \
-                    image folder ("test_dir"), video file ("testvid.mp4"), or index of USB camera ("usb0")', 
+                    image folder ("test_dir"), video file ("testvid.mp4"), index of USB camera ("usb0"), \
+                    Picamera ("picamera0") or a synthetic test pattern ("synthetic")', 
                     required=True)
 parser.add_argument('--thresh', help='Minimum confidence threshold for displaying detected objects (example: "0.4")',
                     default=0.5)
@@ -23,6 +26,22 @@ parser.add_argument('--resolution', help='Resolution in WxH to display inference
                     default=None)
 parser.add_argument('--record', help='Record results from video or webcam and save it as "demo1.avi". Must specify --resolution argument to record.',
                     action='store_true')
+parser.add_argument('--prefetch-depth', help='Frames decoded ahead of inference for video, USB and Picamera sources',
+                    type=int, default=2)
+parser.add_argument('--drop-policy', help='"latest" drops stale frames when inference falls behind (live cameras), \
+                    "all" processes every frame (recorded clips). Default: all for video files, latest otherwise',
+                    choices=DROP_POLICIES, default=None)
+parser.add_argument('--decode-res', help='Size in WxH that recorded video is decoded/downscaled to on the decode thread \
+                    (example: "960x540"), otherwise --resolution or the native size',
+                    default=None)
+parser.add_argument('--no-display', help='Headless evaluation of an image or image folder: no windows, detections written to --output',
+                    action='store_true')
+parser.add_argument('--batch', help='Images per inference call in --no-display mode', type=int, default=1)
+parser.add_argument('--workers', help='Decode/letterbox threads in --no-display mode', type=int, default=4)
+parser.add_argument('--prefetch', help='Batches decoded ahead of the model in --no-display mode', type=int, default=2)
+parser.add_argument('--imgsz', help='Letterbox size in --no-display mode', type=int, default=640)
+parser.add_argument('--output', help='Detections file for --no-display mode, .jsonl or .csv (example: "detections.csv")',
+                    default='detections.jsonl')
 
 args = parser.parse_args()
 
@@ -43,29 +62,26 @@ if (not os.path.exists(model_path)):
 model = YOLO(model_path, task='detect')
 labels = model.names
 
-# Parse input to determine if image source is a file, folder, video, or USB camera
-img_ext_list = ['.jpg','.JPG','.jpeg','.JPEG','.png','.PNG','.bmp','.BMP']
-vid_ext_list = ['.avi','.mov','.mp4','.mkv','.wmv']
-
-if os.path.isdir(img_source):
-    source_type = 'folder'
-elif os.path.isfile(img_source):
-    _, ext = os.path.splitext(img_source)
-    if ext in img_ext_list:
-        source_type = 'image'
-    elif ext in vid_ext_list:
-        source_type = 'video'
-    else:
-        print(f'File extension {ext} is not supported.')
+# Parse input to determine if image source is a file, folder, video, USB camera, Picamera or synthetic
+try:
+    source_type, _ = parse_source(img_source)
+except ValueError as exc:
+    print(f'{exc} Please try again.')
+    sys.exit(0)
+
+# Headless batch evaluation: prefetch, batched inference, JSONL/CSV output and mAP when labels exist
+if args.no_display:
+    if source_type not in ['image', 'folder']:
+        print('--no-display only works with an image or image folder source.')
         sys.exit(0)
-elif 'usb' in img_source:
-    source_type = 'usb'
-    usb_idx = int(img_source[3:])
-elif 'picamera' in img_source:
-    source_type = 'picamera'
-    picam_idx = int(img_source[8:])
-else:
-    print(f'Input {img_source} is invalid. Please try again.')
+    paths = list_images(img_source) if source_type == 'folder' else [img_source]
+    stats = batch_eval.run(model, paths, batch=max(1, args.batch), imgsz=args.imgsz, conf=float(min_thresh),
+                           workers=max(1, args.workers), prefetch=max(0, args.prefetch), output=args.output)
+    batch_eval.print_summary(stats)
+    print(f'Detections written to {args.output}')
+    sys.exit(0)
+elif args.batch > 1:
+    print('--batch only works together with --no-display.')
     sys.exit(0)
 
 # Parse user-specified display resolution
@@ -76,7 +92,7 @@ if user_res:
 
 # Check if recording is valid and set up recording
 if record:
-    if source_type not in ['video','usb']:
+    if source_type not in ['video','usb','stream','synthetic']:
         print('Recording only works for video and camera sources. Please try again.')
         sys.exit(0)
     if not user_res:
@@ -89,31 +105,21 @@ if record:
     recorder = cv2.VideoWriter(record_name, cv2.VideoWriter_fourcc(*'MJPG'), record_fps, (resW,resH))
 
 # Load or initialize image source
-if source_type == 'image':
-    imgs_list = [img_source]
-elif source_type == 'folder':
-    imgs_list = []
-    filelist = glob.glob(img_source + '/*')
-    for file in filelist:
-        _, file_ext = os.path.splitext(file)
-        if file_ext in img_ext_list:
-            imgs_list.append(file)
-elif source_type == 'video' or source_type == 'usb':
-
-    if source_type == 'video': cap_arg = img_source
-    elif source_type == 'usb': cap_arg = usb_idx
-    cap = cv2.VideoCapture(cap_arg)
-
-    # Set camera or video resolution if specified by user
-    if user_res:
-        ret = cap.set(3, resW)
-        ret = cap.set(4, resH)
-
-elif source_type == 'picamera':
-    from picamera2 import Picamera2
-    cap = Picamera2()
-    cap.configure(cap.create_video_configuration(main={"format": 'XRGB8888', "size": (resW, resH)}))
-    cap.start()
+if source_type == 'image' or source_type == 'folder':
+    frame_source = open_source(img_source)
+else:
+    # Frames are requested at the decode size from the camera (Picamera ISP, USB) and
+    # downscaled on the decode thread when the source cannot (video files)
+    decode_size = None
+    if args.decode_res:
+        decode_size = (int(args.decode_res.split('x')[0]), int(args.decode_res.split('x')[1]))
+    elif user_res:
+        decode_size = (resW, resH)
+    camera = open_source(img_source, decode_size, resize=True)
+
+    # Decode on a background thread so it overlaps inference instead of adding to it
+    drop_policy = args.drop_policy or ('all' if source_type == 'video' else 'latest')
+    frame_source = PrefetchingSource(camera, depth=args.prefetch_depth, drop_policy=drop_policy)
 
 # Set bounding box colors (using the Tableu 10 color scheme)
 bbox_colors = [(164,120,87), (68,148,228), (93,97,209), (178,182,133), (88,159,106), 
@@ -123,7 +129,8 @@ bbox_colors = [(164,120,87), (68,148,228), (93,97,209), (178,182,133), (88,159,1
 avg_frame_rate = 0
 frame_rate_buffer = []
 fps_avg_len = 200
-img_count = 0
+decode_ms = 0.0
+infer_ms = 0.0
 
 # Begin inference loop
 while True:
@@ -131,39 +138,31 @@ while True:
     t_start = time.perf_counter()
 
     # Load frame from image source
-    if source_type == 'image' or source_type == 'folder': # If source is image or image folder, load the image using its filename
-        if img_count >= len(imgs_list):
+    item = frame_source.read()
+    if source_type == 'image' or source_type == 'folder': # If source is image or image folder, the next readable image
+        if item is None:
             print('All images have been processed. Exiting program.')
             sys.exit(0)
-        img_filename = imgs_list[img_count]
-        frame = cv2.imread(img_filename)
-        img_count = img_count + 1
-    
-    elif source_type == 'video': # If source is a video, load next frame from video file
-        ret, frame = cap.read()
-        if not ret:
-            print('Reached end of the video file. Exiting program.')
-            break
-    
-    elif source_type == 'usb': # If source is a USB camera, grab frame from camera
-        ret, frame = cap.read()
-        if (frame is None) or (not ret):
-            print('Unable to read frames from the camera. This indicates the camera is disconnected or not working. Exiting program.')
+        frame = item.image
+
+    else: # Video, USB camera, Picamera or synthetic: take the next frame decoded by the prefetch thread
+        if item is None:
+            if source_type == 'video':
+                print('Reached end of the video file. Exiting program.')
+            else:
+                print('Unable to read frames from the camera. This indicates the camera is disconnected or not working. Exiting program.')
             break
+        frame = item.image
+        decode_ms = item.decode_s * 1000
 
-    elif source_type == 'picamera': # If source is a Picamera, grab frames using picamera interface
-        frame_bgra = cap.capture_array()
-        frame = cv2.cvtColor(np.copy(frame_bgra), cv2.COLOR_BGRA2BGR)
-        if (frame is None):
-            print('Unable to read frames from the Picamera. This indicates the camera is disconnected or not working. Exiting program.')
-            break
-
-    # Resize frame to desired display resolution
-    if resize == True:
+    # Resize frame to desired display resolution (video frames usually arrive at it already)
+    if resize == True and frame.shape[1::-1] != (resW, resH):
         frame = cv2.resize(frame,(resW,resH))
 
     # Run inference on frame
+    t_infer = time.perf_counter()
     results = model(frame, verbose=False)
+    infer_ms = (time.perf_counter() - t_infer) * 1000
 
     # Extract results
     detections = results[0].boxes
@@ -203,8 +202,9 @@ while True:
             object_count = object_count + 1
 
     # Calculate and draw framerate (if using video, USB, or Picamera source)
-    if source_type == 'video' or source_type == 'usb' or source_type == 'picamera':
+    if source_type not in ['image', 'folder']:
         cv2.putText(frame, f'FPS: {avg_frame_rate:0.2f}', (10,20), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2) # Draw framerate
+        cv2.putText(frame, f'Decode: {decode_ms:0.1f} ms  Inference: {infer_ms:0.1f} ms', (10,60), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2) # Decode runs in parallel with inference
     
     # Display detection results
     cv2.putText(frame, f'Number of objects: {object_count}', (10,40), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2) # Draw total number of detected objects
@@ -214,7 +214,7 @@ while True:
     # If inferencing on individual images, wait for user keypress before moving to next image. Otherwise, wait 5ms before moving to next frame.
     if source_type == 'image' or source_type == 'folder':
         key = cv2.waitKey()
-    elif source_type == 'video' or source_type == 'usb' or source_type == 'picamera':
+    else:
         key = cv2.waitKey(5)
     
     if key == ord('q') or key == ord('Q'): # Press 'q' to quit
@@ -241,9 +241,10 @@ while True:
 
 # Clean up
 print(f'Average pipeline FPS: {avg_frame_rate:.2f}')
-if source_type == 'video' or source_type == 'usb':
-    cap.release()
-elif source_type == 'picamera':
-    cap.stop()
+if source_type not in ['image', 'folder']:
+    frame_source.stop()
+    camera.release()
+    if frame_source.dropped:
+        print(f'Dropped {frame_source.dropped} stale frames (drop policy "{frame_source.drop_policy}")')
 if record: recorder.release()
 cv2.destroyAllWindows()
@@ -1,79 +1,14 @@
 import os
 import sys
 import argparse
-import glob
 import time
 import threading
-import copy
 
 import cv2
-import numpy as np
-from ultralytics import YOLO
-
-def iou(boxA, boxB):
-    # boxes are (xmin, ymin, xmax, ymax)
-    xA = max(boxA[0], boxB[0])
-    yA = max(boxA[1], boxB[1])
-    xB = min(boxA[2], boxB[2])
-    yB = min(boxA[3], boxB[3])
-    interW = max(0, xB - xA)
-    interH = max(0, yB - yA)
-    interArea = interW * interH
-    boxAArea = max(0, boxA[2] - boxA[0]) * max(0, boxA[3] - boxA[1])
-    boxBArea = max(0, boxB[2] - boxB[0]) * max(0, boxB[3] - boxB[1])
-    denom = float(boxAArea + boxBArea - interArea)
-    if denom <= 0:
-        return 0.0
-    return interArea / denom
-
-
-class StickyTracker:
-    def __init__(self, iou_threshold=0.3, max_age=1.0):
-        self.next_id = 1
-        self.tracks = {}  # id -> {bbox, class, conf, last_seen}
-        self.iou_th = iou_threshold
-        self.max_age = max_age
-
-    def update(self, detections):
-        # detections: list of dict {'bbox':(xmin,ymin,xmax,ymax),'class':name,'conf':float}
-        now = time.time()
-        new_tracks = {}
-
-        used_new = set()
-        # Match existing tracks to new detections by IoU
-        for tid, t in list(self.tracks.items()):
-            best_iou = 0.0
-            best_j = None
-            for j, det in enumerate(detections):
-                if j in used_new:
-                    continue
-                val = iou(t['bbox'], det['bbox'])
-                if val > best_iou:
-                    best_iou = val
-                    best_j = j
-            if best_j is not None and best_iou >= self.iou_th:
-                det = detections[best_j]
-                new_tracks[tid] = {'bbox': det['bbox'], 'class': det['class'], 'conf': det['conf'], 'last_seen': now}
-                used_new.add(best_j)
-            else:
-                # keep old track until it ages out
-                age = now - t['last_seen']
-                if age <= self.max_age:
-                    new_tracks[tid] = t
-
-        # Add unmatched detections as new tracks
-        for j, det in enumerate(detections):
-            if j in used_new:
-                continue
-            tid = self.next_id
-            self.next_id += 1
-            new_tracks[tid] = {'bbox': det['bbox'], 'class': det['class'], 'conf': det['conf'], 'last_seen': now}
-
-        self.tracks = new_tracks
 
-    def get_active(self):
-        now = time.time()
-        return {tid: t for tid, t in self.tracks.items() if now - t['last_seen'] <= self.max_age}
+from frame_sources import open_source, parse_source
+from ncnn_detector import NcnnDetector
+from tracker import EMPTY_SNAPSHOT, MATCHERS, StickyTracker
 
 
 def main():
@@ -84,6 +19,11 @@ def main():
     parser.add_argument('--target-fps', type=float, default=14.0, help='display FPS target')
     parser.add_argument('--infer-fps', type=float, default=1.0, help='inference thread FPS')
     parser.add_argument('--max-age', type=float, default=1.0, help='sticky bbox max age in seconds')
+    parser.add_argument('--backend', choices=['ultralytics', 'ncnn'], default='ultralytics',
+                        help='ultralytics (torch) or ncnn directly on the exported model')
+    parser.add_argument('--matcher', choices=MATCHERS, default='auto',
+                        help='track assignment: hungarian (needs scipy), greedy by IoU, or auto '
+                             '(hungarian when scipy is installed, greedy otherwise)')
     args = parser.parse_args()
 
     # Hardcoded defaults requested by user
@@ -102,62 +42,31 @@ def main():
         print('ERROR: model path invalid')
         sys.exit(1)
 
-    model = YOLO(model_path, task='detect')
+    if args.backend == 'ncnn':
+        # ncnn.Net on the .param/.bin with numpy pre/post-processing, no torch
+        model = NcnnDetector(model_path, conf=min_thresh)
+    else:
+        # imported here so the ncnn backend does not load torch
+        from ultralytics import YOLO
+        model = YOLO(model_path, task='detect')
     labels = model.names
 
-    img_ext_list = ['.jpg','.JPG','.jpeg','.JPEG','.png','.PNG','.bmp','.BMP']
-    vid_ext_list = ['.avi','.mov','.mp4','.mkv','.wmv']
-
-    if os.path.isdir(img_source):
-        source_type = 'folder'
-    elif os.path.isfile(img_source):
-        _, ext = os.path.splitext(img_source)
-        if ext in img_ext_list:
-            source_type = 'image'
-        elif ext in vid_ext_list:
-            source_type = 'video'
-        else:
-            print('unsupported file extension')
-            sys.exit(1)
-    elif 'usb' in img_source:
-        source_type = 'usb'
-        usb_idx = int(img_source[3:])
-    elif 'picamera' in img_source:
-        source_type = 'picamera'
-        picam_idx = int(img_source[8:])
-    else:
-        print('invalid input')
+    try:
+        source_type, _ = parse_source(img_source)
+    except ValueError as exc:
+        print(exc)
         sys.exit(1)
 
-    resize = False
     if user_res:
-        resize = True
         resW, resH = int(user_res.split('x')[0]), int(user_res.split('x')[1])
 
-    if record and source_type not in ['video', 'usb']:
+    if record and source_type not in ['video', 'usb', 'stream', 'synthetic']:
         print('record works only for video/usb')
         sys.exit(1)
 
-    if source_type == 'image':
-        imgs_list = [img_source]
-    elif source_type == 'folder':
-        imgs_list = []
-        filelist = glob.glob(img_source + '/*')
-        for file in filelist:
-            _, file_ext = os.path.splitext(file)
-            if file_ext in img_ext_list:
-                imgs_list.append(file)
-    elif source_type in ['video', 'usb']:
-        cap_arg = img_source if source_type == 'video' else usb_idx
-        cap = cv2.VideoCapture(cap_arg)
-        if user_res:
-            cap.set(3, resW)
-            cap.set(4, resH)
-    elif source_type == 'picamera':
-        from picamera2 import Picamera2
-        cap = Picamera2()
-        cap.configure(cap.create_video_configuration(main={"format": 'XRGB8888', "size": (resW, resH)}))
-        cap.start()
+    # frames come at the display resolution: scaled by the camera where it can
+    # (Picamera ISP, USB), otherwise on read
+    source = open_source(img_source, (resW, resH) if user_res else None, resize=True)
 
     # Define exactly one distinct color per class (two colors expected)
     # Use BGR tuples
@@ -168,12 +77,14 @@ def main():
         class_color_map[name] = CLASS_COLOR_LIST[idx % len(CLASS_COLOR_LIST)]
 
     latest_frame = {'img': None, 'lock': threading.Lock()}
-    detections_shared = {'tracks': {}, 'lock': threading.Lock()}
-    tracker = StickyTracker(iou_threshold=0.3, max_age=max_age)
+    # the inference thread replaces 'snapshot' with a new immutable TrackSnapshot;
+    # the display loop just reads the reference, no lock and no copy
+    published = {'snapshot': EMPTY_SNAPSHOT}
+    tracker = StickyTracker(iou_threshold=0.3, max_age=max_age, matcher=args.matcher)
     stop_event = threading.Event()
 
     def inference_thread_fn():
-        nonlocal latest_frame, detections_shared, tracker
+        nonlocal latest_frame, published, tracker
         sleep_target = 1.0 / max(0.0001, infer_fps)
         while not stop_event.is_set():
             t0 = time.perf_counter()
@@ -184,24 +95,26 @@ def main():
                 continue
 
             # Run model inference on a copy
-            results = model(frame, verbose=False)
-            detections = []
-            if len(results) > 0:
-                boxes = results[0].boxes
-                for i in range(len(boxes)):
-                    xyxy = boxes[i].xyxy.cpu().numpy().squeeze().astype(int)
-                    xmin, ymin, xmax, ymax = int(xyxy[0]), int(xyxy[1]), int(xyxy[2]), int(xyxy[3])
-                    classidx = int(boxes[i].cls.item())
-                    classname = labels[classidx]
-                    conf = boxes[i].conf.item()
-                    if conf >= min_thresh:
-                        detections.append({'bbox': (xmin, ymin, xmax, ymax), 'class': classname, 'conf': conf})
-
-            # Update tracker and shared detections
+            if args.backend == 'ncnn':
+                # already filtered by min_thresh inside the detector
+                detections = model.detect(frame)
+            else:
+                results = model(frame, verbose=False)
+                detections = []
+                if len(results) > 0:
+                    boxes = results[0].boxes
+                    for i in range(len(boxes)):
+                        xyxy = boxes[i].xyxy.cpu().numpy().squeeze().astype(int)
+                        xmin, ymin, xmax, ymax = int(xyxy[0]), int(xyxy[1]), int(xyxy[2]), int(xyxy[3])
+                        classidx = int(boxes[i].cls.item())
+                        classname = labels[classidx]
+                        conf = boxes[i].conf.item()
+                        if conf >= min_thresh:
+                            detections.append({'bbox': (xmin, ymin, xmax, ymax), 'class': classname, 'conf': conf})
+
+            # Update tracker and publish its snapshot
             tracker.update(detections)
-            active = tracker.get_active()
-            with detections_shared['lock']:
-                detections_shared['tracks'] = copy.deepcopy(active)
+            published['snapshot'] = tracker.snapshot()
 
             t1 = time.perf_counter()
             elapsed = t1 - t0
@@ -223,8 +136,30 @@ def main():
     else:
         recorder = None
 
+    def build_overlays(tracks):
+        # box and label geometry per track, worked out once per snapshot version
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale = 1.0
+        font_thickness = 2
+        overlays = []
+        for t in tracks:
+            xmin, ymin, xmax, ymax = t.bbox
+            color = class_color_map.get(t.cls, CLASS_COLOR_LIST[0])
+            label = f'{t.cls}'
+            labelSize, baseLine = cv2.getTextSize(label, font, font_scale, font_thickness)
+            label_ymin = max(ymin, labelSize[1] + 10)
+            overlays.append((
+                t.last_seen + max_age,
+                color,
+                (xmin, ymin), (xmax, ymax),
+                (xmin, label_ymin-labelSize[1]-10), (xmin+labelSize[0], label_ymin+baseLine-10),
+                label, (xmin, label_ymin-7),
+            ))
+        return overlays
+
     try:
-        img_count = 0
+        drawn_version = -1
+        overlays = []
         fps_buf = []
         fps_buf_len = 50
         # Cap video feed reads to target FPS by scheduling next frame time
@@ -237,57 +172,40 @@ def main():
                 t_start = time.perf_counter()
 
             # Read frame
-            if source_type in ['image', 'folder']:
-                if img_count >= len(imgs_list):
-                    print('Done processing images')
-                    break
-                img_filename = imgs_list[img_count]
-                frame = cv2.imread(img_filename)
-                img_count += 1
-            elif source_type == 'video' or source_type == 'usb':
-                ret, frame = cap.read()
-                if not ret or frame is None:
-                    print('No frame, exiting')
-                    break
-            elif source_type == 'picamera':
-                frame_bgra = cap.capture_array()
-                frame = cv2.cvtColor(np.copy(frame_bgra), cv2.COLOR_BGRA2BGR)
-
-            if resize:
-                frame = cv2.resize(frame, (resW, resH))
+            item = source.read()
+            if item is None:
+                print('Done processing images' if source_type in ['image', 'folder'] else 'No frame, exiting')
+                break
+            frame = item.image
 
             # Publish latest frame for inference thread
             with latest_frame['lock']:
                 latest_frame['img'] = frame.copy()
 
-            # Draw sticky boxes from shared detections
-            with detections_shared['lock']:
-                tracks = copy.deepcopy(detections_shared['tracks'])
+            # Draw sticky boxes from the latest snapshot
+            snapshot = published['snapshot']
+            if snapshot.version != drawn_version:
+                overlays = build_overlays(snapshot.tracks)
+                drawn_version = snapshot.version
 
             # Draw one colored box per class and show only the class name (no confidence)
-            for tid, t in tracks.items():
-                xmin, ymin, xmax, ymax = t['bbox']
-                class_name = t['class']
-                # pick color for the class
-                color = class_color_map.get(class_name, CLASS_COLOR_LIST[0])
-                cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), color, 2)
-                label = f'{class_name}'
-                # larger, bolder text
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                font_scale = 1.0
-                font_thickness = 2
-                labelSize, baseLine = cv2.getTextSize(label, font, font_scale, font_thickness)
-                label_ymin = max(ymin, labelSize[1] + 10)
-                cv2.rectangle(frame, (xmin, label_ymin-labelSize[1]-10), (xmin+labelSize[0], label_ymin+baseLine-10), color, cv2.FILLED)
+            now = time.time()
+            shown = 0
+            for expires, color, p1, p2, l1, l2, label, org in overlays:
+                if now > expires:
+                    continue  # aged out since the last inference
+                cv2.rectangle(frame, p1, p2, color, 2)
+                cv2.rectangle(frame, l1, l2, color, cv2.FILLED)
                 # draw bold text (thicker stroke)
-                cv2.putText(frame, label, (xmin, label_ymin-7), font, font_scale, (0,0,0), font_thickness)
+                cv2.putText(frame, label, org, cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0,0,0), 2)
+                shown += 1
 
             # Draw FPS and object count
             fps = 0.0
             if len(fps_buf) > 0:
                 fps = sum(fps_buf)/len(fps_buf)
             cv2.putText(frame, f'FPS: {fps:0.2f}', (10,20), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2)
-            cv2.putText(frame, f'Objects: {len(tracks)}', (10,40), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2)
+            cv2.putText(frame, f'Objects: {shown}', (10,40), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2)
 
             cv2.imshow('YOLO Lite', frame)
             if recorder is not None:
@@ -318,10 +236,7 @@ def main():
         stop_event.set()
         inf_thread.join()
         print('Cleaning up...')
-        if source_type in ['video', 'usb']:
-            cap.release()
-        elif source_type == 'picamera':
-            cap.stop()
+        source.release()
         if recorder is not None:
             recorder.release()
         cv2.destroyAllWindows()